@@ -0,0 +1,335 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from generator import SyntheticCluster
+
+#
+# fake_apiserver.py
+#
+# Local stand-in for the Kubernetes API server, serving a SyntheticCluster over
+# plain HTTP. It answers the list endpoints used by citrouille, namespaced and
+# across all namespaces, with limit/continue pagination, list resourceVersions
+# and watch=true streams with bookmarks, plus reading a single namespace.
+# There is no authentication, it only listens on the loopback interface.
+#
+
+# kind -> (API path prefix, resource name, list kind)
+ENDPOINTS = {
+    "namespaces": ("/api/v1", "namespaces", "NamespaceList"),
+    "deployments": ("/apis/apps/v1", "deployments", "DeploymentList"),
+    "network_policies": (
+        "/apis/networking.k8s.io/v1",
+        "networkpolicies",
+        "NetworkPolicyList",
+    ),
+    "roles": ("/apis/rbac.authorization.k8s.io/v1", "roles", "RoleList"),
+    "cluster_roles": (
+        "/apis/rbac.authorization.k8s.io/v1",
+        "clusterroles",
+        "ClusterRoleList",
+    ),
+    "role_bindings": (
+        "/apis/rbac.authorization.k8s.io/v1",
+        "rolebindings",
+        "RoleBindingList",
+    ),
+    "cluster_role_bindings": (
+        "/apis/rbac.authorization.k8s.io/v1",
+        "clusterrolebindings",
+        "ClusterRoleBindingList",
+    ),
+    "config_maps": ("/api/v1", "configmaps", "ConfigMapList"),
+    "secrets": ("/api/v1", "secrets", "SecretList"),
+}
+
+# Longest time a watch stream is held open, whatever timeoutSeconds asks for
+MAX_WATCH_SECONDS = 30
+
+
+class FakeApiServer:
+    def __init__(
+        self, cluster: SyntheticCluster, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.cluster = cluster
+        self.requests = 0
+        self.bytes_sent = 0
+
+        # (kind, event type, object) in resourceVersion order, for watches
+        self._events: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._changed = threading.Condition()
+
+        # (path prefix, resource name) -> kind
+        self._routes = {
+            (prefix, resource): kind
+            for kind, (prefix, resource, _) in ENDPOINTS.items()
+        }
+
+        server = self
+
+        class Handler(_RequestHandler):
+            api = server
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        with self._changed:
+            self._changed.notify_all()
+
+    #
+    # write_kubeconfig
+    # Writes a kubeconfig pointing at the server, with a single context
+    #
+    def write_kubeconfig(self, path: str, context: str = "benchmark"):
+        kubeconfig = {
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [{"name": context, "cluster": {"server": self.url}}],
+            "users": [{"name": context, "user": {}}],
+            "contexts": [
+                {
+                    "name": context,
+                    "context": {"cluster": context, "user": context},
+                }
+            ],
+            "current-context": context,
+        }
+        # JSON is valid YAML, and avoids depending on PyYAML
+        with open(path, "w") as f:
+            json.dump(kubeconfig, f)
+
+    #
+    # modify
+    # Bumps the resourceVersion of the first count objects of a kind, and
+    # notifies the watchers as MODIFIED events
+    #
+    def modify(self, kind: str, count: int = 1):
+        with self._changed:
+            objects = self.cluster.objects[kind]
+            for index in range(min(count, len(objects))):
+                # Objects are replaced rather than updated, so that the events
+                # already sent keep their resourceVersion
+                metadata = dict(objects[index]["metadata"])
+                metadata["resourceVersion"] = self.cluster.next_resource_version()
+                objects[index] = dict(objects[index], metadata=metadata)
+                self._events.append((kind, "MODIFIED", objects[index]))
+            self._changed.notify_all()
+
+    #
+    # route
+    # Maps a request path to (kind, namespace, name)
+    # Returns None for unknown paths
+    #
+    def route(self, path: str) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+        for prefix in (
+            "/api/v1",
+            "/apis/apps/v1",
+            "/apis/networking.k8s.io/v1",
+            "/apis/rbac.authorization.k8s.io/v1",
+        ):
+            rest = path.removeprefix(prefix + "/")
+            if rest == path:
+                continue
+            parts = rest.strip("/").split("/")
+
+            # /namespaces/{name}
+            if prefix == "/api/v1" and len(parts) == 2 and parts[0] == "namespaces":
+                return "namespaces", None, parts[1]
+            # /namespaces/{namespace}/{resource}
+            if len(parts) == 3 and parts[0] == "namespaces":
+                kind = self._routes.get((prefix, parts[2]))
+                return (kind, parts[1], None) if kind else None
+            # /{resource}
+            if len(parts) == 1:
+                kind = self._routes.get((prefix, parts[0]))
+                return (kind, None, None) if kind else None
+        return None
+
+    #
+    # list_objects
+    # Returns the objects of a kind, optionally limited to a namespace
+    #
+    def list_objects(self, kind: str, namespace: Optional[str]) -> List[Dict[str, Any]]:
+        objects = self.cluster.objects[kind]
+        if namespace is None:
+            return objects
+        return [obj for obj in objects if obj["metadata"].get("namespace") == namespace]
+
+    #
+    # list_document
+    # Builds a list response for one page of objects
+    #
+    def list_document(
+        self, kind: str, namespace: Optional[str], limit: int, offset: int
+    ) -> Dict[str, Any]:
+        objects = self.list_objects(kind, namespace)
+        end = offset + limit if limit else len(objects)
+        page = objects[offset:end]
+        metadata: Dict[str, Any] = {
+            "resourceVersion": str(self.cluster._resource_version)
+        }
+        if limit and offset + limit < len(objects):
+            metadata["continue"] = str(offset + limit)
+            metadata["remainingItemCount"] = len(objects) - offset - limit
+
+        prefix, _, list_kind = ENDPOINTS[kind]
+        return {
+            "kind": list_kind,
+            "apiVersion": prefix.split("/", 2)[-1] if prefix != "/api/v1" else "v1",
+            "metadata": metadata,
+            "items": page,
+        }
+
+    #
+    # events_since
+    # Returns the watch events of a kind after a resourceVersion
+    #
+    def events_since(
+        self, kind: str, namespace: Optional[str], resource_version: int
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        return [
+            (event_type, obj)
+            for event_kind, event_type, obj in self._events
+            if event_kind == kind
+            and int(obj["metadata"]["resourceVersion"]) > resource_version
+            and (namespace is None or obj["metadata"].get("namespace") == namespace)
+        ]
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    api: FakeApiServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.api.requests += 1
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        route = self.api.route(url.path)
+        if route is None:
+            self._send_json(404, _status(404, "NotFound", f"{url.path} not found"))
+            return
+        kind, namespace, name = route
+
+        if name is not None:
+            for obj in self.api.cluster.objects["namespaces"]:
+                if obj["metadata"]["name"] == name:
+                    self._send_json(200, obj)
+                    return
+            self._send_json(
+                404, _status(404, "NotFound", f'namespaces "{name}" not found')
+            )
+            return
+
+        if query.get("watch") in ("true", "1"):
+            self._watch(kind, namespace, query)
+            return
+
+        try:
+            limit = int(query.get("limit", 0))
+            offset = int(query.get("continue", 0))
+        except ValueError:
+            self._send_json(
+                400, _status(400, "BadRequest", "invalid limit or continue")
+            )
+            return
+        self._send_json(200, self.api.list_document(kind, namespace, limit, offset))
+
+    #
+    # _watch
+    # Streams the events after the requested resourceVersion, then a bookmark,
+    # and keeps the stream open for new events until timeoutSeconds
+    #
+    def _watch(self, kind: str, namespace: Optional[str], query: Dict[str, str]):
+        resource_version = int(query.get("resourceVersion") or 0)
+        timeout = min(
+            int(query.get("timeoutSeconds", MAX_WATCH_SECONDS)), MAX_WATCH_SECONDS
+        )
+        bookmarks = query.get("allowWatchBookmarks") in ("true", "1")
+        deadline = time.monotonic() + timeout
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            while True:
+                with self.api._changed:
+                    events = self.api.events_since(kind, namespace, resource_version)
+                    if not events:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.api._changed.wait(remaining)
+                        events = self.api.events_since(
+                            kind, namespace, resource_version
+                        )
+
+                for event_type, obj in events:
+                    self._send_chunk({"type": event_type, "object": obj})
+                    resource_version = int(obj["metadata"]["resourceVersion"])
+
+                if bookmarks:
+                    current = str(self.api.cluster._resource_version)
+                    self._send_chunk(
+                        {
+                            "type": "BOOKMARK",
+                            "object": {
+                                "kind": ENDPOINTS[kind][2][: -len("List")],
+                                "metadata": {"resourceVersion": current},
+                            },
+                        }
+                    )
+                    resource_version = int(current)
+
+                if time.monotonic() >= deadline:
+                    break
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_chunk(self, event: Dict[str, Any]):
+        data = json.dumps(event, separators=(",", ":")).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+        self.api.bytes_sent += len(data)
+
+    def _send_json(self, status: int, document: Dict[str, Any]):
+        data = json.dumps(document, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.api.bytes_sent += len(data)
+
+
+def _status(code: int, reason: str, message: str) -> Dict[str, Any]:
+    return {
+        "kind": "Status",
+        "apiVersion": "v1",
+        "status": "Failure",
+        "message": message,
+        "reason": reason,
+        "code": code,
+    }
@@ -0,0 +1,264 @@
+import random
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+#
+# generator.py
+#
+# Synthetic cluster generator for the benchmarks.
+# Builds the JSON objects a Kubernetes API server would return for a cluster
+# of N namespaces with M deployments each, a given number of containers per
+# pod and a given number of RBAC rules per role. A fixed seed makes every run
+# generate the same cluster, with a mix of secure and insecure settings so
+# that every check has findings to report.
+#
+
+# Default cluster shape
+DEFAULT_NAMESPACES = 20
+DEFAULT_DEPLOYMENTS = 50
+DEFAULT_CONTAINERS = 3
+DEFAULT_RBAC_RULES = 10
+DEFAULT_SEED = 42
+
+CREATED = datetime(2025, 1, 1, tzinfo=timezone.utc).isoformat().replace("+00:00", "Z")
+
+VERBS = ["get", "list", "watch", "create", "update", "patch", "delete", "*"]
+RESOURCES = ["pods", "secrets", "configmaps", "deployments", "services", "*"]
+API_GROUPS = ["", "apps", "rbac.authorization.k8s.io", "*"]
+
+
+class SyntheticCluster:
+    def __init__(
+        self,
+        namespaces: int = DEFAULT_NAMESPACES,
+        deployments: int = DEFAULT_DEPLOYMENTS,
+        containers: int = DEFAULT_CONTAINERS,
+        rbac_rules: int = DEFAULT_RBAC_RULES,
+        seed: int = DEFAULT_SEED,
+    ):
+        self.shape = {
+            "namespaces": namespaces,
+            "deployments": deployments,
+            "containers": containers,
+            "rbac_rules": rbac_rules,
+            "seed": seed,
+        }
+        self._random = random.Random(seed)
+        self._resource_version = 0
+
+        # kind -> objects, kinds named as in KubeClient.RESOURCE_KINDS
+        self.objects: Dict[str, List[Dict[str, Any]]] = {
+            "namespaces": [],
+            "deployments": [],
+            "network_policies": [],
+            "roles": [],
+            "cluster_roles": [],
+            "role_bindings": [],
+            "cluster_role_bindings": [],
+            "config_maps": [],
+            "secrets": [],
+        }
+
+        for index in range(namespaces):
+            self._add_namespace(f"ns-{index:04d}", deployments, containers, rbac_rules)
+
+        for index in range(max(1, namespaces // 2)):
+            self.objects["cluster_roles"].append(
+                self._role(f"cluster-role-{index}", None, rbac_rules)
+            )
+            self.objects["cluster_role_bindings"].append(
+                self._binding(f"cluster-binding-{index}", None, f"cluster-role-{index}")
+            )
+
+    #
+    # next_resource_version
+    # Returns a new resourceVersion, increasing across the whole cluster
+    #
+    def next_resource_version(self) -> str:
+        self._resource_version += 1
+        return str(self._resource_version)
+
+    def _metadata(self, name: str, namespace: Any = None, **extra) -> Dict[str, Any]:
+        metadata = {
+            "name": name,
+            "uid": f"{namespace or 'cluster'}-{name}",
+            "resourceVersion": self.next_resource_version(),
+            "creationTimestamp": CREATED,
+        }
+        if namespace:
+            metadata["namespace"] = namespace
+        metadata.update(extra)
+        return metadata
+
+    def _add_namespace(self, namespace, deployments, containers, rbac_rules):
+        chance = self._random.random
+        labels = {"kubernetes.io/metadata.name": namespace}
+        if chance() < 0.5:
+            labels["pod-security.kubernetes.io/enforce"] = "restricted"
+
+        self.objects["namespaces"].append(
+            {
+                "apiVersion": "v1",
+                "kind": "Namespace",
+                "metadata": self._metadata(namespace, labels=labels),
+            }
+        )
+
+        for index in range(deployments):
+            self.objects["deployments"].append(
+                self._deployment(f"app-{index:04d}", namespace, containers)
+            )
+
+        for index in range(max(1, deployments // 10)):
+            self.objects["config_maps"].append(
+                {
+                    "apiVersion": "v1",
+                    "kind": "ConfigMap",
+                    "metadata": self._metadata(f"config-{index}", namespace),
+                    "data": {"LOG_LEVEL": "info", "API_URL": "https://example.com"},
+                    "immutable": chance() < 0.5,
+                }
+            )
+            self.objects["secrets"].append(
+                {
+                    "apiVersion": "v1",
+                    "kind": "Secret",
+                    "metadata": self._metadata(f"secret-{index}", namespace),
+                    "type": "Opaque",
+                    "data": {"password": "c3VwZXJzZWNyZXQ="},
+                    "immutable": chance() < 0.5,
+                }
+            )
+
+        self.objects["roles"].append(self._role("app-role", namespace, rbac_rules))
+        self.objects["role_bindings"].append(
+            self._binding("app-binding", namespace, "app-role")
+        )
+
+        if chance() < 0.7:
+            self.objects["network_policies"].append(
+                {
+                    "apiVersion": "networking.k8s.io/v1",
+                    "kind": "NetworkPolicy",
+                    "metadata": self._metadata("default-deny", namespace),
+                    "spec": {
+                        "podSelector": {},
+                        "policyTypes": ["Ingress", "Egress"],
+                        "ingress": [{}] if chance() < 0.3 else [],
+                    },
+                }
+            )
+
+    def _container(self, name: str) -> Dict[str, Any]:
+        chance = self._random.random
+        security_context: Dict[str, Any] = {
+            "allowPrivilegeEscalation": chance() < 0.3,
+            "readOnlyRootFilesystem": chance() < 0.6,
+            "runAsNonRoot": chance() < 0.7,
+            "capabilities": (
+                {"drop": ["ALL"]} if chance() < 0.6 else {"add": ["NET_ADMIN"]}
+            ),
+        }
+        if chance() < 0.05:
+            security_context["privileged"] = True
+        if chance() < 0.5:
+            security_context["seccompProfile"] = {"type": "RuntimeDefault"}
+
+        image = f"registry.example.com/{name}:1.{self._random.randint(0, 9)}"
+        if chance() < 0.5:
+            image = f"registry.example.com/{name}@sha256:{'a' * 64}"
+
+        container: Dict[str, Any] = {
+            "name": name,
+            "image": image,
+            "securityContext": security_context,
+            "env": [
+                {"name": "LOG_LEVEL", "value": "info"},
+                {"name": "DATABASE_HOST", "value": "db.example.com"},
+                {
+                    "name": "DATABASE_PASSWORD",
+                    "valueFrom": {"secretKeyRef": {"name": "db", "key": "password"}},
+                },
+            ],
+        }
+        if chance() < 0.1:
+            container["env"].append({"name": "API_TOKEN", "value": "hardcoded-token"})
+        if chance() < 0.7:
+            container["resources"] = {
+                "limits": {"cpu": "500m", "memory": "256Mi"},
+                "requests": {"cpu": "100m", "memory": "128Mi"},
+            }
+        return container
+
+    def _deployment(self, name: str, namespace: str, containers: int) -> Dict[str, Any]:
+        chance = self._random.random
+        pod_spec: Dict[str, Any] = {
+            "containers": [self._container(f"{name}-c{i}") for i in range(containers)],
+            "automountServiceAccountToken": chance() < 0.5,
+            "serviceAccountName": name if chance() < 0.5 else "default",
+            "volumes": [
+                {
+                    "name": "tmp",
+                    "emptyDir": {"sizeLimit": "1Gi"} if chance() < 0.5 else {},
+                },
+                {"name": "config", "configMap": {"name": "config-0"}},
+            ],
+        }
+        if chance() < 0.05:
+            pod_spec["hostNetwork"] = True
+        if chance() < 0.05:
+            pod_spec["volumes"].append(
+                {"name": "host", "hostPath": {"path": "/var/run"}}
+            )
+        if chance() < 0.2:
+            pod_spec["initContainers"] = [self._container(f"{name}-init")]
+
+        return {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": self._metadata(name, namespace, labels={"app": name}),
+            "spec": {
+                "replicas": self._random.randint(1, 5),
+                "selector": {"matchLabels": {"app": name}},
+                "template": {
+                    "metadata": {"labels": {"app": name}},
+                    "spec": pod_spec,
+                },
+            },
+        }
+
+    def _role(self, name: str, namespace: Any, rules: int) -> Dict[str, Any]:
+        choice = self._random.choice
+        return {
+            "apiVersion": "rbac.authorization.k8s.io/v1",
+            "kind": "Role" if namespace else "ClusterRole",
+            "metadata": self._metadata(name, namespace),
+            "rules": [
+                {
+                    "apiGroups": [choice(API_GROUPS)],
+                    "resources": [choice(RESOURCES), choice(RESOURCES)],
+                    "verbs": [choice(VERBS), choice(VERBS)],
+                }
+                for _ in range(rules)
+            ],
+        }
+
+    def _binding(self, name: str, namespace: Any, role: str) -> Dict[str, Any]:
+        subject_name = "system:authenticated" if self._random.random() < 0.1 else role
+        return {
+            "apiVersion": "rbac.authorization.k8s.io/v1",
+            "kind": "RoleBinding" if namespace else "ClusterRoleBinding",
+            "metadata": self._metadata(name, namespace),
+            "roleRef": {
+                "apiGroup": "rbac.authorization.k8s.io",
+                "kind": "Role" if namespace else "ClusterRole",
+                "name": role,
+            },
+            "subjects": [
+                {
+                    "kind": "ServiceAccount",
+                    "name": subject_name,
+                    "namespace": namespace or "default",
+                }
+            ],
+        }
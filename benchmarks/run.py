@@ -0,0 +1,469 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCHMARKS_DIR.parent
+sys.path.insert(0, str(REPO_DIR / "src"))
+
+from citrouille.comparator import compare_deployments  # noqa: E402
+from citrouille.formatters import (  # noqa: E402
+    JSONFormatter,
+    SecurityFormatter,
+    TableFormatter,
+)
+from citrouille.kube_client import KubeClient  # noqa: E402
+from citrouille.security_checks import (  # noqa: E402
+    fetch_cluster_resources,
+    kinds_for,
+    scan_namespaces,
+    select_checks,
+)
+from fake_apiserver import FakeApiServer  # noqa: E402
+from generator import (  # noqa: E402
+    DEFAULT_CONTAINERS,
+    DEFAULT_DEPLOYMENTS,
+    DEFAULT_NAMESPACES,
+    DEFAULT_RBAC_RULES,
+    DEFAULT_SEED,
+    SyntheticCluster,
+)
+
+#
+# run.py
+#
+# Benchmark harness. Generates a synthetic cluster, serves it from the fake API
+# server and times inventory, compare and security:
+# - end to end, running the citrouille CLI in a subprocess
+# - per phase (fetch, compare/checks, format), calling the library in process
+# Results are written to benchmarks/results/<commit>.json, and two result
+# files can be compared to spot regressions between commits.
+#
+
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+# Commands timed end to end, {ns1} and {ns2} are the first two namespaces
+COMMANDS = {
+    "inventory": ["inventory", "{ns1}"],
+    "inventory_all": ["inventory", "--all-namespaces"],
+    "compare": ["compare", "{ns1}", "{ns2}"],
+    "security": ["security", "{ns1}"],
+    "security_all": ["security", "--all-namespaces"],
+}
+
+# Commands timed to measure the startup latency, they need no cluster
+STARTUP_COMMANDS = {
+    "version": ["--version"],
+    "help": ["--help"],
+}
+
+CLI_ENTRY_POINT = (
+    "import sys; from citrouille.cli import main; sys.argv[0] = 'citrouille'; main()"
+)
+
+# Slowdown ratio reported as a regression by the compare mode
+REGRESSION_THRESHOLD = 1.10
+
+
+#
+# timings_summary
+# Reduces a list of durations to min/median/max, in seconds
+#
+def timings_summary(durations: List[float]) -> Dict[str, float]:
+    return {
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "max": max(durations),
+    }
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations.setdefault(name, []).append(time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: timings_summary(d) for name, d in self.durations.items()}
+
+
+#
+# git_commit
+# Returns the short hash of the checked out commit, with a suffix when the tree
+# has local changes
+#
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--", "src"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+#
+# bench_phases
+# Times the phases of inventory, compare and security in process
+#
+def bench_phases(
+    kubeconfig: str,
+    namespaces: List[str],
+    repeat: int,
+    page_size: int,
+    fast_parse: bool,
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    ns1, ns2 = namespaces[0], namespaces[min(1, len(namespaces) - 1)]
+    checks = select_checks()
+    results = {}
+
+    def client():
+        return KubeClient(
+            kubeconfig=kubeconfig, page_size=page_size, fast_parse=fast_parse
+        )
+
+    timer = PhaseTimer()
+    for _ in range(repeat):
+        with timer.phase("total"):
+            with timer.phase("fetch"):
+                deployments = client().get_all_deployments()
+            with timer.phase("format_table"):
+                TableFormatter.format_deployments(deployments)
+            with timer.phase("format_json"):
+                JSONFormatter.format_deployments(deployments)
+    results["inventory_all"] = timer.summary()
+
+    timer = PhaseTimer()
+    for _ in range(repeat):
+        with timer.phase("total"):
+            with timer.phase("fetch"):
+                kube_client = client()
+                deployments1 = kube_client.get_deployments(ns1)
+                deployments2 = kube_client.get_deployments(ns2)
+            with timer.phase("compare"):
+                comparison = compare_deployments(deployments1, deployments2)
+            with timer.phase("format_table"):
+                TableFormatter.format_comparison(comparison, ns1, ns2)
+    results["compare"] = timer.summary()
+
+    timer = PhaseTimer()
+    for _ in range(repeat):
+        with timer.phase("total"):
+            with timer.phase("fetch"):
+                kube_client = client()
+                resources = fetch_cluster_resources(
+                    kube_client, None, kinds_for(checks)
+                )
+            with timer.phase("checks"):
+                findings = scan_namespaces(
+                    kube_client, None, checks, resources=resources
+                )
+            with timer.phase("format_table"):
+                SecurityFormatter.format_findings(findings, "table")
+            with timer.phase("format_json"):
+                SecurityFormatter.format_findings(findings, "json")
+    results["security_all"] = timer.summary()
+    results["security_all"]["findings"] = len(findings)
+
+    return results
+
+
+#
+# bench_commands
+# Times the CLI commands end to end, each in a fresh interpreter
+#
+def bench_commands(
+    kubeconfig: str,
+    namespaces: List[str],
+    repeat: int,
+    extra_args: List[str],
+    home: str,
+) -> Dict[str, Dict[str, float]]:
+    ns1, ns2 = namespaces[0], namespaces[min(1, len(namespaces) - 1)]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(REPO_DIR / "src"), env.get("PYTHONPATH")])
+    )
+    # An empty home directory keeps the user's config file out of the runs
+    env["HOME"] = home
+
+    results = {}
+    for name, command in COMMANDS.items():
+        argv = [arg.format(ns1=ns1, ns2=ns2) for arg in command]
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            process = subprocess.run(
+                [sys.executable, "-c", CLI_ENTRY_POINT, "--kubeconfig", kubeconfig]
+                + extra_args
+                + argv,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            durations.append(time.perf_counter() - start)
+            # security exits with 1 when it reports findings, which is expected here
+            if process.returncode != 0 and "Error:" in process.stderr:
+                raise RuntimeError(
+                    f"citrouille {' '.join(argv)} failed: {process.stderr.strip()}"
+                )
+        results[name] = timings_summary(durations)
+    return results
+
+
+#
+# bench_startup
+# Times the CLI commands answered before any cluster access, each in a fresh
+# interpreter, and the import of the CLI module
+#
+def bench_startup(repeat: int, home: str) -> Dict[str, Dict[str, float]]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(REPO_DIR / "src"), env.get("PYTHONPATH")])
+    )
+    env["HOME"] = home
+
+    commands = {
+        name: [sys.executable, "-c", CLI_ENTRY_POINT] + argv
+        for name, argv in STARTUP_COMMANDS.items()
+    }
+    commands["import"] = [sys.executable, "-c", "import citrouille.cli"]
+    # Startup of the interpreter alone, to tell it apart from citrouille's
+    commands["interpreter"] = [sys.executable, "-c", "pass"]
+
+    results = {}
+    for name, command in commands.items():
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(
+                command,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+            )
+            durations.append(time.perf_counter() - start)
+        results[name] = timings_summary(durations)
+    return results
+
+
+#
+# run_benchmarks
+# Generates the cluster, starts the fake API server and runs every benchmark
+#
+def run_benchmarks(args) -> Dict[str, Any]:
+    start = time.perf_counter()
+    cluster = SyntheticCluster(
+        namespaces=args.namespaces,
+        deployments=args.deployments,
+        containers=args.containers,
+        rbac_rules=args.rbac_rules,
+        seed=args.seed,
+    )
+    generate_time = time.perf_counter() - start
+    namespaces = [ns["metadata"]["name"] for ns in cluster.objects["namespaces"]]
+
+    server = FakeApiServer(cluster)
+    server.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            kubeconfig = os.path.join(tmp, "kubeconfig")
+            server.write_kubeconfig(kubeconfig)
+
+            extra_args = ["--page-size", str(args.page_size)]
+            if args.fast_parse:
+                extra_args.append("--fast-parse")
+
+            phases = bench_phases(
+                kubeconfig, namespaces, args.repeat, args.page_size, args.fast_parse
+            )
+            commands = {}
+            startup = {}
+            if not args.skip_cli:
+                commands = bench_commands(
+                    kubeconfig, namespaces, args.repeat, extra_args, tmp
+                )
+                startup = bench_startup(args.repeat, tmp)
+    finally:
+        server.stop()
+
+    return {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cluster": dict(
+            cluster.shape,
+            objects={kind: len(items) for kind, items in cluster.objects.items()},
+        ),
+        "options": {
+            "repeat": args.repeat,
+            "page_size": args.page_size,
+            "fast_parse": args.fast_parse,
+        },
+        "generate_seconds": generate_time,
+        "api_requests": server.requests,
+        "phases": phases,
+        "commands": commands,
+        "startup": startup,
+    }
+
+
+#
+# flatten
+# Maps "section.benchmark.phase" to the median duration of a result file
+#
+def flatten(result: Dict[str, Any]) -> Dict[str, float]:
+    flat = {}
+    for name, timings in result.get("commands", {}).items():
+        flat[f"commands.{name}"] = timings["median"]
+    for name, timings in result.get("startup", {}).items():
+        flat[f"startup.{name}"] = timings["median"]
+    for name, phases in result.get("phases", {}).items():
+        for phase, timings in phases.items():
+            if isinstance(timings, dict):
+                flat[f"phases.{name}.{phase}"] = timings["median"]
+    return flat
+
+
+#
+# compare_results
+# Prints the median durations of two result files side by side
+# Returns the number of regressions above the threshold
+#
+def compare_results(baseline_path: str, current_path: str, threshold: float) -> int:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    if baseline.get("cluster", {}).get("objects") != current.get("cluster", {}).get(
+        "objects"
+    ):
+        print(
+            "Warning: the results were measured on different clusters", file=sys.stderr
+        )
+
+    old, new = flatten(baseline), flatten(current)
+    regressions = 0
+    print(f"{'BENCHMARK':<40} {baseline['commit']:>12} {current['commit']:>12}  RATIO")
+    for name in sorted(set(old) & set(new)):
+        ratio = new[name] / old[name] if old[name] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  regression"
+            regressions += 1
+        print(f"{name:<40} {old[name]:>11.4f}s {new[name]:>11.4f}s  {ratio:.2f}{flag}")
+    return regressions
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark citrouille against a synthetic cluster"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--namespaces", type=int, default=DEFAULT_NAMESPACES)
+    run_parser.add_argument(
+        "--deployments",
+        type=int,
+        default=DEFAULT_DEPLOYMENTS,
+        help="Deployments per namespace",
+    )
+    run_parser.add_argument(
+        "--containers", type=int, default=DEFAULT_CONTAINERS, help="Containers per pod"
+    )
+    run_parser.add_argument(
+        "--rbac-rules",
+        type=int,
+        default=DEFAULT_RBAC_RULES,
+        help="Rules per Role and ClusterRole",
+    )
+    run_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run_parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per benchmark (default: 3)"
+    )
+    run_parser.add_argument("--page-size", type=int, default=500)
+    run_parser.add_argument("--fast-parse", action="store_true")
+    run_parser.add_argument(
+        "--skip-cli", action="store_true", help="Skip the end to end CLI runs"
+    )
+    run_parser.add_argument(
+        "--output",
+        "-o",
+        type=str,
+        default=None,
+        help="Result file (default: benchmarks/results/<commit>.json)",
+    )
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline", type=str)
+    compare_parser.add_argument("current", type=str)
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Slowdown ratio reported as a regression (default: 1.10)",
+    )
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        sys.exit(
+            1 if compare_results(args.baseline, args.current, args.threshold) else 0
+        )
+
+    if args.command != "run":
+        parser.print_help()
+        sys.exit(0)
+
+    result = run_benchmarks(args)
+
+    output = (
+        Path(args.output) if args.output else RESULTS_DIR / f"{result['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for name, seconds in flatten(result).items():
+        print(f"{name:<40} {seconds:.4f}s")
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
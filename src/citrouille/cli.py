@@ -1,16 +1,40 @@
 import argparse
 import sys
+import threading
+import time
 from pathlib import Path
 
-from citrouille.kube_client import KubeClient
-from citrouille.formatters import TableFormatter, JSONFormatter, SecurityFormatter
-from citrouille.comparator import compare_deployments
-from citrouille.security_checks import run_security_checks
-from citrouille.config import load_config, resolve_cluster
+from citrouille.defaults import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_FETCH_WORKERS,
+    DEFAULT_SCAN_WORKERS,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_CLUSTER_WORKERS,
+    DEFAULT_SERVE_HOST,
+    DEFAULT_SERVE_PORT,
+)
 
+#
+# cli.py
+#
+# Command line interface. Only the parser is built at import time: the
+# kubernetes client, the formatters and the security checks are imported by
+# the command handlers that use them, so that --help, --version and argument
+# errors answer without loading them.
+#
 
 __version__ = "1.1.2"
 
+# Output formats of findings only, and the commands supporting them
+FINDING_OUTPUTS = {"ndjson": ("security", "watch"), "sarif": ("security",)}
+
+# Guards the creation of the pool of API clients, which multi-cluster runs
+# connect to from several threads
+_CLIENT_POOL_LOCK = threading.Lock()
+
+# Commands a citrouille server can answer (see --server)
+REMOTE_COMMANDS = ("inventory", "compare", "security")
+
 
 def create_parser():
     parser = argparse.ArgumentParser(
@@ -39,14 +63,58 @@ def create_parser():
         help="Kubernetes context to use (default: current-context)",
     )
 
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=None,
+        metavar="N",
+        help=f"Number of objects fetched per API list call, 0 to disable pagination (default: {DEFAULT_PAGE_SIZE})",
+    )
+
+    parser.add_argument(
+        "--fast-parse",
+        action="store_true",
+        default=None,
+        help="Parse API responses as raw JSON instead of building kubernetes model objects (faster on large lists)",
+    )
+
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of connections kept open to each API server (default: kubernetes client default)",
+    )
+
+    parser.add_argument(
+        "--keep-alive",
+        action="store_true",
+        default=None,
+        help="Enable TCP keepalive on the connections to the API servers",
+    )
+
+    parser.add_argument(
+        "--server",
+        type=str,
+        metavar="URL",
+        help="Send inventory, compare and security to a citrouille server (see serve) instead of querying the cluster",
+    )
+
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        default=None,
+        help="Write JSON output without indentation (inventory and compare)",
+    )
+
     parser.add_argument(
         "-o",
         "--output",
         type=str,
-        choices=["table", "json"],
+        choices=["table", "json", "ndjson", "sarif"],
         default="table",
         metavar="FORMAT",
-        help="Output format: table, json (default: table)",
+        help="Output format: table, json, ndjson, sarif (default: table). ndjson and sarif only apply to security findings",
     )
 
     subparsers = parser.add_subparsers(
@@ -100,6 +168,21 @@ def create_parser():
         help="Target namespace (default: default)",
     )
 
+    security_parser.add_argument(
+        "namespaces",
+        type=str,
+        nargs="*",
+        metavar="NAMESPACE",
+        help="Additional namespaces to scan",
+    )
+
+    security_parser.add_argument(
+        "-A",
+        "--all-namespaces",
+        action="store_true",
+        help="Scan every namespace of the cluster",
+    )
+
     security_parser.add_argument(
         "--check-config",
         action="store_true",
@@ -110,6 +193,207 @@ def create_parser():
         "--check-network", action="store_true", help="Analyze network security"
     )
 
+    security_parser.add_argument(
+        "--checks",
+        type=str,
+        metavar="IDS",
+        help="Only run the checks with these comma-separated IDs (e.g. 1,7,13)",
+    )
+
+    security_parser.add_argument(
+        "--skip-checks",
+        type=str,
+        metavar="IDS",
+        help="Do not run the checks with these comma-separated IDs",
+    )
+
+    security_parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=DEFAULT_FETCH_WORKERS,
+        metavar="N",
+        help=f"Number of concurrent API requests while fetching resources (default: {DEFAULT_FETCH_WORKERS})",
+    )
+
+    security_parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=DEFAULT_SCAN_WORKERS,
+        metavar="N",
+        help=f"Number of namespaces checked in parallel when scanning several namespaces (default: {DEFAULT_SCAN_WORKERS})",
+    )
+
+    security_parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Keep the findings on cluster-scoped resources in DIR between runs",
+    )
+
+    security_parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        metavar="SECONDS",
+        help=f"Reuse cached cluster-scoped resources for SECONDS without listing them again, which may miss recent changes (default: {DEFAULT_CACHE_TTL}, always list)",
+    )
+
+    security_parser.add_argument(
+        "--metrics-file",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Write Prometheus metrics of the run to PATH, for the node_exporter textfile collector",
+    )
+
+    security_parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print how long each resource fetch took to stderr",
+    )
+
+    security_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a breakdown of the time and memory spent in each phase, fetch and check to stderr",
+    )
+
+    security_parser.add_argument(
+        "--profile-format",
+        choices=["table", "json"],
+        default="table",
+        help="Format of the --profile breakdown (default: table)",
+    )
+
+    security_parser.add_argument(
+        "--profile-trace",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Write the profiled spans to PATH as a Chrome trace-event file (implies --profile)",
+    )
+
+    for subparser in (inventory_parser, security_parser):
+        clusters_group = subparser.add_mutually_exclusive_group()
+        clusters_group.add_argument(
+            "--clusters",
+            type=str,
+            metavar="ALIASES",
+            help="Query these comma-separated cluster aliases of the config file instead of a namespace",
+        )
+        clusters_group.add_argument(
+            "--all-clusters",
+            action="store_true",
+            help="Query every cluster alias of the config file",
+        )
+        subparser.add_argument(
+            "--cluster-workers",
+            type=int,
+            default=DEFAULT_CLUSTER_WORKERS,
+            metavar="N",
+            help=f"Number of clusters queried concurrently with --clusters or --all-clusters (default: {DEFAULT_CLUSTER_WORKERS})",
+        )
+
+    for subparser in (inventory_parser, compare_parser, security_parser):
+        subparser.add_argument(
+            "--from-snapshot",
+            type=str,
+            default=None,
+            metavar="PATH",
+            help="Read resources from a snapshot file instead of the cluster",
+        )
+
+    snapshot_parser = subparsers.add_parser(
+        "snapshot",
+        help="Save cluster resources to a file",
+        description="Save the resources used by inventory, compare and security to a snapshot file",
+    )
+
+    snapshot_parser.add_argument("output_file", type=str, help="Snapshot file to write")
+
+    snapshot_parser.add_argument(
+        "namespaces",
+        type=str,
+        nargs="*",
+        metavar="NAMESPACE",
+        help="Namespaces to include (default: all namespaces)",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Continuously report security findings",
+        description="Watch a namespace and report security findings as they appear or get resolved",
+    )
+
+    watch_parser.add_argument(
+        "namespace",
+        type=str,
+        nargs="?",
+        default="default",
+        help="Target namespace (default: default)",
+    )
+
+    watch_parser.add_argument(
+        "--check-config",
+        action="store_true",
+        help="Perform configuration security checks",
+    )
+
+    watch_parser.add_argument(
+        "--check-network", action="store_true", help="Analyze network security"
+    )
+
+    watch_parser.add_argument(
+        "--checks",
+        type=str,
+        metavar="IDS",
+        help="Only run the checks with these comma-separated IDs (e.g. 1,7,13)",
+    )
+
+    watch_parser.add_argument(
+        "--skip-checks",
+        type=str,
+        metavar="IDS",
+        help="Do not run the checks with these comma-separated IDs",
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Answer inventory, compare and security requests over HTTP",
+        description="Keep warm clients and resource caches, and answer inventory, compare and security requests over HTTP",
+    )
+
+    serve_parser.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_SERVE_HOST,
+        help=f"Address to listen on (default: {DEFAULT_SERVE_HOST})",
+    )
+
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_SERVE_PORT,
+        help=f"Port to listen on (default: {DEFAULT_SERVE_PORT})",
+    )
+
+    serve_parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=DEFAULT_FETCH_WORKERS,
+        metavar="N",
+        help=f"Number of concurrent API requests while fetching resources (default: {DEFAULT_FETCH_WORKERS})",
+    )
+
+    serve_parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=DEFAULT_SCAN_WORKERS,
+        metavar="N",
+        help=f"Number of namespaces checked in parallel when scanning several namespaces (default: {DEFAULT_SCAN_WORKERS})",
+    )
+
     return parser
 
 
@@ -121,6 +405,8 @@ def main():
         parser.print_help()
         sys.exit(0)
 
+    from citrouille.config import load_config
+
     # Load configuration file
     config = load_config()
 
@@ -128,6 +414,62 @@ def main():
     if args.kubeconfig is None and "kubeconfig" in config:
         args.kubeconfig = config["kubeconfig"]
 
+    # Apply page size from config if not provided via CLI
+    if args.page_size is None:
+        args.page_size = config.get("page_size", DEFAULT_PAGE_SIZE)
+
+    if not isinstance(args.page_size, int) or args.page_size < 0:
+        print(
+            f"Error: page size must be a positive integer or 0: {args.page_size}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    # Apply fast JSON parsing from config if not provided via CLI
+    if args.fast_parse is None:
+        args.fast_parse = bool(config.get("fast_parse", False))
+
+    # Apply connection pool settings from config if not provided via CLI
+    if args.pool_size is None:
+        args.pool_size = config.get("pool_size")
+
+    if args.pool_size is not None and (
+        not isinstance(args.pool_size, int) or args.pool_size < 1
+    ):
+        print(
+            f"Error: pool size must be a positive integer: {args.pool_size}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    if args.keep_alive is None:
+        args.keep_alive = bool(config.get("keep_alive", False))
+
+    # Apply compact JSON output from config if not provided via CLI
+    if args.compact is None:
+        args.compact = bool(config.get("compact", False))
+
+    # Streaming finding formats only apply to the commands reporting findings
+    commands = FINDING_OUTPUTS.get(args.output)
+    if commands is not None and args.command not in commands:
+        print(
+            f"Error: output format {args.output} is only supported by the "
+            f"{' and '.join(commands)} command{'s' if len(commands) > 1 else ''}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    if getattr(args, "clusters", None) or getattr(args, "all_clusters", False):
+        _validate_clusters(args)
+
+    if args.server and args.command not in REMOTE_COMMANDS:
+        print(
+            "Error: --server is only supported by the "
+            f"{', '.join(REMOTE_COMMANDS)} commands",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
     # Validate kubeconfig path if provided
     if args.kubeconfig:
         kubeconfig_path = Path(args.kubeconfig).expanduser()
@@ -137,33 +479,46 @@ def main():
             )
             sys.exit(1)
 
-    if args.command == "inventory":
+    if args.server:
+        handle_remote(args)
+    elif args.command == "inventory" and (args.clusters or args.all_clusters):
+        handle_inventory_clusters(args, config)
+    elif args.command == "inventory":
         handle_inventory(args, config)
     elif args.command == "compare":
         handle_compare(args, config)
     elif args.command == "security":
         handle_security(args, config)
+    elif args.command == "snapshot":
+        handle_snapshot(args, config)
+    elif args.command == "watch":
+        handle_watch(args, config)
+    elif args.command == "serve":
+        handle_serve(args, config)
 
 
 #
 # Inventory generation
 #
 def handle_inventory(args, config):
+    from citrouille.config import resolve_cluster
+    from citrouille.formatters import TableFormatter, JSONFormatter
+
     try:
         # Resolve cluster alias to get namespace and context
         if args.all_namespaces:
             # Use CLI context if provided, otherwise use default
-            k8s = KubeClient(kubeconfig=args.kubeconfig, context=args.context)
+            k8s = _make_client(args, args.context)
             deployments = k8s.get_all_deployments()
         else:
             namespace, cluster_context = resolve_cluster(args.namespace, config)
             # CLI context takes precedence over cluster config context
             context = args.context if args.context else cluster_context
-            k8s = KubeClient(kubeconfig=args.kubeconfig, context=context)
+            k8s = _make_client(args, context)
             deployments = k8s.get_deployments(namespace=namespace)
 
         if args.output == "json":
-            output = JSONFormatter.format_deployments(deployments)
+            output = JSONFormatter.format_deployments(deployments, args.compact)
         else:
             output = TableFormatter.format_deployments(deployments)
 
@@ -177,10 +532,59 @@ def handle_inventory(args, config):
         sys.exit(1)
 
 
+#
+# Inventory of several clusters, tagged by cluster
+#
+def handle_inventory_clusters(args, config):
+    from citrouille.formatters import TableFormatter, JSONFormatter
+    from citrouille.multicluster import fan_out, tag_deployments
+
+    groups = _resolve_cluster_groups(args, config)
+
+    def inventory(k8s, group):
+        if args.all_namespaces:
+            return k8s.get_all_deployments()
+        deployments = []
+        for namespace in group.namespaces:
+            deployments.extend(k8s.get_deployments(namespace=namespace))
+        return deployments
+
+    deployments = []
+    failed = False
+    for group, result, error in fan_out(
+        groups,
+        lambda group: _make_client(args, group.context),
+        inventory,
+        max_workers=args.cluster_workers,
+    ):
+        if error is not None:
+            print(
+                f"Warning: Failed to query cluster {group.name}: {error}",
+                file=sys.stderr,
+            )
+            failed = True
+            continue
+        deployments.extend(tag_deployments(result, group.name))
+
+    if args.output == "json":
+        output = JSONFormatter.format_deployments(deployments, args.compact)
+    else:
+        output = TableFormatter.format_deployments(deployments)
+    print(output)
+
+    # A partial inventory is reported, but not as a success
+    if failed:
+        sys.exit(1)
+
+
 #
 # Comparison between namespaces
 #
 def handle_compare(args, config):
+    from citrouille.config import resolve_cluster
+    from citrouille.comparator import compare_deployments
+    from citrouille.formatters import TableFormatter, JSONFormatter
+
     try:
         # Resolve cluster aliases to get namespace and context for each
         namespace1, cluster_context1 = resolve_cluster(args.namespace1, config)
@@ -196,13 +600,14 @@ def handle_compare(args, config):
             context2 = cluster_context2
 
         # Create separate clients if contexts differ, otherwise reuse one client
-        if context1 == context2:
-            client = KubeClient(kubeconfig=args.kubeconfig, context=context1)
+        # A snapshot holds a single cluster, whatever the contexts
+        if context1 == context2 or args.from_snapshot:
+            client = _make_client(args, context1)
             deployments_ns1 = client.get_deployments(namespace1)
             deployments_ns2 = client.get_deployments(namespace2)
         else:
-            client1 = KubeClient(kubeconfig=args.kubeconfig, context=context1)
-            client2 = KubeClient(kubeconfig=args.kubeconfig, context=context2)
+            client1 = _make_client(args, context1)
+            client2 = _make_client(args, context2)
             deployments_ns1 = client1.get_deployments(namespace1)
             deployments_ns2 = client2.get_deployments(namespace2)
 
@@ -210,7 +615,9 @@ def handle_compare(args, config):
 
         if args.output == "json":
             formatter = JSONFormatter()
-            output = formatter.format_comparison(comparison, namespace1, namespace2)
+            output = formatter.format_comparison(
+                comparison, namespace1, namespace2, args.compact
+            )
         else:
             formatter = TableFormatter()
             output = formatter.format_comparison(comparison, namespace1, namespace2)
@@ -225,18 +632,382 @@ def handle_compare(args, config):
         sys.exit(1)
 
 
+#
+# _make_client
+# Creates the client answering the command: a snapshot reader with --from-snapshot,
+# a Kubernetes client otherwise
+#
+def _make_client(args, context):
+    if getattr(args, "from_snapshot", None):
+        from citrouille.snapshot import SnapshotClient
+
+        return SnapshotClient(args.from_snapshot)
+
+    from citrouille.kube_client import KubeClient
+
+    return KubeClient(
+        kubeconfig=args.kubeconfig,
+        context=context,
+        page_size=args.page_size,
+        fast_parse=args.fast_parse,
+        pool=_client_pool(args),
+    )
+
+
+#
+# _client_pool
+# Returns the pool of API clients of the run, created on first use, so that the
+# clients of a context share their connections
+#
+def _client_pool(args):
+    from citrouille.kube_client import ClientPool
+
+    with _CLIENT_POOL_LOCK:
+        if getattr(args, "client_pool", None) is None:
+            args.client_pool = ClientPool(
+                pool_size=args.pool_size, keep_alive=args.keep_alive
+            )
+        return args.client_pool
+
+
+#
+# _make_cluster_cache
+# Creates the cache of cluster-scoped resources of a security run, stored in
+# --cache-dir when given
+# Snapshots are read whole anyway, their runs are not stored
+#
+def _make_cluster_cache(args, context):
+    from citrouille.security_checks.cluster_cache import ClusterCache, cache_path
+
+    path = None
+    if args.cache_dir and not getattr(args, "from_snapshot", None):
+        path = cache_path(args.cache_dir, args.kubeconfig, context)
+    cache = ClusterCache(ttl=args.cache_ttl, path=path, version=__version__)
+    cache.load()
+    return cache
+
+
+#
+# _select_checks
+# Selects the checks to run from the check groups and the --checks/--skip-checks options
+#
+def _select_checks(args, check_config, check_network):
+    from citrouille.security_checks import (
+        categories_for,
+        parse_check_ids,
+        select_checks,
+    )
+
+    try:
+        only = parse_check_ids(args.checks) if args.checks else None
+        skip = parse_check_ids(args.skip_checks) if args.skip_checks else None
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    checks = select_checks(
+        categories_for(check_config, check_network), only=only, skip=skip
+    )
+    if not checks:
+        print("Error: No security checks selected", file=sys.stderr)
+        sys.exit(1)
+    return checks
+
+
 #
 # Security analysis
 #
 def handle_security(args, config):
+    from citrouille.formatters import SecurityFormatter
+    from citrouille.metrics import METRICS
+    from citrouille.security_checks import start_scan
+    from citrouille.instrumentation import add_observer, remove_observer, span
+
+    profiler = None
+    if args.profile or args.profile_trace:
+        from citrouille.profiler import Profiler
+
+        # Every span is only kept for the timeline of --profile-trace
+        profiler = Profiler(keep_spans=bool(args.profile_trace))
+        profiler.start()
+
+    try:
+        check_config = args.check_config
+        check_network = args.check_network
+
+        # If no specific checks are specified, run all checks
+        if not check_config and not check_network:
+            check_config = True
+            check_network = True
+
+        checks = _select_checks(args, check_config, check_network)
+
+        if args.clusters or args.all_clusters:
+            _security_clusters(args, config, checks)
+            return
+
+        if args.all_namespaces:
+            namespaces = None
+            context = args.context
+        else:
+            namespaces, context = _resolve_namespaces(
+                [args.namespace] + args.namespaces, config, args.context
+            )
+
+        with span("phase", "connect"):
+            kube_client = _make_client(args, context)
+        # Allocations are traced from the fetch on, as tracing them slows the
+        # imports of the kubernetes client done while connecting
+        if profiler:
+            profiler.trace_allocations()
+
+        cache = _make_cluster_cache(args, context)
+
+        # Checks are timed for the CPU time metric
+        if args.metrics_file:
+            add_observer(METRICS)
+
+        # Fetch the resources needed by the selected checks concurrently, then run them
+        started = time.perf_counter()
+        with span("phase", "fetch"):
+            resources, findings = start_scan(
+                kube_client,
+                namespaces,
+                checks,
+                max_workers=args.fetch_workers,
+                scan_workers=args.scan_workers,
+                cache=cache,
+            )
+        if args.metrics_file:
+            findings = METRICS.observe(resources, findings, started)
+
+        if args.timings:
+            for kind, elapsed in resources.timings.items():
+                print(f"Fetched {kind} in {elapsed:.3f}s", file=sys.stderr)
+
+        for kind, error in resources.errors.items():
+            print(
+                f"Warning: Failed to fetch {kind}, dependent checks skipped: {error}",
+                file=sys.stderr,
+            )
+
+        if resources.errors and len(resources.errors) == len(resources.timings):
+            _write_metrics(args.metrics_file)
+            print("Error: Unable to fetch any resource", file=sys.stderr)
+            sys.exit(1)
+
+        # Findings are written as they are found, and only counted on the way,
+        # so the report phase includes the checks
+        with span("phase", "report"):
+            writer = SecurityFormatter.write_findings(findings, args.output)
+        _write_metrics(args.metrics_file)
+
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"Warning: Failed to save the cluster cache: {e}", file=sys.stderr)
+
+        critical_high = writer.counts["CRITICAL"] + writer.counts["HIGH"]
+        # An incomplete scan is not a passing scan
+        if critical_high or resources.errors:
+            sys.exit(1)
+
+    except ConnectionError as e:
+        print(f"Error: Unable to connect to Kubernetes cluster: {e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        remove_observer(METRICS)
+        if profiler:
+            profiler.stop()
+            _write_profile(args, profiler)
+
+
+#
+# _security_clusters
+# Scans several clusters concurrently and writes their findings as one
+# report, tagged by cluster
+# The findings of each cluster are written once its scan is complete, in the
+# order of the aliases
+#
+def _security_clusters(args, config, checks):
+    from citrouille.formatters import SecurityFormatter
+    from citrouille.instrumentation import span
+    from citrouille.multicluster import fan_out, tag_findings
+    from citrouille.security_checks import start_scan
+
+    groups = _resolve_cluster_groups(args, config)
+
+    def connect(group):
+        with span("phase", "connect"):
+            return _make_client(args, group.context)
+
+    def scan(kube_client, group):
+        cache = _make_cluster_cache(args, group.context)
+        with span("phase", "fetch"):
+            resources, findings = start_scan(
+                kube_client,
+                None if args.all_namespaces else group.namespaces,
+                checks,
+                max_workers=args.fetch_workers,
+                scan_workers=args.scan_workers,
+                cache=cache,
+            )
+        with span("phase", "check"):
+            findings = list(findings)
+        try:
+            cache.save()
+        except OSError as e:
+            print(
+                f"Warning: Failed to save the cluster cache of {group.name}: {e}",
+                file=sys.stderr,
+            )
+        return resources, findings
+
+    incomplete = False
+
+    def cluster_findings():
+        nonlocal incomplete
+        for group, result, error in fan_out(
+            groups, connect, scan, max_workers=args.cluster_workers
+        ):
+            if error is not None:
+                print(
+                    f"Warning: Failed to scan cluster {group.name}: {error}",
+                    file=sys.stderr,
+                )
+                incomplete = True
+                continue
+
+            resources, findings = result
+            if args.timings:
+                for kind, elapsed in resources.timings.items():
+                    print(
+                        f"[{group.name}] Fetched {kind} in {elapsed:.3f}s",
+                        file=sys.stderr,
+                    )
+            for kind, fetch_error in resources.errors.items():
+                print(
+                    f"Warning: [{group.name}] Failed to fetch {kind}, "
+                    f"dependent checks skipped: {fetch_error}",
+                    file=sys.stderr,
+                )
+                incomplete = True
+            yield from tag_findings(findings, group.name)
+
+    with span("phase", "report"):
+        writer = SecurityFormatter.write_findings(cluster_findings(), args.output)
+
+    critical_high = writer.counts["CRITICAL"] + writer.counts["HIGH"]
+    # An incomplete scan is not a passing scan
+    if critical_high or incomplete:
+        sys.exit(1)
+
+
+#
+# _write_metrics
+# Writes the metrics of the run for the node_exporter textfile collector, when
+# --metrics-file is given
+#
+def _write_metrics(path):
+    if not path:
+        return
+    from citrouille.metrics import write_textfile
+
+    try:
+        write_textfile(path)
+    except OSError as e:
+        print(f"Warning: Failed to write the metrics file: {e}", file=sys.stderr)
+
+
+#
+# _write_profile
+# Prints the profile of a security run to stderr, and writes its trace file
+# when --profile-trace is given
+#
+def _write_profile(args, profiler):
+    if args.profile_format == "json":
+        from citrouille.serialization import dumps
+
+        print(dumps(profiler.to_dict()), file=sys.stderr)
+    else:
+        print(profiler.format_table(), file=sys.stderr)
+
+    if args.profile_trace:
+        from citrouille.profiler import write_trace
+
+        try:
+            write_trace(profiler, args.profile_trace)
+        except OSError as e:
+            print(f"Warning: Failed to write the profile trace: {e}", file=sys.stderr)
+
+
+#
+# Snapshot of the cluster resources
+#
+def handle_snapshot(args, config):
+    from citrouille.kube_client import KubeClient
+    from citrouille.snapshot import write_snapshot
+
+    try:
+        if args.namespaces:
+            namespaces, context = _resolve_namespaces(
+                args.namespaces, config, args.context
+            )
+        else:
+            namespaces, context = None, args.context
+
+        kube_client = KubeClient(
+            kubeconfig=args.kubeconfig,
+            context=context,
+            page_size=args.page_size,
+            fast_parse=args.fast_parse,
+            pool=_client_pool(args),
+        )
+        header = write_snapshot(
+            kube_client, args.output_file, namespaces=namespaces, context=context
+        )
+
+        total = sum(header["kinds"].values())
+        print(
+            f"Wrote {total} objects from {len(header['namespaces'])} namespaces to {args.output_file}",
+            file=sys.stderr,
+        )
+
+    except ConnectionError as e:
+        print(f"Error: Unable to connect to Kubernetes cluster: {e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+#
+# Continuous security analysis
+#
+def handle_watch(args, config):
+    from citrouille.config import resolve_cluster
+    from citrouille.formatters import SecurityFormatter
+    from citrouille.informer import CachedKubeClient
+    from citrouille.security_checks.incremental import IncrementalScanner, run_forever
+
+    kube_client = None
     try:
-        # Resolve cluster alias to get namespace and context
         namespace, cluster_context = resolve_cluster(args.namespace, config)
 
         # CLI context takes precedence over cluster config context
         context = args.context if args.context else cluster_context
 
-        kube_client = KubeClient(kubeconfig=args.kubeconfig, context=context)
+        kube_client = CachedKubeClient(
+            kubeconfig=args.kubeconfig,
+            context=context,
+            page_size=args.page_size,
+            fast_parse=args.fast_parse,
+            pool=_client_pool(args),
+            namespace=namespace,
+        )
 
         check_config = args.check_config
         check_network = args.check_network
@@ -246,28 +1017,198 @@ def handle_security(args, config):
             check_config = True
             check_network = True
 
-        findings = run_security_checks(
-            kube_client=kube_client,
-            namespace=namespace,
-            check_config=check_config,
-            check_network=check_network,
-        )
+        checks = _select_checks(args, check_config, check_network)
 
-        output = SecurityFormatter.format_findings(findings, args.output)
-        print(output)
+        # Subscribe before the first scan so that no change is missed
+        scanner = IncrementalScanner(kube_client, namespace, checks)
+        scanner.subscribe()
 
-        critical_high = [
-            f for f in findings if f.get("severity") in ["CRITICAL", "HIGH"]
-        ]
-        if critical_high:
-            sys.exit(1)
+        SecurityFormatter.write_findings(scanner.scan(), args.output)
+
+        def emit(event, finding):
+            print(SecurityFormatter.format_change(event, finding, args.output))
+            sys.stdout.flush()
 
+        run_forever(scanner, emit)
+
+    except KeyboardInterrupt:
+        pass
     except ConnectionError as e:
         print(f"Error: Unable to connect to Kubernetes cluster: {e}", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if kube_client:
+            kube_client.stop()
+
+
+#
+# HTTP server keeping warm clients
+#
+def handle_serve(args, config):
+    from citrouille.server import CitrouilleService, serve
+
+    service = CitrouilleService(
+        config,
+        kubeconfig=args.kubeconfig,
+        context=args.context,
+        page_size=args.page_size,
+        fast_parse=args.fast_parse,
+        fetch_workers=args.fetch_workers,
+        scan_workers=args.scan_workers,
+        pool_size=args.pool_size,
+        keep_alive=args.keep_alive,
+    )
+    try:
+        serve(service, args.host, args.port)
+    except OSError as e:
+        print(
+            f"Error: Unable to listen on {args.host}:{args.port}: {e}", file=sys.stderr
+        )
+        sys.exit(1)
+
+
+#
+# Commands answered by a citrouille server
+# The options are sent as query parameters, cluster aliases are resolved by
+# the server with its own config file
+#
+def handle_remote(args):
+    from citrouille.remote import RemoteError, request
+
+    # The server scans with its own settings, and keeps its profile and
+    # metrics: the options of a local run would be ignored
+    local_options = [
+        option
+        for option, value in (
+            ("--from-snapshot", getattr(args, "from_snapshot", None)),
+            ("--clusters", getattr(args, "clusters", None)),
+            ("--all-clusters", getattr(args, "all_clusters", False)),
+            ("--profile", getattr(args, "profile", False)),
+            ("--profile-trace", getattr(args, "profile_trace", None)),
+            ("--metrics-file", getattr(args, "metrics_file", None)),
+            ("--timings", getattr(args, "timings", False)),
+            ("--cache-dir", getattr(args, "cache_dir", None)),
+            ("--cache-ttl", getattr(args, "cache_ttl", 0)),
+        )
+        if value
+    ]
+    if local_options:
+        print(
+            f"Error: --server cannot be used with {', '.join(local_options)}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    params = [
+        ("format", args.output),
+        ("context", args.context),
+        ("compact", "1" if args.compact else None),
+    ]
+    if args.command == "compare":
+        params += [("namespace1", args.namespace1), ("namespace2", args.namespace2)]
+    elif args.all_namespaces:
+        params.append(("all_namespaces", "1"))
+    else:
+        namespaces = [args.namespace] + getattr(args, "namespaces", [])
+        params += [("namespace", namespace) for namespace in namespaces]
+
+    if args.command == "security":
+        params += [
+            ("check_config", "1" if args.check_config else None),
+            ("check_network", "1" if args.check_network else None),
+            ("checks", args.checks),
+            ("skip_checks", args.skip_checks),
+        ]
+
+    try:
+        body, exit_code = request(args.server, args.command, params)
+    except RemoteError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    sys.stdout.write(body)
+    sys.stdout.flush()
+    if exit_code:
+        sys.exit(exit_code)
+
+
+#
+# _validate_clusters
+# Rejects the options that --clusters and --all-clusters replace or do not
+# support: the aliases set the context and the namespaces of each cluster
+#
+def _validate_clusters(args):
+    conflicts = [
+        option
+        for option, value in (
+            (
+                "a namespace",
+                args.namespace != "default" or getattr(args, "namespaces", []),
+            ),
+            ("--context", args.context),
+            ("--server", args.server),
+            ("--from-snapshot", args.from_snapshot),
+            ("--metrics-file", getattr(args, "metrics_file", None)),
+        )
+        if value
+    ]
+    if conflicts:
+        print(
+            "Error: --clusters and --all-clusters cannot be used with "
+            f"{', '.join(conflicts)}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+#
+# _resolve_cluster_groups
+# Resolves the aliases of --clusters, or every alias for --all-clusters, to
+# one group of aliases per context
+#
+def _resolve_cluster_groups(args, config):
+    from citrouille.multicluster import resolve_clusters
+
+    aliases = None
+    if not args.all_clusters:
+        aliases = [alias.strip() for alias in args.clusters.split(",") if alias.strip()]
+
+    try:
+        return resolve_clusters(config, aliases)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+#
+# _resolve_namespaces
+# Resolves cluster aliases to namespaces, which must all use the same context
+# The CLI context takes precedence over the contexts of the cluster config
+#
+def _resolve_namespaces(aliases, config, cli_context):
+    from citrouille.config import resolve_cluster
+
+    namespaces = []
+    contexts = set()
+    for alias in dict.fromkeys(aliases):
+        namespace, cluster_context = resolve_cluster(alias, config)
+        namespaces.append(namespace)
+        contexts.add(cluster_context)
+
+    if cli_context:
+        return namespaces, cli_context
+
+    if len(contexts) > 1:
+        print(
+            "Error: The given namespaces belong to different contexts, use --context to pick one",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    return namespaces, contexts.pop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,28 @@
+#
+# defaults.py
+#
+# Default values of the command line options.
+# They live apart from the modules using them so that the CLI can build its
+# parser, and answer --help and --version, without importing the kubernetes
+# client or the security checks.
+#
+
+# Default number of objects requested per list call (0 disables pagination)
+DEFAULT_PAGE_SIZE = 500
+
+# Default number of API requests in flight during the fetch stage
+DEFAULT_FETCH_WORKERS = 4
+
+# Default number of namespaces checked in parallel in a multi-namespace scan
+DEFAULT_SCAN_WORKERS = 4
+
+# Default number of clusters queried concurrently by --clusters and --all-clusters
+DEFAULT_CLUSTER_WORKERS = 4
+
+# Seconds a fetched list of cluster-scoped resources is reused, 0 to list them
+# on every run and only reuse their findings
+DEFAULT_CACHE_TTL = 0
+
+# Address the server listens on, local connections only by default
+DEFAULT_SERVE_HOST = "127.0.0.1"
+DEFAULT_SERVE_PORT = 8080
@@ -1,12 +1,25 @@
+import io
 import json
-from typing import List, Dict, Any
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, TextIO
 from datetime import datetime
 
+from citrouille.serialization import dumps
+
+# The security checks are imported by the writers of findings only, so that
+# inventory and compare do not load them
+if TYPE_CHECKING:
+    from citrouille.security_checks.finding import Finding
+
 #
 # formatters.py
 #
 # This file centralizes the routines used to format the tool output.
-# Currentl, JSON and tabulated cli out. are supported.
+# Deployments and comparisons are formatted as CLI tables or JSON documents.
+# Security findings are written by a FindingWriter as the checks produce
+# them, one at a time, in table, JSON, NDJSON or SARIF format: the table
+# lists them in the order they arrive, numbered, without grouping them by
+# severity, and only the counts by severity are kept for the final summary.
 #
 
 
@@ -14,6 +27,7 @@ class TableFormatter:
     #
     # format_deployments
     # Formats a list of deployments as a CLI table with columns for name, namespace, images, created date, and replicas
+    # Deployments tagged with their cluster get a leading cluster column
     #
     @staticmethod
     def format_deployments(deployments: List[Dict[str, Any]]) -> str:
@@ -21,6 +35,10 @@ class TableFormatter:
             return "No deployments found."
 
         # Calculate column widths
+        tagged = any("cluster" in d for d in deployments)
+        max_cluster = max(
+            [len("CLUSTER")] + [len(d.get("cluster", "")) for d in deployments]
+        )
         max_name = max(len(d["name"]) for d in deployments)
         max_namespace = max(len(d["namespace"]) for d in deployments)
         max_images = max(
@@ -36,7 +54,8 @@ class TableFormatter:
 
         # Create header
         header = (
-            f"{'NAME':<{max_name}}  "
+            (f"{'CLUSTER':<{max_cluster}}  " if tagged else "")
+            + f"{'NAME':<{max_name}}  "
             f"{'NAMESPACE':<{max_namespace}}  "
             f"{'IMAGES':<{max_images}}  "
             f"{'CREATED':<{max_created}}  "
@@ -53,8 +72,10 @@ class TableFormatter:
             )
             created_str = TableFormatter._format_timestamp(deployment["created"])
 
+            cluster_str = deployment.get("cluster", "")
             row = (
-                f"{deployment['name']:<{max_name}}  "
+                (f"{cluster_str:<{max_cluster}}  " if tagged else "")
+                + f"{deployment['name']:<{max_name}}  "
                 f"{deployment['namespace']:<{max_namespace}}  "
                 f"{images_str:<{max_images}}  "
                 f"{created_str:<{max_created}}  "
@@ -161,182 +182,358 @@ class TableFormatter:
 class JSONFormatter:
     #
     # format_deployments
-    # Formats a list of deployments as JSON with datetime objects converted to ISO format strings
+    # Formats a list of deployments as JSON, with datetime objects in ISO format
+    # compact drops the indentation
     #
     @staticmethod
-    def format_deployments(deployments: List[Dict[str, Any]]) -> str:
-        # Convert datetime objects to strings for JSON serialization
-        serializable_deployments = []
-        for deployment in deployments:
-            serializable_deployment = deployment.copy()
-            if deployment["created"]:
-                serializable_deployment["created"] = deployment["created"].isoformat()
-            else:
-                serializable_deployment["created"] = None
-            serializable_deployments.append(serializable_deployment)
-
-        return json.dumps(serializable_deployments, indent=2)
+    def format_deployments(
+        deployments: List[Dict[str, Any]], compact: bool = False
+    ) -> str:
+        return dumps(deployments, compact)
 
     #
     # format_comparison
-    # Formats namespace comparison results as JSON with datetime objects converted and summary statistics
+    # Formats namespace comparison results as JSON, with datetime objects in ISO
+    # format and summary statistics
+    # compact drops the indentation
     #
     @staticmethod
     def format_comparison(
-        comparison: Dict[str, List[Dict[str, Any]]], namespace1: str, namespace2: str
+        comparison: Dict[str, List[Dict[str, Any]]],
+        namespace1: str,
+        namespace2: str,
+        compact: bool = False,
     ) -> str:
+        missing = comparison.get("missing", [])
+        extra = comparison.get("extra", [])
+        changed = [
+            {
+                "name": change["name"],
+                "differences": change["differences"],
+                "ns1": change["ns1"],
+                "ns2": change["ns2"],
+            }
+            for change in comparison.get("changed", [])
+        ]
+
         output = {
             "namespace1": namespace1,
             "namespace2": namespace2,
-            "missing": [],
-            "extra": [],
-            "changed": [],
+            "missing": missing,
+            "extra": extra,
+            "changed": changed,
+            "summary": {
+                "missing_count": len(missing),
+                "extra_count": len(extra),
+                "changed_count": len(changed),
+                "identical": not missing and not extra and not changed,
+            },
         }
 
-        for dep in comparison.get("missing", []):
-            serializable_dep = dep.copy()
-            if dep.get("created"):
-                serializable_dep["created"] = dep["created"].isoformat()
-            output["missing"].append(serializable_dep)
+        return dumps(output, compact)
 
-        for dep in comparison.get("extra", []):
-            serializable_dep = dep.copy()
-            if dep.get("created"):
-                serializable_dep["created"] = dep["created"].isoformat()
-            output["extra"].append(serializable_dep)
 
-        for change in comparison.get("changed", []):
-            serializable_change = {
-                "name": change["name"],
-                "differences": change["differences"],
-                "ns1": change["ns1"].copy(),
-                "ns2": change["ns2"].copy(),
-            }
+# Severities of the findings, most severe first
+SEVERITY_ORDER = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
 
-            if change["ns1"].get("created"):
-                serializable_change["ns1"]["created"] = change["ns1"][
-                    "created"
-                ].isoformat()
-            if change["ns2"].get("created"):
-                serializable_change["ns2"]["created"] = change["ns2"][
-                    "created"
-                ].isoformat()
-
-            output["changed"].append(serializable_change)
-
-        output["summary"] = {
-            "missing_count": len(output["missing"]),
-            "extra_count": len(output["extra"]),
-            "changed_count": len(output["changed"]),
-            "identical": (
-                len(output["missing"]) == 0
-                and len(output["extra"]) == 0
-                and len(output["changed"]) == 0
-            ),
-        }
+# SARIF output
+SARIF_VERSION = "2.1.0"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_INFORMATION_URI = "https://github.com/Chelsea486MHz/citrouille"
+SARIF_LEVELS = {
+    "CRITICAL": "error",
+    "HIGH": "error",
+    "MEDIUM": "warning",
+    "LOW": "note",
+}
 
-        return json.dumps(output, indent=2)
 
+class FindingWriter:
+    # Base of the streaming writers of findings: write() is called once per
+    # finding as it is found, and close() once the findings are exhausted.
+    # Findings are counted by severity as they go, so that summaries never
+    # need the whole list.
 
-class SecurityFormatter:
-    #
-    # format_findings
-    # Formats security check findings as a CLI report grouped by severity
-    #
-    @staticmethod
-    def format_findings(
-        findings: List[Dict[str, Any]], output_format: str = "table"
-    ) -> str:
-        if output_format == "json":
-            return SecurityFormatter._format_findings_json(findings)
-        else:
-            return SecurityFormatter._format_findings_table(findings)
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.total = 0
+        self.counts: Dict[str, int] = {severity: 0 for severity in SEVERITY_ORDER}
 
-    @staticmethod
-    def _format_findings_table(findings: List[Dict[str, Any]]) -> str:
-        if not findings:
-            return "\n\u2713 No security issues found!\n"
+    def write(self, finding: "Finding"):
+        severity = finding.get("severity", "MEDIUM")
+        self.counts[severity] = self.counts.get(severity, 0) + 1
+        self.total += 1
+        self._write(finding)
+        # Show the first finding right away, the next ones follow the buffering
+        if self.total == 1:
+            self.stream.flush()
 
-        lines = []
-        lines.append
-        lines.append("\n" + "=" * 100)
-        lines.append("SECURITY AUDIT")
-        lines.append("=" * 100)
+    def close(self):
+        self.stream.flush()
 
-        # Group findings by severity
-        severity_order = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
-        findings_by_severity = {severity: [] for severity in severity_order}
+    def _write(self, finding: "Finding"):
+        raise NotImplementedError
 
-        for finding in findings:
-            severity = finding.get("severity", "MEDIUM")
-            findings_by_severity[severity].append(finding)
 
-        # Count findings
-        total_count = len(findings)
-        severity_counts = {
-            severity: len(findings_by_severity[severity]) for severity in severity_order
-        }
+class TableFindingWriter(FindingWriter):
+    def _write(self, finding: "Finding"):
+        if self.total == 1:
+            self.stream.write(
+                "\n" + "=" * 100 + "\nSECURITY AUDIT\n" + "=" * 100 + "\n\n"
+            )
 
-        # Display summary
-        lines.append(f"\nTotal findings: {total_count}")
+        lines = [
+            f"  [{self.total}] [{finding.get('severity', 'MEDIUM')}] "
+            f"{finding.get('check_name', 'Unknown')} ({finding.get('cwe', 'N/A')})",
+        ]
+        if finding.get("cluster"):
+            lines.append(f"      Cluster: {finding.get('cluster')}")
         lines.append(
-            f"  CRITICAL: {severity_counts['CRITICAL']}, "
-            f"HIGH: {severity_counts['HIGH']}, "
-            f"MEDIUM: {severity_counts['MEDIUM']}, "
-            f"LOW: {severity_counts['LOW']}"
+            f"      Resource: {finding.get('resource_type', 'N/A')} - "
+            f"{finding.get('resource_name', 'N/A')}"
         )
-        lines.append("")
-
-        # Display findings grouped by severity
-        for severity in severity_order:
-            severity_findings = findings_by_severity[severity]
-            if not severity_findings:
-                continue
-
-            lines.append("-" * 100)
-            lines.append(f"\n[{severity}] {len(severity_findings)} finding(s)")
-            lines.append("")
-
-            for idx, finding in enumerate(severity_findings, 1):
-                lines.append(
-                    f"  [{idx}] {finding.get('check_name', 'Unknown')} "
-                    f"({finding.get('cwe', 'N/A')})"
-                )
-                lines.append(
-                    f"      Resource: {finding.get('resource_type', 'N/A')} - "
-                    f"{finding.get('resource_name', 'N/A')}"
-                )
-                if finding.get("container") != "N/A":
-                    lines.append(f"      Container: {finding.get('container', 'N/A')}")
-                lines.append(f"      Issue: {finding.get('message', 'No message')}")
-                lines.append(f"      Details: {finding.get('details', 'No details')}")
-                lines.append("")
+        if finding.get("container") != "N/A":
+            lines.append(f"      Container: {finding.get('container', 'N/A')}")
+        lines.append(f"      Issue: {finding.get('message', 'No message')}")
+        lines.append(f"      Details: {finding.get('details', 'No details')}")
+        self.stream.write("\n".join(lines) + "\n\n")
+
+    def close(self):
+        if not self.total:
+            self.stream.write("\n\u2713 No security issues found!\n\n")
+        else:
+            counts = self.counts
+            self.stream.write(
+                "-" * 100 + "\n"
+                f"\nTotal findings: {self.total}\n"
+                f"  CRITICAL: {counts['CRITICAL']}, "
+                f"HIGH: {counts['HIGH']}, "
+                f"MEDIUM: {counts['MEDIUM']}, "
+                f"LOW: {counts['LOW']}\n" + "=" * 100 + "\n"
+            )
+        super().close()
 
-        lines.append("=" * 100)
-        return "\n".join(lines)
 
-    @staticmethod
-    def _format_findings_json(findings: List[Dict[str, Any]]) -> str:
-        if not findings:
-            return json.dumps({"findings": [], "summary": {"total": 0}}, indent=2)
+class JSONFindingWriter(FindingWriter):
+    # Writes the same document as json.dumps(..., indent=2) of
+    # {"findings": [...], "summary": {...}}, one finding at a time
 
-        # Group findings by severity
-        severity_order = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
-        findings_by_severity = {severity: [] for severity in severity_order}
+    def _write(self, finding: "Finding"):
+        from citrouille.security_checks.finding import as_dict
 
-        for finding in findings:
-            severity = finding.get("severity", "MEDIUM")
-            findings_by_severity[severity].append(finding)
+        prefix = '{\n  "findings": [\n' if self.total == 1 else ",\n"
+        self.stream.write(prefix + _indent(json.dumps(as_dict(finding), indent=2), 4))
 
-        output = {
-            "findings": findings,
-            "summary": {
-                "total": len(findings),
+    def close(self):
+        if not self.total:
+            self.stream.write(
+                json.dumps({"findings": [], "summary": {"total": 0}}, indent=2) + "\n"
+            )
+        else:
+            summary = {
+                "total": self.total,
                 "by_severity": {
-                    severity: len(findings_by_severity[severity])
-                    for severity in severity_order
+                    severity: self.counts[severity] for severity in SEVERITY_ORDER
                 },
+            }
+            summary_json = _indent(json.dumps(summary, indent=2), 2).lstrip()
+            self.stream.write(f'\n  ],\n  "summary": {summary_json}\n}}\n')
+        super().close()
+
+
+class NDJSONFindingWriter(FindingWriter):
+    # One finding per line, flushed as soon as it is written, for log pipelines
+
+    def write(self, finding: "Finding"):
+        super().write(finding)
+        self.stream.flush()
+
+    def _write(self, finding: "Finding"):
+        from citrouille.security_checks.finding import as_dict
+
+        self.stream.write(dumps(as_dict(finding), compact=True) + "\n")
+
+
+class SarifFindingWriter(FindingWriter):
+    # SARIF 2.1.0 log with a single run. The rules are the registered checks,
+    # described by their module metadata, and are written first so that the
+    # results can follow one per line as they arrive.
+
+    def __init__(self, stream: TextIO):
+        from citrouille.security_checks.registry import all_checks
+
+        super().__init__(stream)
+        self.rules = [
+            _sarif_rule(info.check_id, info.name, info.cwe, info.category)
+            for info in all_checks()
+        ]
+        self.rule_indexes = {rule["id"]: index for index, rule in enumerate(self.rules)}
+        self.started = False
+
+    def _start(self):
+        self.started = True
+        driver = {
+            "name": "citrouille",
+            "informationUri": SARIF_INFORMATION_URI,
+            "rules": self.rules,
+        }
+        header = json.dumps(
+            {"$schema": SARIF_SCHEMA, "version": SARIF_VERSION}, indent=2
+        ).removesuffix("\n}")
+        self.stream.write(
+            f'{header},\n  "runs": [\n    {{\n      "tool": {{"driver": '
+            f"{json.dumps(driver)}}},\n"
+            f'      "results": [\n'
+        )
+
+    def _write(self, finding: "Finding"):
+        if not self.started:
+            self._start()
+            prefix = ""
+        else:
+            prefix = ",\n"
+        self.stream.write(
+            prefix
+            + "        "
+            + json.dumps(self._result(finding), separators=(",", ":"))
+        )
+
+    def close(self):
+        if not self.started:
+            self._start()
+        self.stream.write("\n      ]\n    }\n  ]\n}\n")
+        super().close()
+
+    def _result(self, finding: "Finding") -> Dict[str, Any]:
+        check_id = finding.get("check_id")
+        severity = finding.get("severity", "MEDIUM")
+        container = finding.get("container", "N/A")
+        name = finding.get("resource_name", "N/A")
+        fully_qualified_name = f"{finding.get('resource_type', 'N/A')}/{name}"
+        if container and container != "N/A":
+            fully_qualified_name += f"/{container}"
+        cluster = finding.get("cluster")
+        # The same resource can exist in several clusters
+        if cluster:
+            fully_qualified_name = f"{cluster}/{fully_qualified_name}"
+
+        result: Dict[str, Any] = {
+            "ruleId": check_id,
+            "level": SARIF_LEVELS.get(severity, "warning"),
+            "message": {"text": finding.get("message", "No message")},
+            "locations": [
+                {
+                    "logicalLocations": [
+                        {
+                            "name": name,
+                            "fullyQualifiedName": fully_qualified_name,
+                            "kind": "resource",
+                        }
+                    ]
+                }
+            ],
+            "properties": {
+                "severity": severity,
+                "checkName": finding.get("check_name"),
+                "resourceType": finding.get("resource_type"),
+                "container": container,
+                "details": finding.get("details"),
             },
         }
+        if cluster:
+            result["properties"]["cluster"] = cluster
+        if check_id in self.rule_indexes:
+            result["ruleIndex"] = self.rule_indexes[check_id]
+        return result
+
+
+#
+# _sarif_rule
+# Describes a check as a SARIF reportingDescriptor
+#
+def _sarif_rule(check_id: str, name: str, cwe: str, category: str) -> Dict[str, Any]:
+    rule: Dict[str, Any] = {
+        "id": check_id,
+        "name": name,
+        "shortDescription": {"text": name},
+        "properties": {"cwe": cwe, "category": category, "tags": ["security", cwe]},
+    }
+    if cwe.startswith("CWE-"):
+        rule["helpUri"] = (
+            f"https://cwe.mitre.org/data/definitions/{cwe.removeprefix('CWE-')}.html"
+        )
+    return rule
+
+
+#
+# _indent
+# Indents every line of a text by a number of spaces
+#
+def _indent(text: str, spaces: int) -> str:
+    padding = " " * spaces
+    return "\n".join(padding + line for line in text.split("\n"))
+
+
+class SecurityFormatter:
+    # Writer of each output format, the table being the default
+    WRITERS = {
+        "table": TableFindingWriter,
+        "json": JSONFindingWriter,
+        "ndjson": NDJSONFindingWriter,
+        "sarif": SarifFindingWriter,
+    }
+
+    #
+    # write_findings
+    # Writes security check findings to a stream as they are produced, and
+    # returns the writer holding the counts of findings by severity
+    #
+    @staticmethod
+    def write_findings(
+        findings: Iterable["Finding"],
+        output_format: str = "table",
+        stream: Optional[TextIO] = None,
+    ) -> FindingWriter:
+        writer_class = SecurityFormatter.WRITERS.get(output_format, TableFindingWriter)
+        writer = writer_class(stream or sys.stdout)
+        for finding in findings:
+            writer.write(finding)
+        writer.close()
+        return writer
+
+    #
+    # format_findings
+    # Formats security check findings as a CLI report
+    #
+    @staticmethod
+    def format_findings(
+        findings: Iterable["Finding"], output_format: str = "table"
+    ) -> str:
+        buffer = io.StringIO()
+        SecurityFormatter.write_findings(findings, output_format, buffer)
+        # Without the final newline, as print() adds it
+        return buffer.getvalue().removesuffix("\n")
 
-        return json.dumps(output, indent=2)
+    #
+    # format_change
+    # Formats a finding added or resolved in watch mode as a single line
+    #
+    @staticmethod
+    def format_change(
+        event: str, finding: "Finding", output_format: str = "table"
+    ) -> str:
+        if output_format in ("json", "ndjson"):
+            from citrouille.security_checks.finding import as_dict
+
+            return json.dumps({"event": event, "finding": as_dict(finding)})
+
+        sign = "+" if event == "added" else "-"
+        container = finding.get("container", "N/A")
+        resource = f"{finding.get('resource_type', 'N/A')} {finding.get('resource_name', 'N/A')}"
+        if container != "N/A":
+            resource += f" ({container})"
+        return (
+            f"{sign} [{finding.get('severity', 'MEDIUM')}] "
+            f"{finding.get('check_name', 'Unknown')} ({finding.get('cwe', 'N/A')}) "
+            f"{resource}: {finding.get('message', 'No message')}"
+        )
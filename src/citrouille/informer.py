@@ -0,0 +1,374 @@
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from kubernetes import watch
+from kubernetes.client.exceptions import ApiException
+
+from citrouille.kube_client import (
+    ClientPool,
+    KubeClient,
+    DEFAULT_PAGE_SIZE,
+    RESOURCE_KINDS,
+)
+from citrouille.resource_view import ResourceView, view, view_type
+
+#
+# informer.py
+#
+# Watch-based local cache of Kubernetes resources.
+# An Informer lists a resource kind once, then keeps an in-memory store current
+# from the watch stream, resuming from the last seen resourceVersion (bookmarks
+# included) and listing again when the API server answers 410 Gone.
+# CachedKubeClient answers the KubeClient getters from those stores, so
+# repeated scans in a long-running process do not list anything.
+# Fields no check reads, such as the values of Secrets, are dropped from the
+# stored objects so that they are not kept in memory.
+#
+
+# Seconds a watch request stays open before being renewed
+DEFAULT_WATCH_TIMEOUT = 300
+
+# Seconds to wait before watching again after an unexpected error
+WATCH_RETRY_DELAY = 5
+
+# HTTP status returned when a resourceVersion is too old to watch from
+HTTP_GONE = 410
+
+# Event types passed to the handlers
+ADDED = "ADDED"
+MODIFIED = "MODIFIED"
+DELETED = "DELETED"
+
+EventHandler = Callable[[str, Any], None]
+
+# Model attributes dropped from the stored objects of a kind
+# The checks only read the metadata and the immutable flag of Secrets
+STRIPPED_FIELDS = {"secrets": ("data", "string_data")}
+
+# Annotation holding a full copy of the object when it was created with kubectl apply
+LAST_APPLIED_ANNOTATION = "kubectl.kubernetes.io/last-applied-configuration"
+
+
+class _RawWatch(watch.Watch):
+    # Watch leaving the event objects as parsed JSON, for fast-parse clients
+    # Without a return type, the events are not deserialized into models, while
+    # ERROR events are still raised as ApiException (410 Gone included)
+    def get_return_type(self, func):
+        return None
+
+
+class Informer:
+    def __init__(
+        self,
+        kube_client: KubeClient,
+        kind: str,
+        namespace: Optional[str] = None,
+        watch_timeout: int = DEFAULT_WATCH_TIMEOUT,
+    ):
+        self.kube_client = kube_client
+        self.kind = kind
+        self.namespace = namespace
+        self.watch_timeout = watch_timeout
+        self.resource_version: Optional[str] = None
+        self.handlers: List[EventHandler] = []
+
+        # namespace -> name -> object ("" for cluster-scoped objects)
+        self._store: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watch: Optional[watch.Watch] = None
+        self._thread: Optional[threading.Thread] = None
+
+    #
+    # add_handler
+    # Registers a function called with (event type, object) for every change to the store
+    #
+    def add_handler(self, handler: EventHandler):
+        self.handlers.append(handler)
+
+    #
+    # start
+    # Lists the resources, then keeps the store current from a background watch
+    # The initial list runs in the calling thread so that its errors are raised here
+    #
+    def start(self):
+        if self._thread:
+            return
+        self.relist()
+        self._thread = threading.Thread(
+            target=self._run, name=f"informer-{self.kind}", daemon=True
+        )
+        self._thread.start()
+
+    #
+    # stop
+    # Stops the background watch
+    #
+    def stop(self):
+        self._stopped.set()
+        if self._watch:
+            self._watch.stop()
+
+    #
+    # items
+    # Returns the cached objects, of one namespace or of all namespaces
+    #
+    def items(self, namespace: Optional[str] = None) -> List[Any]:
+        with self._lock:
+            if namespace is not None:
+                return list(self._store.get(namespace, {}).values())
+            return [obj for objects in self._store.values() for obj in objects.values()]
+
+    #
+    # get
+    # Returns one cached object, or None
+    #
+    def get(self, name: str, namespace: Optional[str] = None) -> Any:
+        with self._lock:
+            return self._store.get(namespace or "", {}).get(name)
+
+    #
+    # relist
+    # Replaces the store with a fresh list, notifying the handlers of the differences
+    #
+    def relist(self):
+        items, resource_version = self.kube_client.list_resources(
+            self.kind, self.namespace
+        )
+
+        store: Dict[str, Dict[str, Any]] = {}
+        stripped = STRIPPED_FIELDS.get(self.kind)
+        for obj in items:
+            if stripped:
+                _strip(obj, stripped)
+            namespace, name = _key(obj)
+            store.setdefault(namespace, {})[name] = obj
+
+        with self._lock:
+            previous = self._store
+            self._store = store
+            self.resource_version = resource_version
+
+        if self.handlers:
+            for event_type, obj in _diff(previous, store):
+                self._notify(event_type, obj)
+
+    #
+    # _run
+    # Watches for changes until stopped, listing again when the watch expires
+    #
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._watch_once()
+            except ApiException as e:
+                if self._stopped.is_set():
+                    break
+                if e.status == HTTP_GONE:
+                    self._relist_safely()
+                else:
+                    self._report(e)
+                    self._stopped.wait(WATCH_RETRY_DELAY)
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                self._report(e)
+                self._stopped.wait(WATCH_RETRY_DELAY)
+
+    #
+    # _watch_once
+    # Applies the events of one watch request, from the last seen resourceVersion
+    #
+    def _watch_once(self):
+        list_function, args, _ = self.kube_client.list_function(
+            self.kind, self.namespace
+        )
+        fast_parse = self.kube_client.fast_parse
+        view_class = view_type(RESOURCE_KINDS[self.kind][4]) if fast_parse else None
+
+        self._watch = _RawWatch() if fast_parse else watch.Watch()
+        for event in self._watch.stream(
+            list_function,
+            *args,
+            resource_version=self.resource_version,
+            allow_watch_bookmarks=True,
+            timeout_seconds=self.watch_timeout,
+        ):
+            event_type = event["type"]
+            obj = event["object"]
+
+            # Bookmarks are not deserialized, they only carry a resourceVersion
+            if event_type == "BOOKMARK":
+                if isinstance(obj, dict):
+                    obj = view(obj, RESOURCE_KINDS[self.kind][4])
+                self.resource_version = obj.metadata.resource_version
+                continue
+
+            if fast_parse:
+                obj = view_class(obj)
+            self._apply(event_type, obj)
+
+    #
+    # _apply
+    # Applies one watch event to the store
+    #
+    def _apply(self, event_type: str, obj: Any):
+        stripped = STRIPPED_FIELDS.get(self.kind)
+        if stripped:
+            _strip(obj, stripped)
+        namespace, name = _key(obj)
+        with self._lock:
+            if event_type == DELETED:
+                objects = self._store.get(namespace)
+                if objects:
+                    objects.pop(name, None)
+            else:
+                self._store.setdefault(namespace, {})[name] = obj
+            self.resource_version = obj.metadata.resource_version
+        self._notify(event_type, obj)
+
+    def _notify(self, event_type: str, obj: Any):
+        for handler in self.handlers:
+            handler(event_type, obj)
+
+    def _relist_safely(self):
+        try:
+            self.relist()
+        except Exception as e:
+            self._report(e)
+            self._stopped.wait(WATCH_RETRY_DELAY)
+
+    def _report(self, error: Exception):
+        print(f"Warning: Watch on {self.kind} failed: {error}", file=sys.stderr)
+
+
+#
+# _key
+# Returns the (namespace, name) key of an object, with "" for cluster-scoped objects
+#
+def _key(obj: Any) -> Tuple[str, str]:
+    return obj.metadata.namespace or "", obj.metadata.name
+
+
+#
+# _strip
+# Drops the given fields of an object, along with its last applied configuration
+# annotation, which holds a copy of them
+#
+def _strip(obj: Any, fields: Tuple[str, ...]):
+    if isinstance(obj, ResourceView):
+        data = obj.to_dict()
+        for field in fields:
+            data.pop(obj._model.attribute_map[field], None)
+            obj.__dict__.pop(field, None)
+        annotations = (data.get("metadata") or {}).get("annotations")
+    else:
+        for field in fields:
+            setattr(obj, field, None)
+        annotations = obj.metadata.annotations
+    if annotations:
+        annotations.pop(LAST_APPLIED_ANNOTATION, None)
+
+
+#
+# _diff
+# Yields the events turning one store into another
+#
+def _diff(
+    previous: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]]
+) -> Iterator[Tuple[str, Any]]:
+    for namespace, objects in current.items():
+        old_objects = previous.get(namespace, {})
+        for name, obj in objects.items():
+            old = old_objects.get(name)
+            if old is None:
+                yield ADDED, obj
+            elif old.metadata.resource_version != obj.metadata.resource_version:
+                yield MODIFIED, obj
+    for namespace, old_objects in previous.items():
+        objects = current.get(namespace, {})
+        for name, old in old_objects.items():
+            if name not in objects:
+                yield DELETED, old
+
+
+class CachedKubeClient(KubeClient):
+    def __init__(
+        self,
+        kubeconfig: Optional[str] = None,
+        context: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        fast_parse: bool = False,
+        namespace: Optional[str] = None,
+        watch_timeout: int = DEFAULT_WATCH_TIMEOUT,
+        pool: Optional[ClientPool] = None,
+    ):
+        super().__init__(
+            kubeconfig=kubeconfig,
+            context=context,
+            page_size=page_size,
+            fast_parse=fast_parse,
+            pool=pool,
+        )
+        self.namespace = namespace
+        self.watch_timeout = watch_timeout
+        self.informers: Dict[str, Informer] = {}
+        self._informers_lock = threading.Lock()
+        # kind -> lock held while its informer runs the initial list
+        self._start_locks: Dict[str, threading.Lock] = {}
+
+    #
+    # informer
+    # Returns the informer of a resource kind, starting it on first use
+    # Informers cover every namespace, unless the client is limited to one namespace
+    # Only callers of the same kind wait for its initial list, so that the
+    # first lists of different kinds run concurrently
+    #
+    def informer(self, kind: str) -> Informer:
+        with self._informers_lock:
+            informer = self.informers.get(kind)
+            if informer is not None:
+                return informer
+            start_lock = self._start_locks.setdefault(kind, threading.Lock())
+
+        with start_lock:
+            with self._informers_lock:
+                informer = self.informers.get(kind)
+            if informer is None:
+                namespace = self.namespace if RESOURCE_KINDS[kind][1] else None
+                informer = Informer(self, kind, namespace, self.watch_timeout)
+                informer.start()
+                with self._informers_lock:
+                    self.informers[kind] = informer
+            return informer
+
+    #
+    # stop
+    # Stops every informer
+    #
+    def stop(self):
+        with self._informers_lock:
+            for informer in self.informers.values():
+                informer.stop()
+
+    #
+    # iter_resources
+    # Yields the cached items of a resource kind
+    # Namespaces outside the cached scope are listed from the API
+    #
+    def iter_resources(
+        self, kind: str, namespace: Optional[str] = None
+    ) -> Iterator[Any]:
+        namespaced = RESOURCE_KINDS[kind][1] is not None
+        if namespaced and self.namespace is not None and namespace != self.namespace:
+            return super().iter_resources(kind, namespace)
+        return iter(self.informer(kind).items(namespace if namespaced else None))
+
+    def get_namespace_details(self, namespace: str) -> Any:
+        if self.namespace is not None:
+            return super().get_namespace_details(namespace)
+        ns = self.informer("namespaces").get(namespace)
+        if ns is None:
+            raise ApiException(f"Failed to get namespace {namespace}: not found")
+        return ns
@@ -0,0 +1,109 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+
+#
+# instrumentation.py
+#
+# Timing of the fetches, the checks and the phases of a run.
+# Observers added with add_observer() are told how long every span took, in
+# wall-clock and CPU time. Spans are only measured while an observer is
+# registered, so runs without observers call the instrumented code directly.
+#
+# Observers provide record_span(category, name, start, wall, cpu, allocated),
+# where start is the perf_counter() value when the span started, wall and cpu
+# are durations in seconds, and allocated is the growth of the memory traced by
+# tracemalloc during the span, in bytes (None when tracemalloc is not tracing).
+# It is called from the thread that ran the span.
+#
+# Categories:
+#   phase    stages of a command run (connect, fetch, report)
+#   fetch    fetch of one resource kind, including its deserialization
+#   request  one list request of a resource kind
+#   parse    parse of one list response, in fast-parse mode
+#   check    one call of a check, or the calls of the pod rules of a check
+#            during one walk of the deployments, summed into a single span
+#
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_observers: List[Any] = []
+_lock = threading.Lock()
+
+
+def add_observer(observer: Any):
+    with _lock:
+        if observer not in _observers:
+            _observers.append(observer)
+
+
+def remove_observer(observer: Any):
+    with _lock:
+        if observer in _observers:
+            _observers.remove(observer)
+
+
+#
+# observing
+# Tells whether any observer is registered, for code measuring its own spans
+#
+def observing() -> bool:
+    return bool(_observers)
+
+
+#
+# report
+# Reports a span measured by the caller to the observers
+#
+def report(
+    category: str,
+    name: str,
+    start: float,
+    wall: float,
+    cpu: float,
+    allocated: Optional[int] = None,
+):
+    for observer in list(_observers):
+        observer.record_span(category, name, start, wall, cpu, allocated)
+
+
+#
+# span
+# Measures the enclosed block and reports it to the observers
+#
+@contextmanager
+def span(category: str, name: str) -> Iterator[None]:
+    if not _observers:
+        yield
+        return
+
+    tracing = tracemalloc.is_tracing()
+    memory = tracemalloc.get_traced_memory()[0] if tracing else 0
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        cpu = time.thread_time() - cpu_start
+        wall = time.perf_counter() - start
+        allocated = tracemalloc.get_traced_memory()[0] - memory if tracing else None
+        report(category, name, start, wall, cpu, allocated)
+
+
+#
+# timed
+# Returns a check function reporting its calls to the observers, or the
+# function itself when there are none
+# Check functions return lists, so the span of a call covers all its work
+#
+def timed(check_id: str, function: F) -> F:
+    if not _observers:
+        return function
+
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with span("check", check_id):
+            return function(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
@@ -1,18 +1,195 @@
-from typing import Optional, List, Dict, Any
+import socket
+import threading
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from kubernetes import client, config
 from kubernetes.client.exceptions import ApiException
 
+from citrouille.defaults import DEFAULT_PAGE_SIZE
+from citrouille.instrumentation import span
+from citrouille.resource_view import ResourceView, view, view_type
+from citrouille.serialization import loads
+
 #
 # kube_client.py
 #
 # This file is used for a Kubernetes wrapper that we use in the rest of the code.
 #
+# Each client talks to the API server through its own ApiClient, configured
+# from its kubeconfig and context without touching the global configuration of
+# the kubernetes client, so that clients of several contexts can be used at the
+# same time. A ClientPool shares one ApiClient, and its urllib3 connection
+# pool, between the clients of the same kubeconfig and context.
+#
+
+# TCP keepalive timings of the connections with --keep-alive, in seconds:
+# idle time before the first probe, interval between probes, and probes sent
+# before the connection is dropped
+KEEP_ALIVE_OPTIONS = (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 6))
+
+# Resource kinds the client knows how to list
+# kind -> (API attribute, namespaced list method, cluster-wide list method, label, item model)
+RESOURCE_KINDS = {
+    "namespaces": (
+        "_core_v1",
+        None,
+        "list_namespace",
+        "namespaces",
+        "V1Namespace",
+    ),
+    "deployments": (
+        "_apps_v1",
+        "list_namespaced_deployment",
+        "list_deployment_for_all_namespaces",
+        "deployments",
+        "V1Deployment",
+    ),
+    "network_policies": (
+        "_networking_v1",
+        "list_namespaced_network_policy",
+        "list_network_policy_for_all_namespaces",
+        "network policies",
+        "V1NetworkPolicy",
+    ),
+    "roles": (
+        "_rbac_v1",
+        "list_namespaced_role",
+        "list_role_for_all_namespaces",
+        "roles",
+        "V1Role",
+    ),
+    "cluster_roles": (
+        "_rbac_v1",
+        None,
+        "list_cluster_role",
+        "cluster roles",
+        "V1ClusterRole",
+    ),
+    "role_bindings": (
+        "_rbac_v1",
+        "list_namespaced_role_binding",
+        "list_role_binding_for_all_namespaces",
+        "role bindings",
+        "V1RoleBinding",
+    ),
+    "cluster_role_bindings": (
+        "_rbac_v1",
+        None,
+        "list_cluster_role_binding",
+        "cluster role bindings",
+        "V1ClusterRoleBinding",
+    ),
+    "config_maps": (
+        "_core_v1",
+        "list_namespaced_config_map",
+        "list_config_map_for_all_namespaces",
+        "config maps",
+        "V1ConfigMap",
+    ),
+    "secrets": (
+        "_core_v1",
+        "list_namespaced_secret",
+        "list_secret_for_all_namespaces",
+        "secrets",
+        "V1Secret",
+    ),
+}
+
+
+#
+# new_api_client
+# Creates an ApiClient for a kubeconfig and context, with its own configuration
+# pool_size bounds the connections kept open to the API server (None for the
+# kubernetes client default), keep_alive enables TCP keepalive on them
+#
+def new_api_client(
+    kubeconfig: Optional[str] = None,
+    context: Optional[str] = None,
+    pool_size: Optional[int] = None,
+    keep_alive: bool = False,
+) -> client.ApiClient:
+    configuration = client.Configuration()
+    config.load_kube_config(
+        config_file=kubeconfig, context=context, client_configuration=configuration
+    )
+    if pool_size:
+        configuration.connection_pool_maxsize = pool_size
+    if keep_alive:
+        configuration.socket_options = _keep_alive_socket_options()
+    return client.ApiClient(configuration)
+
+
+#
+# _keep_alive_socket_options
+# Returns the urllib3 socket options enabling TCP keepalive, with the timings
+# of KEEP_ALIVE_OPTIONS the platform supports
+#
+def _keep_alive_socket_options() -> List[Tuple[int, int, int]]:
+    from urllib3.connection import HTTPConnection
+
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in KEEP_ALIVE_OPTIONS:
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class ClientPool:
+    def __init__(self, pool_size: Optional[int] = None, keep_alive: bool = False):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self._api_clients: Dict[Tuple[Optional[str], Optional[str]], Any] = {}
+        # One lock per kubeconfig and context, so that contexts load concurrently
+        self._locks: Dict[Tuple[Optional[str], Optional[str]], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    #
+    # api_client
+    # Returns the ApiClient of a kubeconfig and context, creating it on first use
+    # A failed creation is not kept, the next call tries again
+    #
+    def api_client(
+        self, kubeconfig: Optional[str] = None, context: Optional[str] = None
+    ) -> client.ApiClient:
+        key = (kubeconfig, context)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            api_client = self._api_clients.get(key)
+            if api_client is None:
+                api_client = new_api_client(
+                    kubeconfig, context, self.pool_size, self.keep_alive
+                )
+                self._api_clients[key] = api_client
+            return api_client
+
+    #
+    # close
+    # Closes the connections of every ApiClient of the pool
+    #
+    def close(self):
+        with self._lock:
+            api_clients = list(self._api_clients.values())
+            self._api_clients.clear()
+        for api_client in api_clients:
+            api_client.close()
 
 
 class KubeClient:
-    def __init__(self, kubeconfig: Optional[str] = None, context: Optional[str] = None):
+    def __init__(
+        self,
+        kubeconfig: Optional[str] = None,
+        context: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        fast_parse: bool = False,
+        pool: Optional[ClientPool] = None,
+    ):
         self.kubeconfig = kubeconfig
         self.context = context
+        self.page_size = page_size
+        self.fast_parse = fast_parse
+        # Pool sharing the ApiClient of the context, None for a client of its own
+        self.pool = pool
         self._apps_v1 = None
         self._core_v1 = None
         self._networking_v1 = None
@@ -21,155 +198,223 @@ class KubeClient:
 
     def _load_config(self):
         try:
-            if self.kubeconfig:
-                config.load_kube_config(
-                    config_file=self.kubeconfig, context=self.context
-                )
+            if self.pool is not None:
+                api_client = self.pool.api_client(self.kubeconfig, self.context)
             else:
-                config.load_kube_config(context=self.context)
+                api_client = new_api_client(self.kubeconfig, self.context)
 
-            self._apps_v1 = client.AppsV1Api()
-            self._core_v1 = client.CoreV1Api()
-            self._networking_v1 = client.NetworkingV1Api()
-            self._rbac_v1 = client.RbacAuthorizationV1Api()
+            self._apps_v1 = client.AppsV1Api(api_client)
+            self._core_v1 = client.CoreV1Api(api_client)
+            self._networking_v1 = client.NetworkingV1Api(api_client)
+            self._rbac_v1 = client.RbacAuthorizationV1Api(api_client)
 
         except config.ConfigException as e:
             raise ConnectionError(f"Failed to load kubeconfig: {e}")
         except Exception as e:
             raise ConnectionError(f"Failed to connect to Kubernetes: {e}")
 
+    #
+    # list_function
+    # Returns the list function of a resource kind for a namespace, or for all
+    # namespaces (or the whole cluster) when namespace is None, with its positional
+    # arguments and a description of the scope for error messages
+    #
+    def list_function(self, kind: str, namespace: Optional[str] = None):
+        api_name, namespaced_method, cluster_method, label, model = RESOURCE_KINDS[kind]
+        api = getattr(self, api_name)
+
+        if namespace is not None and namespaced_method:
+            return (
+                getattr(api, namespaced_method),
+                (namespace,),
+                f"{label} in namespace {namespace}",
+            )
+
+        scope = " across all namespaces" if namespaced_method else ""
+        return getattr(api, cluster_method), (), f"{label}{scope}"
+
+    #
+    # iter_pages
+    # Yields the items of a resource kind one page at a time, following continue tokens
+    # A namespace of None lists the kind across all namespaces (or cluster-wide)
+    # In fast_parse mode, items are ResourceViews over the raw JSON response
+    #
+    def iter_pages(
+        self, kind: str, namespace: Optional[str] = None
+    ) -> Iterator[List[Any]]:
+        for items, _ in self._iter_list_responses(kind, namespace):
+            yield items
+
+    #
+    # list_resources
+    # Lists every item of a resource kind, along with the resourceVersion of the list
+    # Watches started from that resourceVersion see every later change
+    #
+    def list_resources(
+        self, kind: str, namespace: Optional[str] = None
+    ) -> Tuple[List[Any], Optional[str]]:
+        items: List[Any] = []
+        resource_version = None
+        for page, resource_version in self._iter_list_responses(kind, namespace):
+            items.extend(page)
+        return items, resource_version
+
+    #
+    # _iter_list_responses
+    # Yields (items, resourceVersion) for each page of a list, following continue tokens
+    #
+    def _iter_list_responses(
+        self, kind: str, namespace: Optional[str] = None
+    ) -> Iterator[Tuple[List[Any], Optional[str]]]:
+        model = RESOURCE_KINDS[kind][4]
+        list_function, args, description = self.list_function(kind, namespace)
+
+        continue_token = None
+        while True:
+            kwargs = {}
+            if self.page_size:
+                kwargs["limit"] = self.page_size
+            if continue_token:
+                kwargs["_continue"] = continue_token
+            if self.fast_parse:
+                kwargs["_preload_content"] = False
+
+            try:
+                with span("request", kind):
+                    response = list_function(*args, **kwargs)
+            except ApiException as e:
+                raise ApiException(f"Failed to list {description}: {e}")
+
+            if self.fast_parse:
+                with span("parse", kind):
+                    items, continue_token, resource_version = self._parse_list(
+                        response.data, model
+                    )
+                yield items, resource_version
+            else:
+                metadata = response.metadata
+                continue_token = metadata._continue if metadata else None
+                yield response.items, metadata.resource_version if metadata else None
+
+            if not continue_token:
+                break
+
+    #
+    # _parse_list
+    # Parses a raw list response into item views, the continue token and the resourceVersion
+    #
+    @staticmethod
+    def _parse_list(data: bytes, model: str) -> Tuple[List[ResourceView], Any, Any]:
+        document = loads(data)
+        view_class = view_type(model)
+        items = [view_class(item) for item in document.get("items") or []]
+        metadata = document.get("metadata") or {}
+        return items, metadata.get("continue"), metadata.get("resourceVersion")
+
+    #
+    # iter_resources
+    # Yields the items of a resource kind one by one, fetching pages lazily
+    #
+    def iter_resources(
+        self, kind: str, namespace: Optional[str] = None
+    ) -> Iterator[Any]:
+        for page in self.iter_pages(kind, namespace):
+            yield from page
+
     def get_namespaces(self) -> List[str]:
-        try:
-            namespaces = self._core_v1.list_namespace()
-            return [ns.metadata.name for ns in namespaces.items]
-        except ApiException as e:
-            raise ApiException(f"Failed to list namespaces: {e}")
+        return [ns.metadata.name for ns in self.iter_resources("namespaces")]
 
-    def get_deployments(self, namespace: str = "default") -> List[Dict[str, Any]]:
-        try:
-            deployments = self._apps_v1.list_namespaced_deployment(namespace)
-            result = []
-
-            for deployment in deployments.items:
-                images = []
-                if deployment.spec.template.spec.containers:
-                    images = [
-                        container.image
-                        for container in deployment.spec.template.spec.containers
-                    ]
-
-                result.append(
-                    {
-                        "name": deployment.metadata.name,
-                        "namespace": deployment.metadata.namespace,
-                        "images": images,
-                        "created": deployment.metadata.creation_timestamp,
-                        "replicas": deployment.spec.replicas or 0,
-                    }
-                )
+    def iter_deployments(self, namespace: str = "default") -> Iterator[Dict[str, Any]]:
+        for deployment in self.iter_resources("deployments", namespace):
+            yield self._summarize_deployment(deployment)
 
-            return result
+    def iter_all_deployments(self) -> Iterator[Dict[str, Any]]:
+        for deployment in self.iter_resources("deployments"):
+            yield self._summarize_deployment(deployment)
 
-        except ApiException as e:
-            raise ApiException(
-                f"Failed to list deployments in namespace {namespace}: {e}"
-            )
+    def get_deployments(self, namespace: str = "default") -> List[Dict[str, Any]]:
+        return list(self.iter_deployments(namespace))
 
     def get_all_deployments(self) -> List[Dict[str, Any]]:
-        try:
-            deployments = self._apps_v1.list_deployment_for_all_namespaces()
-            result = []
-
-            for deployment in deployments.items:
-                images = []
-                if deployment.spec.template.spec.containers:
-                    images = [
-                        container.image
-                        for container in deployment.spec.template.spec.containers
-                    ]
-
-                result.append(
-                    {
-                        "name": deployment.metadata.name,
-                        "namespace": deployment.metadata.namespace,
-                        "images": images,
-                        "created": deployment.metadata.creation_timestamp,
-                        "replicas": deployment.spec.replicas or 0,
-                    }
-                )
+        return list(self.iter_all_deployments())
 
-            return result
-
-        except ApiException as e:
-            raise ApiException(f"Failed to list deployments across all namespaces: {e}")
+    def iter_raw_deployments(self, namespace: str = "default") -> Iterator[Any]:
+        return self.iter_resources("deployments", namespace)
 
     def get_raw_deployments(self, namespace: str = "default") -> List[Any]:
-        try:
-            deployments = self._apps_v1.list_namespaced_deployment(namespace)
-            return deployments.items
-        except ApiException as e:
-            raise ApiException(
-                f"Failed to list deployments in namespace {namespace}: {e}"
-            )
+        return list(self.iter_raw_deployments(namespace))
+
+    def iter_network_policies(self, namespace: str = "default") -> Iterator[Any]:
+        return self.iter_resources("network_policies", namespace)
 
     def get_network_policies(self, namespace: str = "default") -> List[Any]:
-        try:
-            policies = self._networking_v1.list_namespaced_network_policy(namespace)
-            return policies.items
-        except ApiException as e:
-            raise ApiException(
-                f"Failed to list network policies in namespace {namespace}: {e}"
-            )
+        return list(self.iter_network_policies(namespace))
+
+    def iter_roles(self, namespace: str = "default") -> Iterator[Any]:
+        return self.iter_resources("roles", namespace)
 
     def get_roles(self, namespace: str = "default") -> List[Any]:
-        try:
-            roles = self._rbac_v1.list_namespaced_role(namespace)
-            return roles.items
-        except ApiException as e:
-            raise ApiException(f"Failed to list roles in namespace {namespace}: {e}")
+        return list(self.iter_roles(namespace))
+
+    def iter_cluster_roles(self) -> Iterator[Any]:
+        return self.iter_resources("cluster_roles")
 
     def get_cluster_roles(self) -> List[Any]:
-        try:
-            cluster_roles = self._rbac_v1.list_cluster_role()
-            return cluster_roles.items
-        except ApiException as e:
-            raise ApiException(f"Failed to list cluster roles: {e}")
+        return list(self.iter_cluster_roles())
+
+    def iter_role_bindings(self, namespace: str = "default") -> Iterator[Any]:
+        return self.iter_resources("role_bindings", namespace)
 
     def get_role_bindings(self, namespace: str = "default") -> List[Any]:
-        try:
-            bindings = self._rbac_v1.list_namespaced_role_binding(namespace)
-            return bindings.items
-        except ApiException as e:
-            raise ApiException(
-                f"Failed to list role bindings in namespace {namespace}: {e}"
-            )
+        return list(self.iter_role_bindings(namespace))
+
+    def iter_cluster_role_bindings(self) -> Iterator[Any]:
+        return self.iter_resources("cluster_role_bindings")
 
     def get_cluster_role_bindings(self) -> List[Any]:
-        try:
-            bindings = self._rbac_v1.list_cluster_role_binding()
-            return bindings.items
-        except ApiException as e:
-            raise ApiException(f"Failed to list cluster role bindings: {e}")
+        return list(self.iter_cluster_role_bindings())
+
+    def iter_config_maps(self, namespace: str = "default") -> Iterator[Any]:
+        return self.iter_resources("config_maps", namespace)
 
     def get_config_maps(self, namespace: str = "default") -> List[Any]:
-        try:
-            config_maps = self._core_v1.list_namespaced_config_map(namespace)
-            return config_maps.items
-        except ApiException as e:
-            raise ApiException(
-                f"Failed to list config maps in namespace {namespace}: {e}"
-            )
+        return list(self.iter_config_maps(namespace))
+
+    def iter_secrets(self, namespace: str = "default") -> Iterator[Any]:
+        return self.iter_resources("secrets", namespace)
 
     def get_secrets(self, namespace: str = "default") -> List[Any]:
-        try:
-            secrets = self._core_v1.list_namespaced_secret(namespace)
-            return secrets.items
-        except ApiException as e:
-            raise ApiException(f"Failed to list secrets in namespace {namespace}: {e}")
+        return list(self.iter_secrets(namespace))
 
     def get_namespace_details(self, namespace: str) -> Any:
         try:
+            if self.fast_parse:
+                response = self._core_v1.read_namespace(
+                    namespace, _preload_content=False
+                )
+                return view(loads(response.data), "V1Namespace")
             ns = self._core_v1.read_namespace(namespace)
             return ns
         except ApiException as e:
             raise ApiException(f"Failed to get namespace {namespace}: {e}")
+
+    #
+    # _summarize_deployment
+    # Reduces a deployment object to the fields used by inventory and compare
+    #
+    @staticmethod
+    def _summarize_deployment(deployment: Any) -> Dict[str, Any]:
+        images = []
+        if deployment.spec.template.spec.containers:
+            images = [
+                container.image
+                for container in deployment.spec.template.spec.containers
+            ]
+
+        return {
+            "name": deployment.metadata.name,
+            "namespace": deployment.metadata.namespace,
+            "images": images,
+            "created": deployment.metadata.creation_timestamp,
+            "replicas": deployment.spec.replicas or 0,
+        }
@@ -0,0 +1,364 @@
+import bisect
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from citrouille.security_checks.fetcher import CLUSTER_SCOPE
+
+#
+# metrics.py
+#
+# Prometheus metrics of the security scans, in the text exposition format.
+# The serve command answers them on /metrics, and one-shot runs write them to
+# a file for the node_exporter textfile collector (--metrics-file).
+# Exported:
+# - findings of the last scan of each namespace, by check, severity and namespace
+# - fetch latency and fetch errors, by resource kind
+# - objects fetched by the last scan, by resource kind
+# - CPU time spent in each check, recorded through the check instrumentation
+# - scan durations
+#
+
+# Content type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram buckets, in seconds
+FETCH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SCAN_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+Labels = Tuple[str, ...]
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Labels, Any] = {}
+        self._lock = threading.Lock()
+
+    #
+    # samples
+    # Returns the (name, labels, value) samples of the metric
+    #
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            (self.name, dict(zip(self.label_names, labels)), value)
+            for labels, value in values
+        ]
+
+    #
+    # render
+    # Returns the metric in the text exposition format
+    #
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.help_text)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, labels: Labels = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, labels: Labels = ()):
+        with self._lock:
+            self._values[labels] = value
+
+    #
+    # replace
+    # Replaces the series matching a predicate on their labels with new values
+    #
+    def replace(self, matches: Any, values: Dict[Labels, float]):
+        with self._lock:
+            for labels in [labels for labels in self._values if matches(labels)]:
+                del self._values[labels]
+            self._values.update(values)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = SCAN_BUCKETS,
+    ):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Labels = ()):
+        with self._lock:
+            counts, total, count = self._values.get(
+                labels, ([0] * len(self.buckets), 0.0, 0)
+            )
+            index = bisect.bisect_left(self.buckets, value)
+            # Values above the last bucket only count in +Inf
+            if index < len(counts):
+                counts[index] += 1
+            self._values[labels] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = sorted(
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self._values.items()
+            )
+        samples = []
+        for labels, counts, total, count in values:
+            base = dict(zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = dict(base, le=_format_value(bound))
+                samples.append((f"{self.name}_bucket", bucket_labels, cumulative))
+            samples.append((f"{self.name}_bucket", dict(base, le="+Inf"), count))
+            samples.append((f"{self.name}_sum", base, total))
+            samples.append((f"{self.name}_count", base, count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    #
+    # render
+    # Returns every metric in the text exposition format
+    #
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self.metrics)
+
+
+class ScanMetrics:
+    def __init__(self):
+        self.registry = Registry()
+        self.findings = self.registry.register(
+            Gauge(
+                "citrouille_findings",
+                "Findings of the last scan of each namespace",
+                ("check_id", "severity", "namespace"),
+            )
+        )
+        self.fetch_duration = self.registry.register(
+            Histogram(
+                "citrouille_fetch_duration_seconds",
+                "Time spent listing the resources of a kind",
+                ("kind",),
+                FETCH_BUCKETS,
+            )
+        )
+        self.fetch_errors = self.registry.register(
+            Counter(
+                "citrouille_fetch_errors_total",
+                "Failed fetches of the resources of a kind",
+                ("kind",),
+            )
+        )
+        self.objects = self.registry.register(
+            Gauge(
+                "citrouille_objects",
+                "Objects fetched by the last scan",
+                ("kind",),
+            )
+        )
+        self.check_cpu = self.registry.register(
+            Counter(
+                "citrouille_check_cpu_seconds_total",
+                "CPU time spent in each check",
+                ("check_id",),
+            )
+        )
+        self.scan_duration = self.registry.register(
+            Histogram(
+                "citrouille_scan_duration_seconds",
+                "Duration of the security scans, from the fetch to the last finding",
+                buckets=SCAN_BUCKETS,
+            )
+        )
+        self.scans = self.registry.register(
+            Counter("citrouille_scans_total", "Security scans run")
+        )
+
+    #
+    # record_span
+    # Instrumentation observer, see instrumentation.py
+    #
+    def record_span(
+        self,
+        category: str,
+        name: str,
+        start: float,
+        wall: float,
+        cpu: float,
+        allocated: Optional[int],
+    ):
+        if category == "check":
+            self.check_cpu.inc(cpu, (name,))
+
+    #
+    # record_fetch
+    # Records the fetch latencies, errors and object counts of a scan
+    #
+    def record_fetch(self, resources: Any):
+        for kind, elapsed in resources.timings.items():
+            self.fetch_duration.observe(elapsed, (kind,))
+        for kind in resources.errors:
+            self.fetch_errors.inc(1, (kind,))
+        for kind, count in object_counts(resources).items():
+            self.objects.set(count, (kind,))
+
+    #
+    # observe
+    # Records the fetch of a scan started at started (perf_counter() value),
+    # and returns its findings, counted as they are read
+    # The findings and the duration are recorded once every finding was read
+    #
+    def observe(
+        self, resources: Any, findings: Iterable[Any], started: float
+    ) -> Iterator[Any]:
+        self.record_fetch(resources)
+        return self._count(resources, findings, started)
+
+    def _count(
+        self, resources: Any, findings: Iterable[Any], started: float
+    ) -> Iterator[Any]:
+        counts: Dict[Labels, float] = {}
+        for finding in findings:
+            key = (
+                finding["check_id"],
+                finding["severity"],
+                finding_namespace(finding),
+            )
+            counts[key] = counts.get(key, 0) + 1
+            yield finding
+
+        # The series of the scanned namespaces are replaced, others are kept
+        scanned = set(scanned_namespaces(resources)) | {""}
+        self.findings.replace(lambda labels: labels[2] in scanned, counts)
+        self.scan_duration.observe(time.perf_counter() - started)
+        self.scans.inc()
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+# Metrics of the process
+METRICS = ScanMetrics()
+
+
+#
+# finding_namespace
+# Returns the namespace of a finding, or "" for cluster-scoped resources
+#
+def finding_namespace(finding: Any) -> str:
+    name = finding.get("resource_name") or ""
+    if finding.get("resource_type") == "Namespace":
+        return name
+    namespace, separator, _ = name.partition("/")
+    # Cluster-scoped RBAC objects are named cluster-wide/<name> by their checks
+    if not separator or namespace == CLUSTER_SCOPE:
+        return ""
+    return namespace
+
+
+#
+# scanned_namespaces
+# Lists the namespaces of a ResourceBundle or ClusterResources
+#
+def scanned_namespaces(resources: Any) -> List[str]:
+    namespaces = getattr(resources, "namespaces", None)
+    if namespaces is not None:
+        return list(namespaces)
+    return [resources.namespace]
+
+
+#
+# object_counts
+# Counts the fetched objects of each kind of a ResourceBundle or
+# ClusterResources
+#
+def object_counts(resources: Any) -> Dict[str, int]:
+    bundles = list(getattr(resources, "bundles", {}).values())
+    cluster = getattr(resources, "cluster", None)
+    if cluster is not None:
+        bundles.append(cluster)
+    if not bundles:
+        bundles = [resources]
+        if resources.shared is not None:
+            bundles.append(resources.shared)
+
+    counts: Dict[str, int] = {}
+    for bundle in bundles:
+        for kind, result in bundle.resources.items():
+            count = len(result) if isinstance(result, list) else 1
+            counts[kind] = counts.get(kind, 0) + count
+    return counts
+
+
+#
+# write_textfile
+# Writes the metrics to a file for the node_exporter textfile collector,
+# replacing it atomically so that the collector never reads a partial file
+#
+def write_textfile(path: str, metrics: Optional[ScanMetrics] = None):
+    text = (metrics or METRICS).render()
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label(str(value))}"' for name, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from citrouille.config import resolve_cluster
+from citrouille.defaults import DEFAULT_CLUSTER_WORKERS
+
+#
+# multicluster.py
+#
+# Fan-out of inventory and security over several cluster aliases of the config
+# file (--clusters and --all-clusters).
+# Aliases are grouped by context, and each context gets one client and one
+# task, so that aliases of the same cluster share their fetches. Tasks run
+# concurrently, with a bounded number of clusters in flight, and their results
+# come back in the order of the aliases, tagged with the cluster they come from.
+#
+
+
+class ClusterGroup:
+    def __init__(self, context: Optional[str]):
+        # Context of the aliases, None for the current context
+        self.context = context
+        self.aliases: List[str] = []
+        self.namespaces: List[str] = []
+
+    #
+    # name
+    # Tag of the results of the group: its aliases, which name one cluster
+    #
+    @property
+    def name(self) -> str:
+        return ",".join(self.aliases)
+
+    def __repr__(self) -> str:
+        return f"ClusterGroup({self.context!r}, {self.aliases!r})"
+
+
+#
+# resolve_clusters
+# Resolves cluster aliases of the config file to one group per context, in the
+# order of the aliases, or every configured alias when aliases is None
+# Raises ValueError for unknown aliases
+#
+def resolve_clusters(
+    config: Dict[str, Any], aliases: Optional[Iterable[str]] = None
+) -> List[ClusterGroup]:
+    clusters = config.get("clusters")
+    if not isinstance(clusters, dict) or not clusters:
+        raise ValueError("No cluster aliases in the config file")
+
+    if aliases is None:
+        aliases = list(clusters)
+    aliases = list(dict.fromkeys(aliases))
+    if not aliases:
+        raise ValueError("No cluster aliases given")
+    unknown = [alias for alias in aliases if alias not in clusters]
+    if unknown:
+        raise ValueError(f"Unknown cluster alias: {', '.join(unknown)}")
+
+    groups: Dict[Optional[str], ClusterGroup] = {}
+    for alias in aliases:
+        namespace, context = resolve_cluster(alias, config)
+        group = groups.get(context)
+        if group is None:
+            group = groups[context] = ClusterGroup(context)
+        group.aliases.append(alias)
+        if namespace not in group.namespaces:
+            group.namespaces.append(namespace)
+    return list(groups.values())
+
+
+#
+# fan_out
+# Runs task(client, group) for every group, with at most max_workers groups in
+# flight, and yields (group, result, error) in the order of the groups
+# connect(group) creates the client of a group; a failed connection or task
+# is yielded as the error of its group without stopping the others
+#
+def fan_out(
+    groups: List[ClusterGroup],
+    connect: Callable[[ClusterGroup], Any],
+    task: Callable[[Any, ClusterGroup], Any],
+    max_workers: Optional[int] = DEFAULT_CLUSTER_WORKERS,
+) -> Iterator[Tuple[ClusterGroup, Any, Optional[Exception]]]:
+    if not groups:
+        return
+
+    def run(group: ClusterGroup) -> Tuple[Any, Optional[Exception]]:
+        try:
+            client = connect(group)
+            return task(client, group), None
+        except Exception as e:
+            return None, e
+
+    workers = max(1, min(max_workers or len(groups), len(groups)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, group) for group in groups]
+        for group, future in zip(groups, futures):
+            result, error = future.result()
+            yield group, result, error
+
+
+#
+# tag_deployments
+# Adds the cluster of deployment summaries to them
+#
+def tag_deployments(
+    deployments: Iterable[Dict[str, Any]], cluster: str
+) -> List[Dict[str, Any]]:
+    return [dict(deployment, cluster=cluster) for deployment in deployments]
+
+
+#
+# tag_findings
+# Yields the dict form of findings, with their cluster as first key
+#
+def tag_findings(findings: Iterable[Any], cluster: str) -> Iterator[Dict[str, Any]]:
+    # Imported here so that inventory does not load the security checks
+    from citrouille.security_checks.finding import as_dict
+
+    for finding in findings:
+        yield {"cluster": cluster, **as_dict(finding)}
@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from citrouille.instrumentation import add_observer, remove_observer
+from citrouille.serialization import dumps
+
+#
+# profiler.py
+#
+# Profile of a run (--profile and --profile-trace).
+# The profiler observes every instrumented span (see instrumentation.py) and
+# traces the memory allocations with tracemalloc once asked to. It reports a
+# breakdown of the time and memory spent in each phase, fetch and check, as a
+# table or JSON, and writes the spans as a Chrome trace-event file, which can
+# be opened in chrome://tracing, Perfetto or speedscope.
+#
+# The pod rules of a check are reported as one span per walk of the
+# deployments (see engine.py), and spans are summed by category and name as
+# they are recorded: only --profile-trace keeps every span, for its timeline.
+#
+# Spans of concurrent fetches and scans overlap, so their times can add up to
+# more than the run itself, and the memory they allocate is counted process
+# wide: run with --fetch-workers 1 and --scan-workers 1 for exact allocations.
+#
+
+# Order of the categories in the breakdown
+CATEGORIES = ("phase", "fetch", "request", "parse", "check")
+
+# Recorded span: (category, name, start, wall, cpu, allocated, thread id)
+# allocated is None for the spans run while allocations were not traced
+Span = Tuple[str, str, float, float, float, Optional[int], int]
+
+
+class Profiler:
+    def __init__(self, keep_spans: bool = True):
+        # Whether every span is kept for trace_events(), or only their totals
+        self.keep_spans = keep_spans
+        self.spans: List[Span] = []
+        # (category, name) -> summary entry, see summary()
+        self._totals: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.threads: Dict[int, str] = {}
+        self.started: Optional[float] = None
+        self.elapsed = 0.0
+        # Whether allocations were traced, and the peak of the traced memory
+        self.trace_memory = False
+        self.peak_memory = 0
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.perf_counter()
+        add_observer(self)
+
+    #
+    # trace_allocations
+    # Starts tracing the memory allocations, for the spans starting from now on
+    # Tracing makes imports many times slower, so it is best started once the
+    # kubernetes client was loaded
+    #
+    def trace_allocations(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.trace_memory = True
+
+    def stop(self):
+        remove_observer(self)
+        if self.started is not None:
+            self.elapsed = time.perf_counter() - self.started
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    #
+    # record_span
+    # Instrumentation observer, see instrumentation.py
+    #
+    def record_span(
+        self,
+        category: str,
+        name: str,
+        start: float,
+        wall: float,
+        cpu: float,
+        allocated: Optional[int],
+    ):
+        thread = threading.current_thread()
+        with self._lock:
+            entry = self._totals.get((category, name))
+            if entry is None:
+                entry = self._totals[(category, name)] = {
+                    "category": category,
+                    "name": name,
+                    "calls": 0,
+                    "wall": 0.0,
+                    "cpu": 0.0,
+                    "allocated": None,
+                }
+            entry["calls"] += 1
+            entry["wall"] += wall
+            entry["cpu"] += cpu
+            if allocated is not None:
+                entry["allocated"] = (entry["allocated"] or 0) + allocated
+
+            if self.keep_spans:
+                self.threads.setdefault(thread.ident or 0, thread.name)
+                self.spans.append(
+                    (category, name, start, wall, cpu, allocated, thread.ident or 0)
+                )
+
+    #
+    # summary
+    # Returns the spans summed by category and name, ordered by category, then
+    # by decreasing wall-clock time
+    #
+    def summary(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            totals = [dict(entry) for entry in self._totals.values()]
+        return sorted(
+            totals,
+            key=lambda entry: (_category_rank(entry["category"]), -entry["wall"]),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "elapsed": self.elapsed,
+            "peak_memory": self.peak_memory,
+            "spans": self.summary(),
+        }
+
+    #
+    # format_table
+    # Formats the breakdown as a table
+    #
+    def format_table(self) -> str:
+        headers = ("CATEGORY", "NAME", "CALLS", "WALL (s)", "CPU (s)", "% RUN", "ALLOC")
+        rows = [
+            (
+                entry["category"],
+                entry["name"],
+                str(entry["calls"]),
+                f"{entry['wall']:.3f}",
+                f"{entry['cpu']:.3f}",
+                f"{100 * entry['wall'] / self.elapsed:.1f}" if self.elapsed else "-",
+                (
+                    _format_bytes(entry["allocated"])
+                    if entry["allocated"] is not None
+                    else "-"
+                ),
+            )
+            for entry in self.summary()
+        ]
+
+        widths = [
+            max([len(header)] + [len(row[index]) for row in rows])
+            for index, header in enumerate(headers)
+        ]
+        # Text columns are left aligned, numbers right aligned
+        aligns = ("<", "<", ">", ">", ">", ">", ">")
+
+        def line(values: Tuple[str, ...]) -> str:
+            return "  ".join(
+                f"{value:{align}{width}}"
+                for value, align, width in zip(values, aligns, widths)
+            ).rstrip()
+
+        header = line(headers)
+        lines = ["PROFILE", header, "-" * len(header)]
+        lines.extend(line(row) for row in rows)
+        lines.append("-" * len(header))
+        lines.append(f"Total: {self.elapsed:.3f}s")
+        if self.trace_memory:
+            lines.append(f"Peak traced memory: {_format_bytes(self.peak_memory)}")
+        return "\n".join(lines)
+
+    #
+    # trace_events
+    # Returns the spans in the Chrome trace-event format, with timestamps in
+    # microseconds from the start of the profile
+    #
+    def trace_events(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        origin = self.started or 0.0
+        with self._lock:
+            spans = list(self.spans)
+            threads = dict(self.threads)
+
+        events: List[Dict[str, Any]] = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in threads.items()
+        ]
+        for category, name, start, wall, cpu, allocated, tid in spans:
+            args: Dict[str, Any] = {"cpu_ms": round(cpu * 1000, 3)}
+            if allocated is not None:
+                args["allocated_bytes"] = allocated
+            events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": round((start - origin) * 1e6, 3),
+                    "dur": round(wall * 1e6, 3),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+#
+# write_trace
+# Writes the spans of a profile to a Chrome trace-event file
+#
+def write_trace(profiler: Profiler, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(dumps(profiler.trace_events(), compact=True))
+
+
+def _category_rank(category: str) -> int:
+    if category in CATEGORIES:
+        return CATEGORIES.index(category)
+    return len(CATEGORIES)
+
+
+def _format_bytes(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
@@ -0,0 +1,64 @@
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import List, Optional, Tuple
+
+#
+# remote.py
+#
+# Client of the citrouille server (see server.py).
+# The commands send their options as query parameters and print the body of
+# the answer, so that a warm server does the work instead of the command.
+# Only the standard library is imported, to keep the client start fast.
+#
+
+# Seconds to wait for the server to answer
+DEFAULT_TIMEOUT = 300
+
+# Header carrying the exit code of the command, see server.py
+EXIT_CODE_HEADER = "X-Citrouille-Exit-Code"
+
+
+class RemoteError(Exception):
+    pass
+
+
+#
+# request
+# Sends a request to a citrouille server and returns (body, exit code)
+# params lists (name, value) pairs, names can repeat and None values are skipped
+#
+def request(
+    server_url: str,
+    endpoint: str,
+    params: List[Tuple[str, Optional[str]]],
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Tuple[str, int]:
+    query = urllib.parse.urlencode(
+        [(name, value) for name, value in params if value is not None]
+    )
+    url = f"{server_url.rstrip('/')}/{endpoint}?{query}"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = response.read().decode("utf-8")
+            exit_code = int(response.headers.get(EXIT_CODE_HEADER) or 0)
+    except urllib.error.HTTPError as e:
+        raise RemoteError(_error_message(e)) from e
+    except (urllib.error.URLError, OSError) as e:
+        reason = getattr(e, "reason", e)
+        raise RemoteError(
+            f"Unable to reach citrouille server at {server_url}: {reason}"
+        ) from e
+    return body, exit_code
+
+
+#
+# _error_message
+# Returns the message of an error answer, sent as {"error": message}
+#
+def _error_message(error: urllib.error.HTTPError) -> str:
+    try:
+        return json.loads(error.read().decode("utf-8"))["error"]
+    except (ValueError, KeyError, TypeError, OSError):
+        return f"citrouille server answered {error.code} {error.reason}"
@@ -0,0 +1,140 @@
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from kubernetes import client
+
+#
+# resource_view.py
+#
+# Lightweight read-only views over the plain dicts of a Kubernetes JSON
+# response. Attributes are resolved lazily with the attribute_map and
+# openapi_types tables of the generated kubernetes models, so a view of a
+# Deployment answers `deployment.spec.template.spec.host_pid` like a
+# V1Deployment would, without building the model objects.
+#
+
+
+class ResourceView:
+    # Per-model subclasses (see _view_class) add one _Field per model attribute
+    _model: Any = None
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = data
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
+
+    #
+    # to_dict
+    # Returns the underlying JSON object
+    #
+    def to_dict(self) -> Dict[str, Any]:
+        return self._data
+
+
+class _Field:
+    # Non-data descriptor: the converted value is stored on the instance on first
+    # read, so later reads are plain attribute lookups
+    __slots__ = ("name", "key", "kind", "inner")
+
+    def __init__(self, name: str, key: str, kind: str, inner: Any):
+        self.name = name
+        self.key = key
+        self.kind = kind
+        self.inner = inner
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None:
+            return self
+        value = instance._data.get(self.key)
+        if value is not None:
+            kind = self.kind
+            if kind == "model":
+                value = self.inner(value)
+            elif kind != "plain":
+                value = _convert(value, kind, self.inner)
+        instance.__dict__[self.name] = value
+        return value
+
+
+#
+# view
+# Wraps a JSON object in a view of the given model (class or class name)
+#
+def view(data: Dict[str, Any], model: Any) -> ResourceView:
+    return view_type(model)(data)
+
+
+#
+# view_type
+# Returns the view class of a model (class or class name), to wrap many objects at once
+#
+def view_type(model: Any) -> type:
+    if isinstance(model, str):
+        model = getattr(client, model)
+    return _view_class(model)
+
+
+#
+# _view_class
+# Builds the view class of a model, with one field descriptor per model attribute
+#
+@lru_cache(maxsize=None)
+def _view_class(model: Any) -> type:
+    namespace = {"_model": model}
+    for name, key in model.attribute_map.items():
+        namespace[name] = _Field(name, key, *_parse_type(model.openapi_types[name]))
+    return type(f"{model.__name__}View", (ResourceView,), namespace)
+
+
+#
+# _parse_type
+# Splits an openapi type name into (kind, inner type), for instance
+# "list[V1Container]" -> ("list", ("model", V1ContainerView)), "V1PodSpec" -> ("model", V1PodSpecView)
+#
+@lru_cache(maxsize=None)
+def _parse_type(type_name: str) -> Tuple[str, Any]:
+    if type_name.startswith(("list[", "List[")):
+        inner = _parse_type(type_name[5:-1])
+        return ("plain", None) if inner[0] == "plain" else ("list", inner)
+    if type_name.startswith(("dict(", "Dict[")):
+        return "plain", None
+    if type_name in ("datetime", "date"):
+        return type_name, None
+    model = getattr(client, type_name, None)
+    if model is not None and hasattr(model, "attribute_map"):
+        return "model", _LazyViewClass(model)
+    return "plain", None
+
+
+class _LazyViewClass:
+    # Resolves a nested model's view class on first use, so building a view
+    # class does not walk the whole model graph up front
+    __slots__ = ("model", "view_class")
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.view_class = None
+
+    def __call__(self, data: Dict[str, Any]) -> ResourceView:
+        return self.resolve()(data)
+
+    def resolve(self) -> type:
+        if self.view_class is None:
+            self.view_class = _view_class(self.model)
+        return self.view_class
+
+
+def _convert(value: Any, kind: str, inner: Any) -> Any:
+    if kind == "list":
+        inner_kind, inner_type = inner
+        if inner_kind == "model":
+            view_class = inner_type.resolve()
+            return [view_class(item) for item in value]
+        return [_convert(item, inner_kind, inner_type) for item in value]
+    if kind == "datetime":
+        return datetime.fromisoformat(value)
+    if kind == "date":
+        return date.fromisoformat(value)
+    return value
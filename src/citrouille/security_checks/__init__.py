@@ -1,27 +1,31 @@
-from typing import List, Dict, Any
-from .check_01_privileged_containers import check as check_privileged
-from .check_02_host_pid import check as check_host_pid
-from .check_03_host_ipc import check as check_host_ipc
-from .check_04_host_network import check as check_host_network
-from .check_05_run_as_root import check as check_run_as_root
-from .check_06_privilege_escalation import check as check_privilege_escalation
-from .check_07_capabilities import check as check_capabilities
-from .check_08_resource_limits import check as check_resource_limits
-from .check_09_host_path import check as check_host_path
-from .check_10_readonly_filesystem import check as check_readonly_filesystem
-from .check_11_seccomp import check as check_seccomp
-from .check_12_service_account_token import check as check_service_account_token
-from .check_13_image_tags import check as check_image_tags
-from .check_14_hardcoded_secrets import check as check_hardcoded_secrets
-from .check_15_pss_enforcement import check as check_pss_enforcement
-from .check_16_immutable_config import check as check_immutable_config
-from .check_17_emptydir_limits import check as check_emptydir_limits
-from .check_18_proc_mount import check as check_proc_mount
-from .check_19_rbac_roles import check as check_rbac_roles
-from .check_20_rbac_bindings import check as check_rbac_bindings
-from .check_21_shared_process_ns import check as check_shared_process_ns
-from .check_22_sysctls import check as check_sysctls
-from .check_23_network_policies import check as check_network_policies
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Iterator, List, Optional, Tuple
+from citrouille.defaults import DEFAULT_SCAN_WORKERS
+from citrouille.instrumentation import timed
+from .fetcher import (
+    DEFAULT_FETCH_WORKERS,
+    ClusterResources,
+    FetchError,
+    NamespaceNotFoundError,
+    ResourceBundle,
+    fetch_cluster_resources,
+    fetch_resources,
+    is_cluster_scoped,
+    split_cluster_scoped,
+)
+from .cluster_cache import DEFAULT_CACHE_TTL, ClusterCache
+from .engine import PodSpecWalker
+from .finding import CheckMetadata, Finding
+from .registry import (
+    CheckInfo,
+    all_checks,
+    categories_for,
+    get_check,
+    kinds_for,
+    parse_check_ids,
+    select_checks,
+)
 
 #
 # __init__.py
@@ -29,50 +33,332 @@ from .check_23_network_policies import check as check_network_policies
 # Main entry point for security checks module
 #
 
+__all__ = [
+    "run_security_checks",
+    "iter_security_checks",
+    "required_kinds",
+    "fetch_resources",
+    "fetch_cluster_resources",
+    "scan_namespaces",
+    "iter_scan_namespaces",
+    "start_scan",
+    "run_cluster_checks",
+    "ClusterCache",
+    "CheckMetadata",
+    "Finding",
+    "DEFAULT_CACHE_TTL",
+    "ResourceBundle",
+    "ClusterResources",
+    "FetchError",
+    "NamespaceNotFoundError",
+    "DEFAULT_FETCH_WORKERS",
+    "DEFAULT_SCAN_WORKERS",
+    "CheckInfo",
+    "all_checks",
+    "categories_for",
+    "get_check",
+    "parse_check_ids",
+    "select_checks",
+]
 
+
+#
+# required_kinds
+# Lists the resource kinds to fetch for the given checks, or for the selected
+# groups of checks when no checks are given
+#
+def required_kinds(
+    check_config: bool = False,
+    check_network: bool = False,
+    checks: Optional[List[CheckInfo]] = None,
+) -> List[str]:
+    if checks is None:
+        checks = select_checks(categories_for(check_config, check_network))
+    return kinds_for(checks)
+
+
+#
+# run_security_checks
+# Runs the selected checks against a namespace
+# The checks are the given ones, or the groups enabled by check_config and check_network
+# Resources are fetched concurrently unless an already fetched bundle is given;
+# with a given bundle, checks whose resources failed to fetch are skipped
+# With a ClusterCache, cluster-scoped resources and findings are reused across runs
+#
 def run_security_checks(
     kube_client: Any,
     namespace: str = "default",
     check_config: bool = False,
     check_network: bool = False,
-) -> List[Dict[str, Any]]:
-    findings = []
+    resources: Optional[ResourceBundle] = None,
+    max_workers: Optional[int] = DEFAULT_FETCH_WORKERS,
+    checks: Optional[List[CheckInfo]] = None,
+    cache: Optional[ClusterCache] = None,
+) -> List[Finding]:
+    findings = list(
+        iter_security_checks(
+            kube_client,
+            namespace,
+            check_config,
+            check_network,
+            resources=resources,
+            max_workers=max_workers,
+            checks=checks,
+            cache=cache,
+        )
+    )
+
+    # Report findings grouped by check, in check order, as when each check
+    # walked the deployments on its own
+    findings.sort(key=lambda finding: int(finding["check_id"]))
+    return findings
+
 
-    if check_config:
-        deployments = kube_client.get_raw_deployments(namespace)
-        namespace_obj = kube_client.get_namespace_details(namespace)
-        config_maps = kube_client.get_config_maps(namespace)
-        secrets = kube_client.get_secrets(namespace)
-        roles = kube_client.get_roles(namespace)
-        cluster_roles = kube_client.get_cluster_roles()
-        role_bindings = kube_client.get_role_bindings(namespace)
-        cluster_role_bindings = kube_client.get_cluster_role_bindings()
-
-        findings.extend(check_privileged(deployments))
-        findings.extend(check_host_pid(deployments))
-        findings.extend(check_host_ipc(deployments))
-        findings.extend(check_host_network(deployments))
-        findings.extend(check_run_as_root(deployments))
-        findings.extend(check_privilege_escalation(deployments))
-        findings.extend(check_capabilities(deployments))
-        findings.extend(check_resource_limits(deployments))
-        findings.extend(check_host_path(deployments))
-        findings.extend(check_readonly_filesystem(deployments))
-        findings.extend(check_seccomp(deployments))
-        findings.extend(check_service_account_token(deployments))
-        findings.extend(check_image_tags(deployments))
-        findings.extend(check_hardcoded_secrets(deployments))
-        findings.extend(check_pss_enforcement(namespace_obj))
-        findings.extend(check_immutable_config(config_maps, secrets))
-        findings.extend(check_emptydir_limits(deployments))
-        findings.extend(check_proc_mount(deployments))
-        findings.extend(check_rbac_roles(roles, cluster_roles))
-        findings.extend(check_rbac_bindings(role_bindings, cluster_role_bindings))
-        findings.extend(check_shared_process_ns(deployments))
-        findings.extend(check_sysctls(deployments))
-
-    if check_network:
-        network_policies = kube_client.get_network_policies(namespace)
-        findings.extend(check_network_policies(network_policies, namespace))
+#
+# iter_security_checks
+# Runs the selected checks against a namespace like run_security_checks, and
+# yields the findings as they are found instead of returning a sorted list
+# Pod template findings come deployment by deployment, after the findings of
+# the other checks
+#
+def iter_security_checks(
+    kube_client: Any,
+    namespace: str = "default",
+    check_config: bool = False,
+    check_network: bool = False,
+    resources: Optional[ResourceBundle] = None,
+    max_workers: Optional[int] = DEFAULT_FETCH_WORKERS,
+    checks: Optional[List[CheckInfo]] = None,
+    cache: Optional[ClusterCache] = None,
+) -> Iterator[Finding]:
+    if checks is None:
+        checks = select_checks(categories_for(check_config, check_network))
+
+    if resources is None:
+        resources = fetch_resources(
+            kube_client,
+            namespace,
+            kinds_for(checks),
+            max_workers=max_workers,
+            cache=cache,
+        )
+        resources.raise_for_errors()
 
+    # With a cache, cluster-scoped resources are checked apart from the
+    # namespace so that their findings can be reused by the next scans
+    if cache is not None and resources.shared is None:
+        resources, cluster = split_cluster_scoped(resources)
+        yield from iter_security_checks(
+            kube_client, namespace, resources=resources, checks=checks
+        )
+        yield from run_cluster_checks(kube_client, cluster, checks, cache)
+        return
+
+    # Pod template checks share a single pass over the deployments
+    walker = None
+    for info in checks:
+        if not resources.has(*info.kinds):
+            continue
+        if info.has_pod_rules:
+            walker = walker or PodSpecWalker()
+            walker.register(info.module)
+        else:
+            yield from timed(info.check_id, info.run)(resources, namespace)
+
+    if walker:
+        yield from walker.iter_walk(resources["deployments"])
+
+
+#
+# scan_namespaces
+# Runs the given checks against several namespaces, or every namespace when
+# namespaces is None
+# Namespaced resources are listed once across the cluster and split by
+# namespace; cluster-scoped resources are fetched and checked only once
+# With a given ClusterResources, checks whose resources failed to fetch are skipped
+# With a ClusterCache, cluster-scoped resources and findings are reused across runs
+#
+def scan_namespaces(
+    kube_client: Any,
+    namespaces: Optional[List[str]],
+    checks: List[CheckInfo],
+    max_workers: Optional[int] = DEFAULT_FETCH_WORKERS,
+    scan_workers: Optional[int] = DEFAULT_SCAN_WORKERS,
+    resources: Optional[ClusterResources] = None,
+    cache: Optional[ClusterCache] = None,
+) -> List[Finding]:
+    findings = list(
+        iter_scan_namespaces(
+            kube_client,
+            namespaces,
+            checks,
+            max_workers=max_workers,
+            scan_workers=scan_workers,
+            resources=resources,
+            cache=cache,
+        )
+    )
+    findings.sort(key=lambda finding: int(finding["check_id"]))
     return findings
+
+
+#
+# iter_scan_namespaces
+# Scans several namespaces like scan_namespaces, and yields the findings
+# namespace by namespace, in check order within a namespace, then the
+# findings on cluster-scoped resources
+# At most two namespaces per worker are checked ahead of the consumer, so that
+# the findings waiting to be consumed stay bounded
+#
+def iter_scan_namespaces(
+    kube_client: Any,
+    namespaces: Optional[List[str]],
+    checks: List[CheckInfo],
+    max_workers: Optional[int] = DEFAULT_FETCH_WORKERS,
+    scan_workers: Optional[int] = DEFAULT_SCAN_WORKERS,
+    resources: Optional[ClusterResources] = None,
+    cache: Optional[ClusterCache] = None,
+) -> Iterator[Finding]:
+    if resources is None:
+        resources = fetch_cluster_resources(
+            kube_client,
+            namespaces,
+            kinds_for(checks),
+            max_workers=max_workers,
+            cache=cache,
+        )
+        if resources.errors:
+            raise FetchError(resources.errors)
+
+    bundles = [resources.bundles[namespace] for namespace in resources.namespaces]
+    if bundles:
+        workers = max(1, min(scan_workers or len(bundles), len(bundles)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending: Deque[Future] = deque()
+            for bundle in bundles:
+                pending.append(
+                    executor.submit(
+                        run_security_checks,
+                        kube_client,
+                        bundle.namespace,
+                        resources=bundle,
+                        checks=checks,
+                    )
+                )
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    yield from run_cluster_checks(kube_client, resources.cluster, checks, cache)
+
+
+#
+# run_cluster_checks
+# Runs the checks looking at cluster-scoped resources on a cluster bundle
+# With a ClusterCache, the findings of a check are reused as long as the
+# cluster-scoped objects it reads are unchanged
+#
+def run_cluster_checks(
+    kube_client: Any,
+    cluster: ResourceBundle,
+    checks: List[CheckInfo],
+    cache: Optional[ClusterCache] = None,
+) -> List[Finding]:
+    cluster_checks = [
+        info
+        for info in checks
+        if any(is_cluster_scoped(kind) for kind in info.resources)
+        and cluster.has(*info.kinds)
+    ]
+    if cache is None:
+        return run_security_checks(
+            kube_client, cluster.namespace, resources=cluster, checks=cluster_checks
+        )
+
+    findings = []
+    for info in cluster_checks:
+        findings.extend(
+            cache.findings(
+                info.check_id,
+                _cached_resources(info, cluster),
+                lambda info=info: run_security_checks(
+                    kube_client, cluster.namespace, resources=cluster, checks=[info]
+                ),
+            )
+        )
+    return findings
+
+
+#
+# _cached_resources
+# Lists the (kind, objects) the findings of a check on a cluster bundle depend
+# on: its cluster-scoped kinds, and the cluster-scoped RBAC objects of the scan
+# when it reads the RBAC graph
+#
+def _cached_resources(
+    info: CheckInfo, cluster: ResourceBundle
+) -> List[Tuple[str, List[Any]]]:
+    resources = [
+        (kind, cluster[kind]) for kind in info.kinds if is_cluster_scoped(kind)
+    ]
+    if info.takes_rbac_graph:
+        for kind, objects in cluster.rbac_resources().items():
+            if is_cluster_scoped(kind):
+                resources.append((f"rbac_graph/{kind}", objects))
+    return resources
+
+
+#
+# start_scan
+# Fetches the resources the checks need in the given namespaces, or in every
+# namespace for None, and returns them with the iterator of their findings
+# Failed fetches are left in resources.errors for the caller to report, the
+# checks depending on them are skipped, but a namespace that does not exist
+# is raised as an error rather than scanned as an empty one
+#
+def start_scan(
+    kube_client: Any,
+    namespaces: Optional[List[str]],
+    checks: List[CheckInfo],
+    max_workers: Optional[int] = DEFAULT_FETCH_WORKERS,
+    scan_workers: Optional[int] = DEFAULT_SCAN_WORKERS,
+    cache: Optional[ClusterCache] = None,
+) -> Tuple[Any, Iterator[Finding]]:
+    # Several namespaces share cluster-wide lists instead of one fetch per namespace
+    if namespaces is not None and len(namespaces) == 1:
+        # The namespace is read even when no check needs it, as the lists of
+        # a namespace that does not exist are just empty
+        resources = fetch_resources(
+            kube_client,
+            namespaces[0],
+            kinds_for(checks) + ["namespace"],
+            max_workers=max_workers,
+            cache=cache,
+        )
+        if "namespace" in resources.errors:
+            raise FetchError({"namespace": resources.errors["namespace"]})
+        findings = iter_security_checks(
+            kube_client=kube_client,
+            namespace=resources.namespace,
+            resources=resources,
+            checks=checks,
+            cache=cache,
+        )
+    else:
+        resources = fetch_cluster_resources(
+            kube_client,
+            namespaces,
+            kinds_for(checks),
+            max_workers=max_workers,
+            cache=cache,
+        )
+        findings = iter_scan_namespaces(
+            kube_client,
+            resources.namespaces,
+            checks,
+            scan_workers=scan_workers,
+            resources=resources,
+            cache=cache,
+        )
+    return resources, findings
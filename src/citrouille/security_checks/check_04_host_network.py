@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_host_network.py
@@ -11,31 +14,30 @@ from typing import List, Dict, Any
 CHECK_ID = "4"
 CHECK_NAME = "Host network access"
 CWE = "CWE-653"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY = "HIGH"
 RESOURCE_TYPE = "Deployment"
 DETAILS = "Using the host network namespace allows the container to sniff traffic on the host or bind to its ports."
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-
-        if deployment.spec.template.spec.host_network:
-            findings.append(
-                {
-                    "severity": SEVERITY,
-                    "resource_type": RESOURCE_TYPE,
-                    "resource_name": f"{namespace}/{deployment_name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": "Deployment is using the host's network namespace",
-                    "details": DETAILS,
-                }
+def check_pod(pod: PodContext) -> List[Finding]:
+    if pod.spec.host_network:
+        return [
+            Finding(
+                METADATA,
+                severity=SEVERITY,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container="N/A",
+                message="Deployment is using the host's network namespace",
+                details=DETAILS,
             )
+        ]
+
+    return []
+
 
-    return findings
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(pod_rules=[check_pod]).walk(deployments)
@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_run_as_root.py
@@ -11,96 +14,51 @@ from typing import List, Dict, Any
 CHECK_ID = "5"
 CHECK_NAME = "Running as root"
 CWE = "CWE-250"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY = "HIGH"
 RESOURCE_TYPE = "Deployment"
 DETAILS = "Containers should not run as root."
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-        pod_spec = deployment.spec.template.spec
-
-        # Check pod-level security context
-        pod_run_as_non_root = None
-        pod_run_as_user = None
-        if pod_spec.security_context:
-            pod_run_as_non_root = pod_spec.security_context.run_as_non_root
-            pod_run_as_user = pod_spec.security_context.run_as_user
-
-        # Check containers
-        if pod_spec.containers:
-            for container in pod_spec.containers:
-                container_run_as_non_root = pod_run_as_non_root
-                container_run_as_user = pod_run_as_user
-
-                # Container-level settings override pod-level
-                if container.security_context:
-                    if container.security_context.run_as_non_root is not None:
-                        container_run_as_non_root = (
-                            container.security_context.run_as_non_root
-                        )
-                    if container.security_context.run_as_user is not None:
-                        container_run_as_user = container.security_context.run_as_user
-
-                # Check if running as root
-                issues = []
-                if container_run_as_user == 0:
-                    issues.append("runAsUser is set to 0 (root)")
-                if not container_run_as_non_root:
-                    issues.append("runAsNonRoot is not set to true")
+def check_container(pod: PodContext, container: Any, kind: str) -> List[Finding]:
+    # Pod-level security context applies unless overridden
+    run_as_non_root = None
+    run_as_user = None
+    if pod.security_context:
+        run_as_non_root = pod.security_context.run_as_non_root
+        run_as_user = pod.security_context.run_as_user
 
-                if issues:
-                    findings.append(
-                        {
-                            "severity": SEVERITY,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Container '{container.name}' may be running as root: {', '.join(issues)}",
-                            "details": DETAILS,
-                        }
-                    )
+    # Container-level settings override pod-level
+    if container.security_context:
+        if container.security_context.run_as_non_root is not None:
+            run_as_non_root = container.security_context.run_as_non_root
+        if container.security_context.run_as_user is not None:
+            run_as_user = container.security_context.run_as_user
 
-        # Check init containers
-        if pod_spec.init_containers:
-            for container in pod_spec.init_containers:
-                container_run_as_non_root = pod_run_as_non_root
-                container_run_as_user = pod_run_as_user
+    # Check if running as root
+    issues = []
+    if run_as_user == 0:
+        issues.append("runAsUser is set to 0 (root)")
+    if not run_as_non_root:
+        issues.append("runAsNonRoot is not set to true")
 
-                if container.security_context:
-                    if container.security_context.run_as_non_root is not None:
-                        container_run_as_non_root = (
-                            container.security_context.run_as_non_root
-                        )
-                    if container.security_context.run_as_user is not None:
-                        container_run_as_user = container.security_context.run_as_user
+    if issues:
+        return [
+            Finding(
+                METADATA,
+                severity=SEVERITY,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container=container.name,
+                message=f"{kind} '{container.name}' may be running as root: {', '.join(issues)}",
+                details=DETAILS,
+            )
+        ]
 
-                issues = []
-                if container_run_as_user == 0:
-                    issues.append("runAsUser is set to 0 (root)")
-                if not container_run_as_non_root:
-                    issues.append("runAsNonRoot is not set to true")
+    return []
 
-                if issues:
-                    findings.append(
-                        {
-                            "severity": SEVERITY,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Init container '{container.name}' may be running as root: {', '.join(issues)}",
-                            "details": DETAILS,
-                        }
-                    )
 
-    return findings
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(container_rules=[check_container]).walk(deployments)
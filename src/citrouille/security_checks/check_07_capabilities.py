@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_capabilities.py
@@ -11,6 +14,9 @@ from typing import List, Dict, Any
 CHECK_ID = "7"
 CHECK_NAME = "Dangerous capabilities"
 CWE = "CWE-250"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY_CRITICAL = "CRITICAL"
 SEVERITY_MEDIUM = "MEDIUM"
 RESOURCE_TYPE = "Deployment"
@@ -37,128 +43,56 @@ DANGEROUS_CAPABILITIES = {
 }
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-
-        # Check containers
-        if deployment.spec.template.spec.containers:
-            for container in deployment.spec.template.spec.containers:
-                if (
-                    not container.security_context
-                    or not container.security_context.capabilities
-                ):
-                    # No capabilities configuration - should drop ALL
-                    findings.append(
-                        {
-                            "severity": SEVERITY_MEDIUM,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Container '{container.name}' does not drop all capabilities",
-                            "details": DETAILS_NO_DROP_ALL,
-                        }
-                    )
-                else:
-                    caps = container.security_context.capabilities
+def check_container(pod: PodContext, container: Any, kind: str) -> List[Finding]:
+    if not container.security_context or not container.security_context.capabilities:
+        # No capabilities configuration - should drop ALL
+        return [
+            Finding(
+                METADATA,
+                severity=SEVERITY_MEDIUM,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container=container.name,
+                message=f"{kind} '{container.name}' does not drop all capabilities",
+                details=DETAILS_NO_DROP_ALL,
+            )
+        ]
 
-                    # Check for dangerous added capabilities
-                    if caps.add:
-                        dangerous_added = [
-                            cap for cap in caps.add if cap in DANGEROUS_CAPABILITIES
-                        ]
-                        if dangerous_added:
-                            findings.append(
-                                {
-                                    "severity": SEVERITY_CRITICAL,
-                                    "resource_type": RESOURCE_TYPE,
-                                    "resource_name": f"{namespace}/{deployment_name}",
-                                    "container": container.name,
-                                    "check_id": CHECK_ID,
-                                    "check_name": CHECK_NAME,
-                                    "cwe": CWE,
-                                    "message": f"Container '{container.name}' adds dangerous capabilities: {', '.join(dangerous_added)}",
-                                    "details": DETAILS_DANGEROUS_CAPS,
-                                }
-                            )
+    findings = []
+    caps = container.security_context.capabilities
 
-                    # Check if ALL capabilities are dropped
-                    if not caps.drop or "ALL" not in caps.drop:
-                        findings.append(
-                            {
-                                "severity": SEVERITY_MEDIUM,
-                                "resource_type": RESOURCE_TYPE,
-                                "resource_name": f"{namespace}/{deployment_name}",
-                                "container": container.name,
-                                "check_id": CHECK_ID,
-                                "check_name": CHECK_NAME,
-                                "cwe": CWE,
-                                "message": f"Container '{container.name}' does not drop all capabilities",
-                                "details": DETAILS_NOT_DROPPED,
-                            }
-                        )
+    # Check for dangerous added capabilities
+    if caps.add:
+        dangerous_added = [cap for cap in caps.add if cap in DANGEROUS_CAPABILITIES]
+        if dangerous_added:
+            findings.append(
+                Finding(
+                    METADATA,
+                    severity=SEVERITY_CRITICAL,
+                    resource_type=RESOURCE_TYPE,
+                    resource_name=pod.resource_name,
+                    container=container.name,
+                    message=f"{kind} '{container.name}' adds dangerous capabilities: {', '.join(dangerous_added)}",
+                    details=DETAILS_DANGEROUS_CAPS,
+                )
+            )
 
-        # Check init containers
-        if deployment.spec.template.spec.init_containers:
-            for container in deployment.spec.template.spec.init_containers:
-                if (
-                    not container.security_context
-                    or not container.security_context.capabilities
-                ):
-                    findings.append(
-                        {
-                            "severity": SEVERITY_MEDIUM,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Init container '{container.name}' does not drop all capabilities",
-                            "details": DETAILS_NO_DROP_ALL,
-                        }
-                    )
-                else:
-                    caps = container.security_context.capabilities
+    # Check if ALL capabilities are dropped
+    if not caps.drop or "ALL" not in caps.drop:
+        findings.append(
+            Finding(
+                METADATA,
+                severity=SEVERITY_MEDIUM,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container=container.name,
+                message=f"{kind} '{container.name}' does not drop all capabilities",
+                details=DETAILS_NOT_DROPPED,
+            )
+        )
 
-                    if caps.add:
-                        dangerous_added = [
-                            cap for cap in caps.add if cap in DANGEROUS_CAPABILITIES
-                        ]
-                        if dangerous_added:
-                            findings.append(
-                                {
-                                    "severity": SEVERITY_CRITICAL,
-                                    "resource_type": RESOURCE_TYPE,
-                                    "resource_name": f"{namespace}/{deployment_name}",
-                                    "container": container.name,
-                                    "check_id": CHECK_ID,
-                                    "check_name": CHECK_NAME,
-                                    "cwe": CWE,
-                                    "message": f"Init container '{container.name}' adds dangerous capabilities: {', '.join(dangerous_added)}",
-                                    "details": DETAILS_DANGEROUS_CAPS,
-                                }
-                            )
+    return findings
 
-                    if not caps.drop or "ALL" not in caps.drop:
-                        findings.append(
-                            {
-                                "severity": SEVERITY_MEDIUM,
-                                "resource_type": RESOURCE_TYPE,
-                                "resource_name": f"{namespace}/{deployment_name}",
-                                "container": container.name,
-                                "check_id": CHECK_ID,
-                                "check_name": CHECK_NAME,
-                                "cwe": CWE,
-                                "message": f"Init container '{container.name}' does not drop all capabilities",
-                                "details": DETAILS_NOT_DROPPED,
-                            }
-                        )
 
-    return findings
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(container_rules=[check_container]).walk(deployments)
@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_resource_limits.py
@@ -11,96 +14,53 @@ from typing import List, Dict, Any
 CHECK_ID = "8"
 CHECK_NAME = "No resource limits"
 CWE = "CWE-770"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY = "MEDIUM"
 RESOURCE_TYPE = "Deployment"
 DETAILS = "Set resource limits and requests to prevent denial of service attacks. Configure resources.limits.memory, resources.limits.cpu, resources.requests.memory, and resources.requests.cpu."
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-
-        # Check containers
-        if deployment.spec.template.spec.containers:
-            for container in deployment.spec.template.spec.containers:
-                issues = []
-
-                if not container.resources:
-                    issues.append("no resources configured")
-                else:
-                    # Check limits
-                    if not container.resources.limits:
-                        issues.append("no limits set")
-                    else:
-                        if not container.resources.limits.get("memory"):
-                            issues.append("no memory limit")
-                        if not container.resources.limits.get("cpu"):
-                            issues.append("no CPU limit")
-
-                    # Check requests
-                    if not container.resources.requests:
-                        issues.append("no requests set")
-                    else:
-                        if not container.resources.requests.get("memory"):
-                            issues.append("no memory request")
-                        if not container.resources.requests.get("cpu"):
-                            issues.append("no CPU request")
+def check_container(pod: PodContext, container: Any, kind: str) -> List[Finding]:
+    issues = []
 
-                if issues:
-                    findings.append(
-                        {
-                            "severity": SEVERITY,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Container '{container.name}' has missing resource configuration: {', '.join(issues)}",
-                            "details": DETAILS,
-                        }
-                    )
+    if not container.resources:
+        issues.append("no resources configured")
+    else:
+        # Check limits
+        if not container.resources.limits:
+            issues.append("no limits set")
+        else:
+            if not container.resources.limits.get("memory"):
+                issues.append("no memory limit")
+            if not container.resources.limits.get("cpu"):
+                issues.append("no CPU limit")
 
-        # Check init containers
-        if deployment.spec.template.spec.init_containers:
-            for container in deployment.spec.template.spec.init_containers:
-                issues = []
+        # Check requests
+        if not container.resources.requests:
+            issues.append("no requests set")
+        else:
+            if not container.resources.requests.get("memory"):
+                issues.append("no memory request")
+            if not container.resources.requests.get("cpu"):
+                issues.append("no CPU request")
 
-                if not container.resources:
-                    issues.append("no resources configured")
-                else:
-                    if not container.resources.limits:
-                        issues.append("no limits set")
-                    else:
-                        if not container.resources.limits.get("memory"):
-                            issues.append("no memory limit")
-                        if not container.resources.limits.get("cpu"):
-                            issues.append("no CPU limit")
+    if issues:
+        return [
+            Finding(
+                METADATA,
+                severity=SEVERITY,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container=container.name,
+                message=f"{kind} '{container.name}' has missing resource configuration: {', '.join(issues)}",
+                details=DETAILS,
+            )
+        ]
 
-                    if not container.resources.requests:
-                        issues.append("no requests set")
-                    else:
-                        if not container.resources.requests.get("memory"):
-                            issues.append("no memory request")
-                        if not container.resources.requests.get("cpu"):
-                            issues.append("no CPU request")
+    return []
 
-                if issues:
-                    findings.append(
-                        {
-                            "severity": SEVERITY,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Init container '{container.name}' has missing resource configuration: {', '.join(issues)}",
-                            "details": DETAILS,
-                        }
-                    )
 
-    return findings
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(container_rules=[check_container]).walk(deployments)
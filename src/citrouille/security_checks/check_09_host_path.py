@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_host_path.py
@@ -11,33 +14,30 @@ from typing import List, Dict, Any
 CHECK_ID = "9"
 CHECK_NAME = "hostPath usage"
 CWE = "CWE-668"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY = "HIGH"
 RESOURCE_TYPE = "Deployment"
 DETAILS = "Mounting host paths contradicts container isolation principles and can expose sensitive host files."
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-
-        if deployment.spec.template.spec.volumes:
-            for volume in deployment.spec.template.spec.volumes:
-                if volume.host_path:
-                    findings.append(
-                        {
-                            "severity": SEVERITY,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": "N/A",
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Volume '{volume.name}' uses hostPath: {volume.host_path.path}",
-                            "details": DETAILS,
-                        }
-                    )
-
-    return findings
+def check_volume(pod: PodContext, volume: Any) -> List[Finding]:
+    if volume.host_path:
+        return [
+            Finding(
+                METADATA,
+                severity=SEVERITY,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container="N/A",
+                message=f"Volume '{volume.name}' uses hostPath: {volume.host_path.path}",
+                details=DETAILS,
+            )
+        ]
+
+    return []
+
+
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(volume_rules=[check_volume]).walk(deployments)
@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_readonly_filesystem.py
@@ -11,66 +14,37 @@ from typing import List, Dict, Any
 CHECK_ID = "10"
 CHECK_NAME = "Writable root filesystem"
 CWE = "CWE-732"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY = "MEDIUM"
 RESOURCE_TYPE = "Deployment"
 DETAILS = "Writable filesystems allow for malware persistence and runtime tampering."
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-
-        # Check containers
-        if deployment.spec.template.spec.containers:
-            for container in deployment.spec.template.spec.containers:
-                read_only = False
-                if (
-                    container.security_context
-                    and container.security_context.read_only_root_filesystem
-                ):
-                    read_only = True
-
-                if not read_only:
-                    findings.append(
-                        {
-                            "severity": SEVERITY,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Container '{container.name}' has a writable root filesystem",
-                            "details": DETAILS,
-                        }
-                    )
-
-        # Check init containers
-        if deployment.spec.template.spec.init_containers:
-            for container in deployment.spec.template.spec.init_containers:
-                read_only = False
-                if (
-                    container.security_context
-                    and container.security_context.read_only_root_filesystem
-                ):
-                    read_only = True
-
-                if not read_only:
-                    findings.append(
-                        {
-                            "severity": SEVERITY,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Init container '{container.name}' has a writable root filesystem",
-                            "details": DETAILS,
-                        }
-                    )
-
-    return findings
+def check_container(pod: PodContext, container: Any, kind: str) -> List[Finding]:
+    read_only = False
+    if (
+        container.security_context
+        and container.security_context.read_only_root_filesystem
+    ):
+        read_only = True
+
+    if not read_only:
+        return [
+            Finding(
+                METADATA,
+                severity=SEVERITY,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container=container.name,
+                message=f"{kind} '{container.name}' has a writable root filesystem",
+                details=DETAILS,
+            )
+        ]
+
+    return []
+
+
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(container_rules=[check_container]).walk(deployments)
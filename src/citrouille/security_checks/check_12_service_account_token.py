@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_service_account_token.py
@@ -11,6 +14,9 @@ from typing import List, Dict, Any
 CHECK_ID = "12"
 CHECK_NAME = "Automounted account tokens"
 CWE = "CWE-522"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY_MEDIUM = "MEDIUM"
 SEVERITY_LOW = "LOW"
 RESOURCE_TYPE = "Deployment"
@@ -18,49 +24,44 @@ DETAILS_AUTOMOUNT = "Automounting ServiceAccounToken allows compromised containe
 DETAILS_DEFAULT_SA = "Deployments should each have an individual ServiceAccount to follow the principle of least privilege."
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
+def check_pod(pod: PodContext) -> List[Finding]:
     findings = []
 
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-        pod_spec = deployment.spec.template.spec
-
-        # Check if automountServiceAccountToken is explicitly set to false
-        automount = True  # Default is true
-        if pod_spec.automount_service_account_token is not None:
-            automount = pod_spec.automount_service_account_token
+    # Check if automountServiceAccountToken is explicitly set to false
+    automount = True  # Default is true
+    if pod.spec.automount_service_account_token is not None:
+        automount = pod.spec.automount_service_account_token
 
-        if automount:
-            findings.append(
-                {
-                    "severity": SEVERITY_MEDIUM,
-                    "resource_type": RESOURCE_TYPE,
-                    "resource_name": f"{namespace}/{deployment_name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": "Service account token is automounted",
-                    "details": DETAILS_AUTOMOUNT,
-                }
+    if automount:
+        findings.append(
+            Finding(
+                METADATA,
+                severity=SEVERITY_MEDIUM,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container="N/A",
+                message="Service account token is automounted",
+                details=DETAILS_AUTOMOUNT,
             )
+        )
 
-        # Check if using default service account
-        service_account = pod_spec.service_account_name or "default"
-        if service_account == "default":
-            findings.append(
-                {
-                    "severity": SEVERITY_LOW,
-                    "resource_type": RESOURCE_TYPE,
-                    "resource_name": f"{namespace}/{deployment_name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": "Deployment uses default service account",
-                    "details": DETAILS_DEFAULT_SA,
-                }
+    # Check if using default service account
+    service_account = pod.spec.service_account_name or "default"
+    if service_account == "default":
+        findings.append(
+            Finding(
+                METADATA,
+                severity=SEVERITY_LOW,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container="N/A",
+                message="Deployment uses default service account",
+                details=DETAILS_DEFAULT_SA,
             )
+        )
 
     return findings
+
+
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(pod_rules=[check_pod]).walk(deployments)
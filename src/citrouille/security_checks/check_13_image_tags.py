@@ -1,6 +1,9 @@
-from typing import List, Dict, Any
+from typing import List, Any
 import re
 
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
+
 #
 # check_image_tags.py
 #
@@ -12,70 +15,43 @@ import re
 CHECK_ID = "13"
 CHECK_NAME = "Mutable image tags"
 CWE = "CWE-494"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY_HIGH = "HIGH"
 SEVERITY_MEDIUM = "MEDIUM"
 RESOURCE_TYPE = "Deployment"
 DETAILS = "Using tags or latest instead of image hashes for deployment exposes the cluster to runtime reconfiguration in case of registry compromission"
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    # Regex to check if image uses digest (sha256:...)
-    digest_pattern = re.compile(r"@sha256:[a-f0-9]{64}$")
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
+# Regex to check if image uses digest (sha256:...)
+DIGEST_PATTERN = re.compile(r"@sha256:[a-f0-9]{64}$")
 
-        # Check containers
-        if deployment.spec.template.spec.containers:
-            for container in deployment.spec.template.spec.containers:
-                image = container.image
 
-                # Check if using digest
-                if not digest_pattern.search(image):
-                    # Determine severity based on tag
-                    severity = SEVERITY_MEDIUM
-                    if ":latest" in image or ":" not in image:
-                        severity = SEVERITY_HIGH
+def check_container(pod: PodContext, container: Any, kind: str) -> List[Finding]:
+    image = container.image
 
-                    findings.append(
-                        {
-                            "severity": severity,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Container '{container.name}' uses mutable image tag: {image}",
-                            "details": DETAILS,
-                        }
-                    )
+    # Check if using digest
+    if not DIGEST_PATTERN.search(image):
+        # Determine severity based on tag
+        severity = SEVERITY_MEDIUM
+        if ":latest" in image or ":" not in image:
+            severity = SEVERITY_HIGH
 
-        # Check init containers
-        if deployment.spec.template.spec.init_containers:
-            for container in deployment.spec.template.spec.init_containers:
-                image = container.image
+        return [
+            Finding(
+                METADATA,
+                severity=severity,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container=container.name,
+                message=f"{kind} '{container.name}' uses mutable image tag: {image}",
+                details=DETAILS,
+            )
+        ]
 
-                if not digest_pattern.search(image):
-                    severity = SEVERITY_MEDIUM
-                    if ":latest" in image or ":" not in image:
-                        severity = SEVERITY_HIGH
+    return []
 
-                    findings.append(
-                        {
-                            "severity": severity,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": container.name,
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Init container '{container.name}' uses mutable image tag: {image}",
-                            "details": DETAILS,
-                        }
-                    )
 
-    return findings
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(container_rules=[check_container]).walk(deployments)
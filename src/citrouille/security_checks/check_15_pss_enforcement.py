@@ -1,4 +1,6 @@
-from typing import Dict, Any
+from typing import List, Any
+
+from .finding import CheckMetadata, Finding
 
 #
 # check_pss_enforcement.py
@@ -11,6 +13,9 @@ from typing import Dict, Any
 CHECK_ID = "15"
 CHECK_NAME = "PSS enforcement"
 CWE = "CWE-693"
+CATEGORY = "config"
+RESOURCES = ["namespace"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY_HIGH = "HIGH"
 SEVERITY_MEDIUM = "MEDIUM"
 SEVERITY_LOW = "LOW"
@@ -23,7 +28,7 @@ DETAILS_NO_WARN = "Set label 'pod-security.kubernetes.io/warn' to provide warnin
 DETAILS_NO_AUDIT = "Set label 'pod-security.kubernetes.io/audit' for audit logging of policy violations."
 
 
-def check(namespace_obj: Any) -> list[Dict[str, Any]]:
+def check(namespace_obj: Any) -> List[Finding]:
     findings = []
 
     namespace_name = namespace_obj.metadata.name
@@ -37,63 +42,55 @@ def check(namespace_obj: Any) -> list[Dict[str, Any]]:
     # Check enforce label
     if not enforce_label:
         findings.append(
-            {
-                "severity": SEVERITY_HIGH,
-                "resource_type": RESOURCE_TYPE,
-                "resource_name": namespace_name,
-                "container": "N/A",
-                "check_id": CHECK_ID,
-                "check_name": CHECK_NAME,
-                "cwe": CWE,
-                "message": "Namespace does not enforce Pod Security Standards",
-                "details": DETAILS_NO_ENFORCE,
-            }
+            Finding(
+                METADATA,
+                severity=SEVERITY_HIGH,
+                resource_type=RESOURCE_TYPE,
+                resource_name=namespace_name,
+                container="N/A",
+                message="Namespace does not enforce Pod Security Standards",
+                details=DETAILS_NO_ENFORCE,
+            )
         )
     elif enforce_label not in ["restricted", "baseline"]:
         findings.append(
-            {
-                "severity": SEVERITY_MEDIUM,
-                "resource_type": RESOURCE_TYPE,
-                "resource_name": namespace_name,
-                "container": "N/A",
-                "check_id": CHECK_ID,
-                "check_name": CHECK_NAME,
-                "cwe": CWE,
-                "message": f"Namespace has weak PSS enforcement level: {enforce_label}",
-                "details": DETAILS_WEAK_ENFORCE,
-            }
+            Finding(
+                METADATA,
+                severity=SEVERITY_MEDIUM,
+                resource_type=RESOURCE_TYPE,
+                resource_name=namespace_name,
+                container="N/A",
+                message=f"Namespace has weak PSS enforcement level: {enforce_label}",
+                details=DETAILS_WEAK_ENFORCE,
+            )
         )
 
     # Check warn label
     if not warn_label:
         findings.append(
-            {
-                "severity": SEVERITY_LOW,
-                "resource_type": RESOURCE_TYPE,
-                "resource_name": namespace_name,
-                "container": "N/A",
-                "check_id": CHECK_ID,
-                "check_name": CHECK_NAME,
-                "cwe": CWE,
-                "message": "Namespace does not have PSS warn label set",
-                "details": DETAILS_NO_WARN,
-            }
+            Finding(
+                METADATA,
+                severity=SEVERITY_LOW,
+                resource_type=RESOURCE_TYPE,
+                resource_name=namespace_name,
+                container="N/A",
+                message="Namespace does not have PSS warn label set",
+                details=DETAILS_NO_WARN,
+            )
         )
 
     # Check audit label
     if not audit_label:
         findings.append(
-            {
-                "severity": SEVERITY_LOW,
-                "resource_type": RESOURCE_TYPE,
-                "resource_name": namespace_name,
-                "container": "N/A",
-                "check_id": CHECK_ID,
-                "check_name": CHECK_NAME,
-                "cwe": CWE,
-                "message": "Namespace does not have PSS audit label set",
-                "details": DETAILS_NO_AUDIT,
-            }
+            Finding(
+                METADATA,
+                severity=SEVERITY_LOW,
+                resource_type=RESOURCE_TYPE,
+                resource_name=namespace_name,
+                container="N/A",
+                message="Namespace does not have PSS audit label set",
+                details=DETAILS_NO_AUDIT,
+            )
         )
 
     return findings
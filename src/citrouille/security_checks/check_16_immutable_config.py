@@ -1,4 +1,6 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .finding import CheckMetadata, Finding
 
 #
 # check_immutable_config.py
@@ -11,6 +13,9 @@ from typing import List, Dict, Any
 CHECK_ID = "16"
 CHECK_NAME = "Mutable configuration"
 CWE = "CWE-471"
+CATEGORY = "config"
+RESOURCES = ["config_maps", "secrets"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY_LOW = "LOW"
 SEVERITY_MEDIUM = "MEDIUM"
 RESOURCE_TYPE_CONFIGMAP = "ConfigMap"
@@ -19,41 +24,37 @@ DETAILS_CONFIGMAP = "Mutable configMap instances enable runtime tampering."
 DETAILS_SECRET = "Mutable Secret instances enable runtime tampering."
 
 
-def check(config_maps: List[Any], secrets: List[Any]) -> List[Dict[str, Any]]:
+def check(config_maps: List[Any], secrets: List[Any]) -> List[Finding]:
     findings = []
 
     # Check ConfigMaps
     for cm in config_maps:
         if not cm.immutable:
             findings.append(
-                {
-                    "severity": SEVERITY_LOW,
-                    "resource_type": RESOURCE_TYPE_CONFIGMAP,
-                    "resource_name": f"{cm.metadata.namespace}/{cm.metadata.name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": f"ConfigMap '{cm.metadata.name}' is mutable",
-                    "details": DETAILS_CONFIGMAP,
-                }
+                Finding(
+                    METADATA,
+                    severity=SEVERITY_LOW,
+                    resource_type=RESOURCE_TYPE_CONFIGMAP,
+                    resource_name=f"{cm.metadata.namespace}/{cm.metadata.name}",
+                    container="N/A",
+                    message=f"ConfigMap '{cm.metadata.name}' is mutable",
+                    details=DETAILS_CONFIGMAP,
+                )
             )
 
     # Check Secrets
     for secret in secrets:
         if not secret.immutable:
             findings.append(
-                {
-                    "severity": SEVERITY_MEDIUM,
-                    "resource_type": RESOURCE_TYPE_SECRET,
-                    "resource_name": f"{secret.metadata.namespace}/{secret.metadata.name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": f"Secret '{secret.metadata.name}' is mutable",
-                    "details": DETAILS_SECRET,
-                }
+                Finding(
+                    METADATA,
+                    severity=SEVERITY_MEDIUM,
+                    resource_type=RESOURCE_TYPE_SECRET,
+                    resource_name=f"{secret.metadata.namespace}/{secret.metadata.name}",
+                    container="N/A",
+                    message=f"Secret '{secret.metadata.name}' is mutable",
+                    details=DETAILS_SECRET,
+                )
             )
 
     return findings
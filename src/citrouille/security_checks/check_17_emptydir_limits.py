@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_emptydir_limits.py
@@ -11,6 +14,9 @@ from typing import List, Dict, Any
 CHECK_ID = "17"
 CHECK_NAME = "Unset emptyDir size limits"
 CWE = "CWE-770"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY = "MEDIUM"
 RESOURCE_TYPE = "Deployment"
 DETAILS = (
@@ -18,29 +24,22 @@ DETAILS = (
 )
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-
-        if deployment.spec.template.spec.volumes:
-            for volume in deployment.spec.template.spec.volumes:
-                if volume.empty_dir:
-                    if not volume.empty_dir.size_limit:
-                        findings.append(
-                            {
-                                "severity": SEVERITY,
-                                "resource_type": RESOURCE_TYPE,
-                                "resource_name": f"{namespace}/{deployment_name}",
-                                "container": "N/A",
-                                "check_id": CHECK_ID,
-                                "check_name": CHECK_NAME,
-                                "cwe": CWE,
-                                "message": f"emptyDir volume '{volume.name}' has no size limit",
-                                "details": DETAILS,
-                            }
-                        )
-
-    return findings
+def check_volume(pod: PodContext, volume: Any) -> List[Finding]:
+    if volume.empty_dir and not volume.empty_dir.size_limit:
+        return [
+            Finding(
+                METADATA,
+                severity=SEVERITY,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container="N/A",
+                message=f"emptyDir volume '{volume.name}' has no size limit",
+                details=DETAILS,
+            )
+        ]
+
+    return []
+
+
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(volume_rules=[check_volume]).walk(deployments)
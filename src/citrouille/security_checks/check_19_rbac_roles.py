@@ -1,4 +1,8 @@
-from typing import List, Dict, Any
+from typing import List, Any, Optional
+
+from .finding import CheckMetadata, Finding
+from .rbac_graph import RbacGraph, format_subject
+from .rbac_index import RBAC_INDEX
 
 #
 # check_rbac_roles.py
@@ -11,6 +15,11 @@ from typing import List, Dict, Any
 CHECK_ID = "19"
 CHECK_NAME = "Misconfigured RBAC role"
 CWE = "CWE-269"
+CATEGORY = "config"
+RESOURCES = ["roles", "cluster_roles"]
+# The RBAC graph tells who holds each role, when the bindings could be fetched
+TAKES_RBAC_GRAPH = True
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY_CRITICAL = "CRITICAL"
 SEVERITY_HIGH = "HIGH"
 DETAILS_WILDCARD_VERBS = "Wildcard verbs go against the principle of least privilege."
@@ -21,6 +30,9 @@ DETAILS_WILDCARD_API_GROUPS = (
     "Wildcard API groups go against the principle of least privilege."
 )
 
+# Holders named in the details of a finding, the others are counted
+MAX_HOLDERS = 5
+
 # Dangerous permission combinations
 DANGEROUS_COMBOS = [
     {
@@ -70,22 +82,39 @@ DANGEROUS_COMBOS = [
     },
 ]
 
+# Dangerous combinations as (verbs mask, resources mask or None, combo), so that
+# matching a rule is a bitmask intersection
+COMBO_MASKS = [
+    (
+        RBAC_INDEX.verbs_mask(combo["verbs"]),
+        (RBAC_INDEX.resources_mask(combo["resources"]) if combo["resources"] else None),
+        combo,
+    )
+    for combo in DANGEROUS_COMBOS
+]
+
 
-def check(roles: List[Any], cluster_roles: List[Any]) -> List[Dict[str, Any]]:
+def check(
+    roles: List[Any],
+    cluster_roles: List[Any],
+    rbac_graph: Optional[RbacGraph] = None,
+) -> List[Finding]:
     findings = []
 
     # Check Roles
     for role in roles:
-        findings.extend(_check_role(role, "Role"))
+        findings.extend(_check_role(role, "Role", rbac_graph))
 
     # Check ClusterRoles
     for cluster_role in cluster_roles:
-        findings.extend(_check_role(cluster_role, "ClusterRole"))
+        findings.extend(_check_role(cluster_role, "ClusterRole", rbac_graph))
 
     return findings
 
 
-def _check_role(role: Any, role_type: str) -> List[Dict[str, Any]]:
+def _check_role(
+    role: Any, role_type: str, rbac_graph: Optional[RbacGraph] = None
+) -> List[Finding]:
     findings = []
     role_name = role.metadata.name
     namespace = role.metadata.namespace if role_type == "Role" else "cluster-wide"
@@ -93,86 +122,100 @@ def _check_role(role: Any, role_type: str) -> List[Dict[str, Any]]:
     if not role.rules:
         return findings
 
+    holders = _holders(rbac_graph, role_type, role.metadata.namespace, role_name)
+
     for rule in role.rules:
-        verbs = rule.verbs or []
-        resources = rule.resources or []
-        api_groups = rule.api_groups or []
+        normalized = RBAC_INDEX.normalize(rule)
 
         # Check for wildcards
-        if "*" in verbs:
+        if normalized.wildcard_verbs:
             findings.append(
-                {
-                    "severity": SEVERITY_CRITICAL,
-                    "resource_type": role_type,
-                    "resource_name": f"{namespace}/{role_name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": f"{role_type} '{role_name}' grants wildcard verbs (*)",
-                    "details": DETAILS_WILDCARD_VERBS,
-                }
+                Finding(
+                    METADATA,
+                    severity=SEVERITY_CRITICAL,
+                    resource_type=role_type,
+                    resource_name=f"{namespace}/{role_name}",
+                    container="N/A",
+                    message=f"{role_type} '{role_name}' grants wildcard verbs (*)",
+                    details=DETAILS_WILDCARD_VERBS + holders,
+                )
             )
 
-        if "*" in resources:
+        if normalized.wildcard_resources:
             findings.append(
-                {
-                    "severity": SEVERITY_CRITICAL,
-                    "resource_type": role_type,
-                    "resource_name": f"{namespace}/{role_name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": f"{role_type} '{role_name}' grants access to all resources (*)",
-                    "details": DETAILS_WILDCARD_RESOURCES,
-                }
+                Finding(
+                    METADATA,
+                    severity=SEVERITY_CRITICAL,
+                    resource_type=role_type,
+                    resource_name=f"{namespace}/{role_name}",
+                    container="N/A",
+                    message=f"{role_type} '{role_name}' grants access to all resources (*)",
+                    details=DETAILS_WILDCARD_RESOURCES + holders,
+                )
             )
 
-        if "*" in api_groups:
+        if normalized.wildcard_api_groups:
             findings.append(
-                {
-                    "severity": SEVERITY_HIGH,
-                    "resource_type": role_type,
-                    "resource_name": f"{namespace}/{role_name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": f"{role_type} '{role_name}' grants access to all API groups (*)",
-                    "details": DETAILS_WILDCARD_API_GROUPS,
-                }
+                Finding(
+                    METADATA,
+                    severity=SEVERITY_HIGH,
+                    resource_type=role_type,
+                    resource_name=f"{namespace}/{role_name}",
+                    container="N/A",
+                    message=f"{role_type} '{role_name}' grants access to all API groups (*)",
+                    details=DETAILS_WILDCARD_API_GROUPS + holders,
+                )
             )
 
         # Check for dangerous permission combinations
-        for combo in DANGEROUS_COMBOS:
-            required_verbs = combo["verbs"]
-            required_resources = combo["resources"]
-
-            # Check if this rule has the dangerous verbs
-            has_verbs = any(verb in verbs or "*" in verbs for verb in required_verbs)
-
-            # Check resources if specified
-            has_resources = True
-            if required_resources:
-                has_resources = any(
-                    resource in resources or "*" in resources
-                    for resource in required_resources
-                )
-
-            if has_verbs and has_resources:
+        for verbs_mask, resources_mask, combo in COMBO_MASKS:
+            if normalized.grants(verbs_mask, resources_mask):
                 findings.append(
-                    {
-                        "severity": SEVERITY_CRITICAL,
-                        "resource_type": role_type,
-                        "resource_name": f"{namespace}/{role_name}",
-                        "container": "N/A",
-                        "check_id": CHECK_ID,
-                        "check_name": CHECK_NAME,
-                        "cwe": CWE,
-                        "message": f"{role_type} '{role_name}' has dangerous permissions: {combo['message']}",
-                        "details": f"This combination of verbs {required_verbs} and resources {required_resources} can lead to privilege escalation.",
-                    }
+                    Finding(
+                        METADATA,
+                        severity=SEVERITY_CRITICAL,
+                        resource_type=role_type,
+                        resource_name=f"{namespace}/{role_name}",
+                        container="N/A",
+                        message=f"{role_type} '{role_name}' has dangerous permissions: {combo['message']}",
+                        details=f"This combination of verbs {combo['verbs']} and resources {combo['resources']} can lead to privilege escalation."
+                        + holders,
+                    )
                 )
 
     return findings
+
+
+#
+# _holders
+# Describes who holds a role, appended to the details of its findings: the
+# subjects of the RoleBindings of a Role, and the subjects of the
+# ClusterRoleBindings of a ClusterRole, so that the findings on ClusterRoles
+# do not depend on the scanned namespaces
+# Empty without an RBAC graph or when those bindings could not be fetched
+#
+def _holders(
+    rbac_graph: Optional[RbacGraph],
+    role_type: str,
+    namespace: Optional[str],
+    role_name: str,
+) -> str:
+    if role_type == "Role":
+        role, bindings, scope = (
+            ("Role", namespace or "", role_name),
+            "role_bindings",
+            "",
+        )
+    else:
+        role, bindings = ("ClusterRole", "", role_name), "cluster_role_bindings"
+        scope = " cluster-wide"
+    if rbac_graph is None or bindings not in rbac_graph.kinds:
+        return ""
+
+    subjects = rbac_graph.holders(role, cluster_wide=role_type != "Role")
+    if not subjects:
+        return f" It is not bound to any subject{scope}."
+    names = ", ".join(format_subject(subject) for subject in subjects[:MAX_HOLDERS])
+    if len(subjects) > MAX_HOLDERS:
+        names += f" and {len(subjects) - MAX_HOLDERS} more"
+    return f" It is held{scope} by {names}."
@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any, Optional
+
+from .finding import CheckMetadata, Finding
+from .rbac_graph import RbacGraph, role_key
 
 #
 # check_rbac_bindings.py
@@ -11,6 +14,12 @@ from typing import List, Dict, Any
 CHECK_ID = "20"
 CHECK_NAME = "Misconfigured RBAC binding"
 CWE = "CWE-269"
+CATEGORY = "config"
+RESOURCES = ["role_bindings", "cluster_role_bindings"]
+# The RBAC graph resolves what the bindings grant; without the roles, only
+# bindings to cluster-admin are recognized
+TAKES_RBAC_GRAPH = True
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY_CRITICAL = "CRITICAL"
 SEVERITY_HIGH = "HIGH"
 
@@ -20,25 +29,29 @@ DETAILS_CLUSTER_ADMIN = (
 )
 DETAILS_ANONYMOUS = "Granting permissions to {subject_name} allows unauthorized access."
 DETAILS_AUTHENTICATED = "The system:authenticated group includes all authenticated users, going against the principle of least privilege."
+DETAILS_ADMIN_EQUIVALENT = "Roles granting every verb on every resource are as powerful as cluster-admin, going against the principle of least privilege."
 
 
 def check(
-    role_bindings: List[Any], cluster_role_bindings: List[Any]
-) -> List[Dict[str, Any]]:
+    role_bindings: List[Any],
+    cluster_role_bindings: List[Any],
+    rbac_graph: Optional[RbacGraph] = None,
+) -> List[Finding]:
     findings = []
+    graph = rbac_graph or RbacGraph()
 
     # Check RoleBindings
     for binding in role_bindings:
-        findings.extend(_check_binding(binding, "RoleBinding"))
+        findings.extend(_check_binding(binding, "RoleBinding", graph))
 
     # Check ClusterRoleBindings
     for binding in cluster_role_bindings:
-        findings.extend(_check_binding(binding, "ClusterRoleBinding"))
+        findings.extend(_check_binding(binding, "ClusterRoleBinding", graph))
 
     return findings
 
 
-def _check_binding(binding: Any, binding_type: str) -> List[Dict[str, Any]]:
+def _check_binding(binding: Any, binding_type: str, graph: RbacGraph) -> List[Finding]:
     findings = []
     binding_name = binding.metadata.name
     namespace = (
@@ -48,17 +61,34 @@ def _check_binding(binding: Any, binding_type: str) -> List[Dict[str, Any]]:
     # Check if binding to cluster-admin
     if binding.role_ref.name == "cluster-admin":
         findings.append(
-            {
-                "severity": SEVERITY_CRITICAL,
-                "resource_type": binding_type,
-                "resource_name": f"{namespace}/{binding_name}",
-                "container": "N/A",
-                "check_id": CHECK_ID,
-                "check_name": CHECK_NAME,
-                "cwe": CWE,
-                "message": f"{binding_type} '{binding_name}' grants cluster-admin role",
-                "details": DETAILS_CLUSTER_ADMIN,
-            }
+            Finding(
+                METADATA,
+                severity=SEVERITY_CRITICAL,
+                resource_type=binding_type,
+                resource_name=f"{namespace}/{binding_name}",
+                container="N/A",
+                message=f"{binding_type} '{binding_name}' grants cluster-admin role",
+                details=DETAILS_CLUSTER_ADMIN,
+            )
+        )
+
+    # Check what the referenced role actually grants
+    elif graph.is_admin(
+        graph.binding_permissions(
+            binding, namespace if binding_type == "RoleBinding" else None
+        )
+    ):
+        role_kind, _, role_name = role_key(binding, binding.metadata.namespace)
+        findings.append(
+            Finding(
+                METADATA,
+                severity=SEVERITY_CRITICAL,
+                resource_type=binding_type,
+                resource_name=f"{namespace}/{binding_name}",
+                container="N/A",
+                message=f"{binding_type} '{binding_name}' grants cluster-admin equivalent permissions through {role_kind} '{role_name}'",
+                details=DETAILS_ADMIN_EQUIVALENT,
+            )
         )
 
     # Check subjects
@@ -69,33 +99,29 @@ def _check_binding(binding: Any, binding_type: str) -> List[Dict[str, Any]]:
             # Check for anonymous or unauthenticated users
             if subject_name in ["system:anonymous", "system:unauthenticated"]:
                 findings.append(
-                    {
-                        "severity": SEVERITY_CRITICAL,
-                        "resource_type": binding_type,
-                        "resource_name": f"{namespace}/{binding_name}",
-                        "container": "N/A",
-                        "check_id": CHECK_ID,
-                        "check_name": CHECK_NAME,
-                        "cwe": CWE,
-                        "message": f"{binding_type} '{binding_name}' grants permissions to {subject_name}",
-                        "details": DETAILS_ANONYMOUS.format(subject_name=subject_name),
-                    }
+                    Finding(
+                        METADATA,
+                        severity=SEVERITY_CRITICAL,
+                        resource_type=binding_type,
+                        resource_name=f"{namespace}/{binding_name}",
+                        container="N/A",
+                        message=f"{binding_type} '{binding_name}' grants permissions to {subject_name}",
+                        details=DETAILS_ANONYMOUS.format(subject_name=subject_name),
+                    )
                 )
 
             # Warn about system:authenticated (all authenticated users)
             if subject_name == "system:authenticated":
                 findings.append(
-                    {
-                        "severity": SEVERITY_HIGH,
-                        "resource_type": binding_type,
-                        "resource_name": f"{namespace}/{binding_name}",
-                        "container": "N/A",
-                        "check_id": CHECK_ID,
-                        "check_name": CHECK_NAME,
-                        "cwe": CWE,
-                        "message": f"{binding_type} '{binding_name}' grants permissions to all authenticated users",
-                        "details": DETAILS_AUTHENTICATED,
-                    }
+                    Finding(
+                        METADATA,
+                        severity=SEVERITY_HIGH,
+                        resource_type=binding_type,
+                        resource_name=f"{namespace}/{binding_name}",
+                        container="N/A",
+                        message=f"{binding_type} '{binding_name}' grants permissions to all authenticated users",
+                        details=DETAILS_AUTHENTICATED,
+                    )
                 )
 
     return findings
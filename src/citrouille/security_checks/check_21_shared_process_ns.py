@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_shared_process_ns.py
@@ -11,31 +14,30 @@ from typing import List, Dict, Any
 CHECK_ID = "21"
 CHECK_NAME = "Shared process namespace"
 CWE = "CWE-653"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY = "MEDIUM"
 RESOURCE_TYPE = "Deployment"
 DETAILS = "Sharing process namespace allows containers to see and interact with each other's processes."
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
-    findings = []
-
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-
-        if deployment.spec.template.spec.share_process_namespace:
-            findings.append(
-                {
-                    "severity": SEVERITY,
-                    "resource_type": RESOURCE_TYPE,
-                    "resource_name": f"{namespace}/{deployment_name}",
-                    "container": "N/A",
-                    "check_id": CHECK_ID,
-                    "check_name": CHECK_NAME,
-                    "cwe": CWE,
-                    "message": "Deployment shares process namespace between containers",
-                    "details": DETAILS,
-                }
+def check_pod(pod: PodContext) -> List[Finding]:
+    if pod.spec.share_process_namespace:
+        return [
+            Finding(
+                METADATA,
+                severity=SEVERITY,
+                resource_type=RESOURCE_TYPE,
+                resource_name=pod.resource_name,
+                container="N/A",
+                message="Deployment shares process namespace between containers",
+                details=DETAILS,
             )
+        ]
+
+    return []
+
 
-    return findings
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(pod_rules=[check_pod]).walk(deployments)
@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .engine import PodContext, PodSpecWalker
+from .finding import CheckMetadata, Finding
 
 #
 # check_sysctls.py
@@ -11,6 +14,9 @@ from typing import List, Dict, Any
 CHECK_ID = "22"
 CHECK_NAME = "Kernel tampering"
 CWE = "CWE-250"
+CATEGORY = "config"
+RESOURCES = ["deployments"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
 SEVERITY_CRITICAL = "CRITICAL"
 SEVERITY_MEDIUM = "MEDIUM"
 RESOURCE_TYPE = "Deployment"
@@ -18,53 +24,42 @@ DETAILS_KERNEL_SYSCTL = "The sysctl '{sysctl_name}' affects the entire node's ke
 DETAILS_ANY_SYSCTL = "Sysctls modify kernel parameters and should be avoided unless absolutely necessary."
 
 
-def check(deployments: List[Any]) -> List[Dict[str, Any]]:
+def check_pod(pod: PodContext) -> List[Finding]:
     findings = []
 
-    for deployment in deployments:
-        deployment_name = deployment.metadata.name
-        namespace = deployment.metadata.namespace
-
-        if (
-            deployment.spec.template.spec.security_context
-            and deployment.spec.template.spec.security_context.sysctls
-        ):
-            sysctls = deployment.spec.template.spec.security_context.sysctls
-
-            for sysctl in sysctls:
-                sysctl_name = sysctl.name
+    if pod.security_context and pod.security_context.sysctls:
+        for sysctl in pod.security_context.sysctls:
+            sysctl_name = sysctl.name
 
-                # Check for kernel.* sysctls (affect the entire node)
-                if sysctl_name.startswith("kernel."):
-                    findings.append(
-                        {
-                            "severity": SEVERITY_CRITICAL,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": "N/A",
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Deployment uses unsafe sysctl: {sysctl_name}",
-                            "details": DETAILS_KERNEL_SYSCTL.format(
-                                sysctl_name=sysctl_name
-                            ),
-                        }
+            # Check for kernel.* sysctls (affect the entire node)
+            if sysctl_name.startswith("kernel."):
+                findings.append(
+                    Finding(
+                        METADATA,
+                        severity=SEVERITY_CRITICAL,
+                        resource_type=RESOURCE_TYPE,
+                        resource_name=pod.resource_name,
+                        container="N/A",
+                        message=f"Deployment uses unsafe sysctl: {sysctl_name}",
+                        details=DETAILS_KERNEL_SYSCTL.format(sysctl_name=sysctl_name),
                     )
-                else:
-                    # Warn about any sysctl usage
-                    findings.append(
-                        {
-                            "severity": SEVERITY_MEDIUM,
-                            "resource_type": RESOURCE_TYPE,
-                            "resource_name": f"{namespace}/{deployment_name}",
-                            "container": "N/A",
-                            "check_id": CHECK_ID,
-                            "check_name": CHECK_NAME,
-                            "cwe": CWE,
-                            "message": f"Deployment uses sysctl: {sysctl_name}",
-                            "details": DETAILS_ANY_SYSCTL,
-                        }
+                )
+            else:
+                # Warn about any sysctl usage
+                findings.append(
+                    Finding(
+                        METADATA,
+                        severity=SEVERITY_MEDIUM,
+                        resource_type=RESOURCE_TYPE,
+                        resource_name=pod.resource_name,
+                        container="N/A",
+                        message=f"Deployment uses sysctl: {sysctl_name}",
+                        details=DETAILS_ANY_SYSCTL,
                     )
+                )
 
     return findings
+
+
+def check(deployments: List[Any]) -> List[Finding]:
+    return PodSpecWalker(pod_rules=[check_pod]).walk(deployments)
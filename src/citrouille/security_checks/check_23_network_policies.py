@@ -1,4 +1,6 @@
-from typing import List, Dict, Any
+from typing import List, Any
+
+from .finding import CheckMetadata, Finding
 
 #
 # check_network_policies.py
@@ -9,36 +11,41 @@ from typing import List, Dict, Any
 
 # Security check metadata
 CHECK_ID = "23"
+CHECK_NAME = "Misconfigured NetworkPolicy"
 CWE = "CWE-923"
+CATEGORY = "network"
+RESOURCES = ["network_policies"]
+# check() also takes the name of the scanned namespace
+TAKES_NAMESPACE = True
 SEVERITY_HIGH = "HIGH"
 SEVERITY_MEDIUM = "MEDIUM"
 RESOURCE_TYPE = "NetworkPolicy"
 
 # Check names
 CHECK_NAME_MISSING = "Missing NetworkPolicy"
+METADATA_MISSING = CheckMetadata(CHECK_ID, CHECK_NAME_MISSING, CWE)
 CHECK_NAME_PERMISSIVE = "Permissive NetworkPolicy"
+METADATA_PERMISSIVE = CheckMetadata(CHECK_ID, CHECK_NAME_PERMISSIVE, CWE)
 DETAILS_MISSING = "Without NetworkPolicies, all pods can communicate with each other and external networks, going against the principle of least privilege."
 DETAILS_INGRESS_ALLOW_ALL = "This policy has an ingress rule without 'from' selectors, allowing traffic from any source."
 DETAILS_EGRESS_ALLOW_ALL = "This policy has an egress rule without 'to' selectors, allowing traffic to any destination."
 
 
-def check(network_policies: List[Any], namespace: str) -> List[Dict[str, Any]]:
+def check(network_policies: List[Any], namespace: str) -> List[Finding]:
     findings = []
 
     # Check if there are any network policies in the namespace
     if not network_policies or len(network_policies) == 0:
         findings.append(
-            {
-                "severity": SEVERITY_HIGH,
-                "resource_type": RESOURCE_TYPE,
-                "resource_name": f"{namespace}/N/A",
-                "container": "N/A",
-                "check_id": CHECK_ID,
-                "check_name": CHECK_NAME_MISSING,
-                "cwe": CWE,
-                "message": f"Namespace '{namespace}' has no NetworkPolicies",
-                "details": DETAILS_MISSING,
-            }
+            Finding(
+                METADATA_MISSING,
+                severity=SEVERITY_HIGH,
+                resource_type=RESOURCE_TYPE,
+                resource_name=f"{namespace}/N/A",
+                container="N/A",
+                message=f"Namespace '{namespace}' has no NetworkPolicies",
+                details=DETAILS_MISSING,
+            )
         )
     else:
         # If policies exist, check for overly permissive ones
@@ -52,17 +59,15 @@ def check(network_policies: List[Any], namespace: str) -> List[Dict[str, Any]]:
                     for ingress_rule in policy.spec.ingress:
                         if not ingress_rule._from:
                             findings.append(
-                                {
-                                    "severity": SEVERITY_MEDIUM,
-                                    "resource_type": RESOURCE_TYPE,
-                                    "resource_name": f"{namespace}/{policy_name}",
-                                    "container": "N/A",
-                                    "check_id": CHECK_ID,
-                                    "check_name": CHECK_NAME_PERMISSIVE,
-                                    "cwe": CWE,
-                                    "message": f"NetworkPolicy '{policy_name}' allows all ingress traffic",
-                                    "details": DETAILS_INGRESS_ALLOW_ALL,
-                                }
+                                Finding(
+                                    METADATA_PERMISSIVE,
+                                    severity=SEVERITY_MEDIUM,
+                                    resource_type=RESOURCE_TYPE,
+                                    resource_name=f"{namespace}/{policy_name}",
+                                    container="N/A",
+                                    message=f"NetworkPolicy '{policy_name}' allows all ingress traffic",
+                                    details=DETAILS_INGRESS_ALLOW_ALL,
+                                )
                             )
 
                 # Check if egress rules are too permissive
@@ -70,17 +75,15 @@ def check(network_policies: List[Any], namespace: str) -> List[Dict[str, Any]]:
                     for egress_rule in policy.spec.egress:
                         if not egress_rule.to:
                             findings.append(
-                                {
-                                    "severity": SEVERITY_MEDIUM,
-                                    "resource_type": RESOURCE_TYPE,
-                                    "resource_name": f"{namespace}/{policy_name}",
-                                    "container": "N/A",
-                                    "check_id": CHECK_ID,
-                                    "check_name": CHECK_NAME_PERMISSIVE,
-                                    "cwe": CWE,
-                                    "message": f"NetworkPolicy '{policy_name}' allows all egress traffic",
-                                    "details": DETAILS_EGRESS_ALLOW_ALL,
-                                }
+                                Finding(
+                                    METADATA_PERMISSIVE,
+                                    severity=SEVERITY_MEDIUM,
+                                    resource_type=RESOURCE_TYPE,
+                                    resource_name=f"{namespace}/{policy_name}",
+                                    container="N/A",
+                                    message=f"NetworkPolicy '{policy_name}' allows all egress traffic",
+                                    details=DETAILS_EGRESS_ALLOW_ALL,
+                                )
                             )
 
     return findings
@@ -0,0 +1,56 @@
+from typing import List, Any, Iterator, Tuple
+
+from .finding import CheckMetadata, Finding
+from .secret_scanner import scan_objects
+
+#
+# check_configmap_secrets.py
+#
+# Check #24: Secrets stored in ConfigMaps
+# CWE-312: Cleartext Storage of Sensitive Information
+#
+# Scans ConfigMap data and binaryData for credentials: known token formats
+# (PEM private keys, JWTs, cloud access keys) and high-entropy tokens.
+# Secret payloads are not scanned, holding credentials is their purpose.
+#
+
+# Security check metadata
+CHECK_ID = "24"
+CHECK_NAME = "Secrets in ConfigMaps"
+CWE = "CWE-312"
+CATEGORY = "config"
+RESOURCES = ["config_maps"]
+METADATA = CheckMetadata(CHECK_ID, CHECK_NAME, CWE)
+SEVERITY = "HIGH"
+RESOURCE_TYPE = "ConfigMap"
+DETAILS = "ConfigMaps are not meant for secrets: they are readable by more roles, and are not encrypted at rest."
+
+
+#
+# _items
+# Yields the (key, value, binary) items of a ConfigMap
+#
+def _items(cm: Any) -> Iterator[Tuple[str, str, bool]]:
+    for key, value in (cm.data or {}).items():
+        yield key, value, False
+    for key, value in (cm.binary_data or {}).items():
+        yield key, value, True
+
+
+def check(config_maps: List[Any]) -> List[Finding]:
+    findings = []
+
+    for cm, key, labels in scan_objects(config_maps, _items):
+        findings.append(
+            Finding(
+                METADATA,
+                severity=SEVERITY,
+                resource_type=RESOURCE_TYPE,
+                resource_name=f"{cm.metadata.namespace}/{cm.metadata.name}",
+                container="N/A",
+                message=f"ConfigMap '{cm.metadata.name}' holds a {', '.join(labels)} in key '{key}'",
+                details=DETAILS,
+            )
+        )
+
+    return findings
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from kubernetes import client
+
+from citrouille.defaults import DEFAULT_CACHE_TTL
+from citrouille.kube_client import RESOURCE_KINDS
+from citrouille.resource_view import ResourceView, view
+
+from .finding import Finding, as_dict
+
+#
+# cluster_cache.py
+#
+# Cache of the cluster-scoped resources (ClusterRoles, ClusterRoleBindings) and
+# of the findings of the checks looking at them. Those resources are the same
+# for every scanned namespace, so they are fetched and checked once per
+# cluster:
+# - findings are reused as long as the checked objects keep the same UIDs and
+#   resourceVersions, whatever their age, and are recomputed as soon as one
+#   object is added, removed or modified, so each run still lists the objects
+#   but only checks them again when they changed
+# - with a TTL, the fetched lists themselves are also reused until they are
+#   older than it, without asking the API server whether they changed: a
+#   binding created in the meantime is not seen before the list expires
+# The cache can be saved to a JSON file and loaded back by the next run.
+#
+
+CACHE_FORMAT = "citrouille-cluster-cache"
+CACHE_VERSION = 1
+
+
+#
+# cache_path
+# Returns the cache file of a cluster in a cache directory, named after the
+# kubeconfig and context so that clusters do not share entries
+#
+def cache_path(
+    cache_dir: str, kubeconfig: Optional[str] = None, context: Optional[str] = None
+) -> str:
+    key = f"{os.path.abspath(kubeconfig) if kubeconfig else ''}|{context or ''}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"cluster-{digest}.json")
+
+
+#
+# fingerprint
+# Returns a digest of the UIDs and resourceVersions of the objects of each kind,
+# or None when an object has no resourceVersion to validate it with
+#
+def fingerprint(resources: Iterable[Tuple[str, List[Any]]]) -> Optional[str]:
+    digest = hashlib.sha256()
+    for kind, objects in resources:
+        versions = []
+        for obj in objects:
+            metadata = obj.metadata
+            uid = getattr(metadata, "uid", None) or metadata.name
+            resource_version = getattr(metadata, "resource_version", None)
+            if not isinstance(uid, str) or not isinstance(resource_version, str):
+                return None
+            versions.append(f"{uid}:{resource_version}")
+        digest.update(kind.encode() + b"\0")
+        for version in sorted(versions):
+            digest.update(version.encode() + b"\0")
+    return digest.hexdigest()
+
+
+class ClusterCache:
+    def __init__(
+        self,
+        ttl: float = DEFAULT_CACHE_TTL,
+        path: Optional[str] = None,
+        version: str = "",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl
+        self.path = path
+        # Version of citrouille, findings saved by another version are dropped
+        self.version = version
+        self.clock = clock
+        # kind -> (fetch time, objects)
+        self._objects: Dict[str, Tuple[float, List[Any]]] = {}
+        # check ID -> (fingerprint, findings)
+        self._findings: Dict[str, Tuple[str, List[Finding]]] = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.reused_findings = 0
+
+    #
+    # objects
+    # Returns the cached objects of a kind, or calls fetch() to list them when
+    # they are missing or older than the TTL
+    # With a TTL of 0, the objects are listed every time
+    #
+    def objects(self, kind: str, fetch: Callable[[], Iterable[Any]]) -> List[Any]:
+        with self._lock:
+            entry = self._objects.get(kind)
+        if entry is not None and self.clock() - entry[0] < self.ttl:
+            return entry[1]
+
+        objects = list(fetch())
+        with self._lock:
+            self._objects[kind] = (self.clock(), objects)
+            self.fetches += 1
+        return objects
+
+    #
+    # findings
+    # Returns the findings of a check on cluster-scoped resources, calling run()
+    # only when the resources changed since the findings were cached
+    # resources lists the (kind, objects) the check reads
+    #
+    def findings(
+        self,
+        check_id: str,
+        resources: Iterable[Tuple[str, List[Any]]],
+        run: Callable[[], List[Finding]],
+    ) -> List[Finding]:
+        key = fingerprint(resources)
+        with self._lock:
+            entry = self._findings.get(check_id)
+        if key is not None and entry is not None and entry[0] == key:
+            with self._lock:
+                self.reused_findings += 1
+            return list(entry[1])
+
+        findings = run()
+        if key is not None:
+            with self._lock:
+                self._findings[check_id] = (key, list(findings))
+        return findings
+
+    #
+    # load
+    # Reads the cache file, if any
+    # A missing, unreadable or outdated file leaves the cache empty
+    #
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (
+            not isinstance(document, dict)
+            or document.get("format") != CACHE_FORMAT
+            or document.get("version") != CACHE_VERSION
+            or document.get("citrouille") != self.version
+        ):
+            return
+
+        with self._lock:
+            for kind, entry in (document.get("objects") or {}).items():
+                if kind not in RESOURCE_KINDS:
+                    continue
+                model = RESOURCE_KINDS[kind][4]
+                self._objects[kind] = (
+                    entry["fetched"],
+                    [view(data, model) for data in entry["items"]],
+                )
+            for check_id, entry in (document.get("findings") or {}).items():
+                self._findings[check_id] = (
+                    entry["fingerprint"],
+                    [Finding.from_dict(data) for data in entry["findings"]],
+                )
+
+    #
+    # save
+    # Writes the cache file, replacing it atomically
+    #
+    def save(self):
+        if not self.path:
+            return
+        api_client = _serializer()
+        with self._lock:
+            document = {
+                "format": CACHE_FORMAT,
+                "version": CACHE_VERSION,
+                "citrouille": self.version,
+                "objects": {
+                    kind: {
+                        "fetched": fetched,
+                        "items": [_to_json(obj, api_client) for obj in objects],
+                    }
+                    for kind, (fetched, objects) in self._objects.items()
+                    if self.ttl > 0
+                },
+                "findings": {
+                    check_id: {
+                        "fingerprint": key,
+                        "findings": [as_dict(finding) for finding in findings],
+                    }
+                    for check_id, (key, findings) in self._findings.items()
+                },
+            }
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(document, f, separators=(",", ":"), default=str)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+#
+# _serializer
+# Returns the API client converting model objects to JSON, created on first use
+# It only serializes objects and never opens a connection
+#
+@lru_cache(maxsize=None)
+def _serializer() -> Any:
+    return client.ApiClient()
+
+
+#
+# _to_json
+# Converts a model object or a ResourceView to its API JSON form
+#
+def _to_json(obj: Any, api_client: Any) -> Dict[str, Any]:
+    if isinstance(obj, ResourceView):
+        return obj.to_dict()
+    return api_client.sanitize_for_serialization(obj)
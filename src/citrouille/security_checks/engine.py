@@ -0,0 +1,195 @@
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from citrouille.instrumentation import observing, report
+
+from .finding import Finding
+
+#
+# engine.py
+#
+# Single-pass traversal engine for the deployment checks.
+# Each pod template is walked once, and its pod-level settings, containers,
+# init containers and volumes are dispatched to the rules registered by the
+# checks, instead of every check looping over every deployment on its own.
+#
+# Rules are plain functions returning a list of findings:
+# - check_pod(pod)                         called once per deployment
+# - check_container(pod, container, kind)  called for each container and init container
+# - check_volume(pod, volume)              called for each volume
+#
+# While instrumentation observers are registered, the time spent in the rules
+# of each registered check is summed over a walk and reported as one span per
+# check, rather than one span per rule call.
+#
+
+# Container kinds, as used at the start of finding messages
+CONTAINER = "Container"
+INIT_CONTAINER = "Init container"
+
+PodRule = Callable[["PodContext"], List[Finding]]
+ContainerRule = Callable[["PodContext", Any, str], List[Finding]]
+VolumeRule = Callable[["PodContext", Any], List[Finding]]
+
+
+class PodContext:
+    __slots__ = (
+        "deployment",
+        "name",
+        "namespace",
+        "resource_name",
+        "spec",
+        "security_context",
+    )
+
+    def __init__(self, deployment: Any):
+        self.deployment = deployment
+        self.name = deployment.metadata.name
+        self.namespace = deployment.metadata.namespace
+        self.resource_name = f"{self.namespace}/{self.name}"
+        self.spec = deployment.spec.template.spec
+        self.security_context = self.spec.security_context
+
+
+class PodSpecWalker:
+    def __init__(
+        self,
+        pod_rules: Iterable[PodRule] = (),
+        container_rules: Iterable[ContainerRule] = (),
+        volume_rules: Iterable[VolumeRule] = (),
+    ):
+        self.pod_rules = list(pod_rules)
+        self.container_rules = list(container_rules)
+        self.volume_rules = list(volume_rules)
+        # rule -> check ID, for the rules of registered checks
+        self.check_ids: Dict[Callable[..., List[Finding]], str] = {}
+
+    #
+    # register
+    # Registers the check_pod, check_container and check_volume rules of a check module
+    # The rules of the check are timed while instrumentation observers are registered
+    #
+    def register(self, check_module: Any):
+        check_id = getattr(check_module, "CHECK_ID", "")
+        check_pod: Optional[PodRule] = getattr(check_module, "check_pod", None)
+        check_container: Optional[ContainerRule] = getattr(
+            check_module, "check_container", None
+        )
+        check_volume: Optional[VolumeRule] = getattr(check_module, "check_volume", None)
+
+        if check_pod:
+            self.pod_rules.append(check_pod)
+            self.check_ids[check_pod] = check_id
+        if check_container:
+            self.container_rules.append(check_container)
+            self.check_ids[check_container] = check_id
+        if check_volume:
+            self.volume_rules.append(check_volume)
+            self.check_ids[check_volume] = check_id
+
+    #
+    # walk
+    # Walks every pod template once and returns the findings of all registered rules
+    #
+    def walk(self, deployments: Iterable[Any]) -> List[Finding]:
+        return list(self.iter_walk(deployments))
+
+    #
+    # iter_walk
+    # Walks every pod template once and yields the findings of all registered
+    # rules, deployment by deployment
+    # Parts of the pod spec no rule is interested in are not visited
+    #
+    def iter_walk(self, deployments: Iterable[Any]) -> Iterator[Finding]:
+        if self.check_ids and observing():
+            return self._iter_walk_timed(deployments)
+        return self._iter_walk(deployments)
+
+    #
+    # _iter_walk_timed
+    # Walks the pod templates like iter_walk, summing the wall-clock time and
+    # traced allocations of the rules of each check, and reports them once the
+    # walk ends, as one span per check laid end to end from the start of the walk
+    # CPU time costs a system call to read, so it is read once per deployment
+    # and shared between the checks by their wall-clock time
+    #
+    def _iter_walk_timed(self, deployments: Iterable[Any]) -> Iterator[Finding]:
+        tracing = tracemalloc.is_tracing()
+        clock = time.perf_counter
+        # check ID -> [wall, allocated]
+        totals: Dict[str, List[Any]] = {}
+
+        def measure(rule: Callable[..., List[Finding]]) -> Callable[..., List[Finding]]:
+            check_id = self.check_ids.get(rule)
+            if check_id is None:
+                return rule
+            total = totals.setdefault(check_id, [0.0, 0])
+
+            def measured(*args: Any) -> List[Finding]:
+                memory = tracemalloc.get_traced_memory()[0] if tracing else 0
+                start = clock()
+                found = rule(*args)
+                total[0] += clock() - start
+                if tracing:
+                    total[1] += tracemalloc.get_traced_memory()[0] - memory
+                return found
+
+            return measured
+
+        walker = PodSpecWalker(
+            [measure(rule) for rule in self.pod_rules],
+            [measure(rule) for rule in self.container_rules],
+            [measure(rule) for rule in self.volume_rules],
+        )
+        start = clock()
+        # CPU and wall-clock time of the walk, without the time spent by the
+        # consumer of the findings
+        cpu = wall = 0.0
+        try:
+            for deployment in deployments:
+                cpu_start = time.thread_time()
+                resumed = clock()
+                found = list(walker._iter_walk((deployment,)))
+                cpu += time.thread_time() - cpu_start
+                wall += clock() - resumed
+                yield from found
+        finally:
+            ratio = min(cpu / wall, 1.0) if wall else 0.0
+            for check_id, (check_wall, allocated) in totals.items():
+                report(
+                    "check",
+                    check_id,
+                    start,
+                    check_wall,
+                    check_wall * ratio,
+                    allocated if tracing else None,
+                )
+                start += check_wall
+
+    def _iter_walk(self, deployments: Iterable[Any]) -> Iterator[Finding]:
+        pod_rules = self.pod_rules
+        container_rules = self.container_rules
+        volume_rules = self.volume_rules
+
+        for deployment in deployments:
+            pod = PodContext(deployment)
+            spec = pod.spec
+
+            for rule in pod_rules:
+                yield from rule(pod)
+
+            if container_rules:
+                if spec.containers:
+                    for container in spec.containers:
+                        for rule in container_rules:
+                            yield from rule(pod, container, CONTAINER)
+                if spec.init_containers:
+                    for container in spec.init_containers:
+                        for rule in container_rules:
+                            yield from rule(pod, container, INIT_CONTAINER)
+
+            if volume_rules and spec.volumes:
+                for volume in spec.volumes:
+                    for rule in volume_rules:
+                        yield from rule(pod, volume)
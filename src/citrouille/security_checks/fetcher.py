@@ -0,0 +1,330 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from citrouille.defaults import DEFAULT_FETCH_WORKERS
+from citrouille.instrumentation import span
+
+from .rbac_graph import RBAC_KINDS, RbacGraph
+
+#
+# fetcher.py
+#
+# Fetch stage of the security checks: the Kubernetes resources needed by the
+# checks are requested concurrently through a bounded thread pool and handed
+# to the checks as a single bundle.
+#
+
+# Resource kinds the checks can ask for
+# kind -> (KubeClient method, whether the method takes the namespace)
+FETCHERS = {
+    "deployments": ("get_raw_deployments", True),
+    "namespace": ("get_namespace_details", True),
+    "config_maps": ("get_config_maps", True),
+    "secrets": ("get_secrets", True),
+    "roles": ("get_roles", True),
+    "cluster_roles": ("get_cluster_roles", False),
+    "role_bindings": ("get_role_bindings", True),
+    "cluster_role_bindings": ("get_cluster_role_bindings", False),
+    "network_policies": ("get_network_policies", True),
+}
+
+# KubeClient resource kinds listed to fetch a kind across the whole cluster,
+# when it differs from the kind name
+CLUSTER_LIST_KINDS = {"namespace": "namespaces"}
+
+# Scope of the bundle holding cluster-scoped resources in a multi-namespace scan
+CLUSTER_SCOPE = "cluster-wide"
+
+
+class FetchError(Exception):
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        details = "; ".join(f"{kind}: {error}" for kind, error in errors.items())
+        super().__init__(f"Failed to fetch {', '.join(errors)}: {details}")
+
+
+class NamespaceNotFoundError(Exception):
+    def __init__(self, namespaces: List[str]):
+        self.namespaces = namespaces
+        super().__init__(f"Namespace not found: {', '.join(namespaces)}")
+
+
+class ResourceBundle:
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.resources: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, Exception] = {}
+        # Bundle holding the cluster-scoped resources, in a multi-namespace scan
+        self.shared: Optional["ResourceBundle"] = None
+        # Resources of the whole scan the RBAC graph is built from, when they
+        # are not the ones of the bundle
+        self.graph_resources: Optional[Dict[str, Any]] = None
+        self._rbac_graph: Optional[RbacGraph] = None
+        self._graph_lock = threading.Lock()
+
+    def __getitem__(self, kind: str) -> Any:
+        return self.resources[kind]
+
+    #
+    # lookup
+    # Returns the resources of a kind read to resolve references
+    # Unlike bundle[kind], cluster-scoped kinds come from the shared cluster
+    # bundle, as they are empty in the namespace bundles of a multi-namespace scan
+    #
+    def lookup(self, kind: str) -> Any:
+        if self.shared is not None and is_cluster_scoped(kind):
+            return self.shared[kind]
+        return self.resources[kind]
+
+    #
+    # rbac_resources
+    # Returns the fetched RBAC resources of the scan, by kind
+    #
+    def rbac_resources(self) -> Dict[str, Any]:
+        if self.shared is not None:
+            return self.shared.rbac_resources()
+        source = self.resources
+        if self.graph_resources is not None:
+            source = self.graph_resources
+        return {kind: source[kind] for kind in RBAC_KINDS if kind in source}
+
+    #
+    # rbac_graph
+    # Returns the RBAC graph of the scan, built once on first use and shared by
+    # the namespace bundles of a multi-namespace scan
+    #
+    def rbac_graph(self) -> RbacGraph:
+        if self.shared is not None:
+            return self.shared.rbac_graph()
+        with self._graph_lock:
+            if self._rbac_graph is None:
+                self._rbac_graph = RbacGraph.from_resources(self.rbac_resources())
+            return self._rbac_graph
+
+    #
+    # has
+    # Tells whether every given resource kind was fetched successfully
+    #
+    def has(self, *kinds: str) -> bool:
+        return all(kind in self.resources for kind in kinds)
+
+    #
+    # raise_for_errors
+    # Raises a FetchError listing every failed fetch, if any
+    #
+    def raise_for_errors(self):
+        if self.errors:
+            raise FetchError(self.errors)
+
+
+#
+# _fetch_one
+# Fetches one resource kind, returning (kind, result, error, elapsed seconds)
+#
+def _fetch_one(kube_client: Any, namespace: str, kind: str, cache: Any = None):
+    method_name, namespaced = FETCHERS[kind]
+    args = (namespace,) if namespaced else ()
+    start = time.perf_counter()
+    try:
+        with span("fetch", kind):
+            if cache is not None and not namespaced:
+                result = cache.objects(kind, getattr(kube_client, method_name))
+            else:
+                result = getattr(kube_client, method_name)(*args)
+        return kind, result, None, time.perf_counter() - start
+    except Exception as e:
+        return kind, None, e, time.perf_counter() - start
+
+
+#
+# fetch_resources
+# Fetches the given resource kinds concurrently and records how long each fetch took
+# A failed fetch is recorded in the bundle's errors without cancelling the others
+# With a ClusterCache, cluster-scoped kinds are read from the cache while fresh
+#
+def fetch_resources(
+    kube_client: Any,
+    namespace: str,
+    kinds: Iterable[str],
+    max_workers: Optional[int] = DEFAULT_FETCH_WORKERS,
+    cache: Any = None,
+) -> ResourceBundle:
+    bundle = ResourceBundle(namespace)
+    kinds = list(dict.fromkeys(kinds))
+    if not kinds:
+        return bundle
+
+    workers = max(1, min(max_workers or len(kinds), len(kinds)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_fetch_one, kube_client, namespace, kind, cache)
+            for kind in kinds
+        ]
+        for future in futures:
+            kind, result, error, elapsed = future.result()
+            bundle.timings[kind] = elapsed
+            if error is not None:
+                bundle.errors[kind] = error
+            else:
+                bundle.resources[kind] = result
+
+    return bundle
+
+
+class ClusterResources:
+    def __init__(self, namespaces: List[str]):
+        self.namespaces = namespaces
+        self.bundles: Dict[str, ResourceBundle] = {
+            namespace: ResourceBundle(namespace) for namespace in namespaces
+        }
+        self.cluster = ResourceBundle(CLUSTER_SCOPE)
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, Exception] = {}
+
+
+#
+# is_cluster_scoped
+# Tells whether a resource kind exists once per cluster instead of once per namespace
+#
+def is_cluster_scoped(kind: str) -> bool:
+    return not FETCHERS[kind][1]
+
+
+#
+# split_cluster_scoped
+# Moves the cluster-scoped resources of a namespace bundle to a separate
+# cluster bundle, as in a multi-namespace scan, and returns both new bundles
+# They stay available to the namespace bundle through lookup()
+#
+def split_cluster_scoped(
+    bundle: ResourceBundle,
+) -> Tuple[ResourceBundle, ResourceBundle]:
+    namespace_bundle = ResourceBundle(bundle.namespace)
+    cluster_bundle = ResourceBundle(CLUSTER_SCOPE)
+    namespace_bundle.timings = bundle.timings
+    namespace_bundle.errors = bundle.errors
+    namespace_bundle.shared = cluster_bundle
+    cluster_bundle.graph_resources = bundle.resources
+    for kind, result in bundle.resources.items():
+        if is_cluster_scoped(kind):
+            cluster_bundle.resources[kind] = result
+            namespace_bundle.resources[kind] = []
+        else:
+            namespace_bundle.resources[kind] = result
+            if kind != "namespace":
+                cluster_bundle.resources[kind] = []
+    return namespace_bundle, cluster_bundle
+
+
+#
+# _fetch_cluster_wide
+# Lists one resource kind across all namespaces, returning (kind, result, error, elapsed seconds)
+#
+def _fetch_cluster_wide(kube_client: Any, kind: str, cache: Any = None):
+    start = time.perf_counter()
+    try:
+        list_kind = CLUSTER_LIST_KINDS.get(kind, kind)
+        with span("fetch", kind):
+            if cache is not None and is_cluster_scoped(kind):
+                result = cache.objects(
+                    kind, lambda: kube_client.iter_resources(list_kind)
+                )
+            else:
+                result = list(kube_client.iter_resources(list_kind))
+        return kind, result, None, time.perf_counter() - start
+    except Exception as e:
+        return kind, None, e, time.perf_counter() - start
+
+
+#
+# fetch_cluster_resources
+# Fetches the given resource kinds once for the whole cluster, and splits the
+# namespaced ones into one bundle per namespace
+# With namespaces set to None, every namespace of the cluster is included;
+# otherwise NamespaceNotFoundError is raised for namespaces that do not exist
+# Cluster-scoped kinds go to the cluster bundle, and are empty in the namespace
+# bundles so that checks taking both kinds of resources report them only once;
+# they stay available to the namespace bundles through lookup()
+# With a ClusterCache, cluster-scoped kinds are read from the cache while fresh
+#
+def fetch_cluster_resources(
+    kube_client: Any,
+    namespaces: Optional[List[str]],
+    kinds: Iterable[str],
+    max_workers: Optional[int] = DEFAULT_FETCH_WORKERS,
+    cache: Any = None,
+) -> ClusterResources:
+    kinds = list(dict.fromkeys(kinds))
+    fetch_kinds = list(kinds)
+    # The namespaces are listed even when no check reads them, to tell a
+    # namespace that does not exist from an empty one
+    if "namespace" not in fetch_kinds:
+        fetch_kinds.append("namespace")
+
+    fetched: Dict[str, List[Any]] = {}
+    timings: Dict[str, float] = {}
+    errors: Dict[str, Exception] = {}
+
+    workers = max(1, min(max_workers or len(fetch_kinds), len(fetch_kinds)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_fetch_cluster_wide, kube_client, kind, cache)
+            for kind in fetch_kinds
+        ]
+        for future in futures:
+            kind, result, error, elapsed = future.result()
+            timings[kind] = elapsed
+            if error is not None:
+                errors[kind] = error
+            else:
+                fetched[kind] = result
+
+    if namespaces is None:
+        if "namespace" in errors:
+            raise FetchError({"namespace": errors["namespace"]})
+        namespaces = [ns.metadata.name for ns in fetched["namespace"]]
+    # Without the right to list namespaces, the given ones are scanned as they are
+    elif "namespace" in fetched:
+        names = {ns.metadata.name for ns in fetched["namespace"]}
+        missing = [namespace for namespace in namespaces if namespace not in names]
+        if missing:
+            raise NamespaceNotFoundError(missing)
+
+    cluster_resources = ClusterResources(namespaces)
+    for bundle in cluster_resources.bundles.values():
+        bundle.shared = cluster_resources.cluster
+    # The RBAC graph joins the roles and bindings of every namespace
+    cluster_resources.cluster.graph_resources = {
+        kind: fetched[kind] for kind in kinds if kind in fetched
+    }
+    cluster_resources.timings = {kind: timings[kind] for kind in kinds}
+    cluster_resources.errors = {
+        kind: error for kind, error in errors.items() if kind in kinds
+    }
+
+    for kind in kinds:
+        if kind not in fetched:
+            continue
+        bundles = cluster_resources.bundles
+        if is_cluster_scoped(kind):
+            cluster_resources.cluster.resources[kind] = fetched[kind]
+            for bundle in bundles.values():
+                bundle.resources[kind] = []
+        elif kind == "namespace":
+            for namespace_obj in fetched[kind]:
+                bundle = bundles.get(namespace_obj.metadata.name)
+                if bundle is not None:
+                    bundle.resources[kind] = namespace_obj
+        else:
+            cluster_resources.cluster.resources[kind] = []
+            for bundle in bundles.values():
+                bundle.resources[kind] = []
+            for item in fetched[kind]:
+                bundle = bundles.get(item.metadata.namespace)
+                if bundle is not None:
+                    bundle.resources[kind].append(item)
+
+    return cluster_resources
@@ -0,0 +1,174 @@
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+#
+# finding.py
+#
+# Value type of the security findings.
+# A scan can report hundreds of thousands of findings, so they are slotted
+# objects rather than dicts: the metadata of the check (ID, name, CWE) is one
+# CheckMetadata object shared by every finding of the check, details are the
+# constants of the check module, and resource and container names are
+# interned, so that the findings of one deployment share their strings.
+# Findings read like the dicts they replace (finding["severity"],
+# finding.get("container")) and are converted to dicts by the formatters only.
+#
+
+# Keys of the dict form of a finding, in output order
+FIELDS = (
+    "severity",
+    "resource_type",
+    "resource_name",
+    "container",
+    "check_id",
+    "check_name",
+    "cwe",
+    "message",
+    "details",
+)
+
+
+class CheckMetadata:
+    __slots__ = ("check_id", "check_name", "cwe")
+
+    def __init__(self, check_id: str, check_name: str, cwe: str):
+        self.check_id = check_id
+        self.check_name = check_name
+        self.cwe = cwe
+
+    def __repr__(self) -> str:
+        return f"CheckMetadata({self.check_id!r}, {self.check_name!r}, {self.cwe!r})"
+
+
+# Metadata of findings read back from dicts, shared by (ID, name, CWE)
+_METADATA: Dict[Tuple[str, str, str], CheckMetadata] = {}
+
+
+class Finding:
+    __slots__ = (
+        "metadata",
+        "severity",
+        "resource_type",
+        "resource_name",
+        "container",
+        "message",
+        "details",
+    )
+
+    def __init__(
+        self,
+        metadata: CheckMetadata,
+        severity: str,
+        resource_type: str,
+        resource_name: str,
+        container: str = "N/A",
+        message: str = "",
+        details: str = "",
+    ):
+        self.metadata = metadata
+        self.severity = severity
+        self.resource_type = resource_type
+        self.resource_name = _intern(resource_name)
+        self.container = _intern(container)
+        self.message = message
+        self.details = details
+
+    @property
+    def check_id(self) -> str:
+        return self.metadata.check_id
+
+    @property
+    def check_name(self) -> str:
+        return self.metadata.check_name
+
+    @property
+    def cwe(self) -> str:
+        return self.metadata.cwe
+
+    #
+    # from_dict
+    # Creates a finding from its dict form
+    #
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Finding":
+        key = (data.get("check_id"), data.get("check_name"), data.get("cwe"))
+        metadata = _METADATA.get(key)
+        if metadata is None:
+            metadata = _METADATA.setdefault(key, CheckMetadata(*key))
+        return cls(
+            metadata,
+            data.get("severity"),
+            data.get("resource_type"),
+            data.get("resource_name"),
+            data.get("container", "N/A"),
+            data.get("message"),
+            data.get("details"),
+        )
+
+    #
+    # to_dict
+    # Returns the dict form of the finding, with the keys in output order
+    #
+    def to_dict(self) -> Dict[str, Any]:
+        metadata = self.metadata
+        return {
+            "severity": self.severity,
+            "resource_type": self.resource_type,
+            "resource_name": self.resource_name,
+            "container": self.container,
+            "check_id": metadata.check_id,
+            "check_name": metadata.check_name,
+            "cwe": metadata.cwe,
+            "message": self.message,
+            "details": self.details,
+        }
+
+    # Read-only mapping interface, as for the dicts findings used to be
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in FIELDS:
+            return default
+        return getattr(self, key)
+
+    def keys(self) -> Tuple[str, ...]:
+        return FIELDS
+
+    def __contains__(self, key: object) -> bool:
+        return key in FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Finding):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Finding({self.to_dict()!r})"
+
+
+#
+# as_dict
+# Returns the dict form of a finding, given as a Finding or as a dict
+#
+def as_dict(finding: Any) -> Dict[str, Any]:
+    if isinstance(finding, Finding):
+        return finding.to_dict()
+    return finding
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if type(value) is str else value
@@ -0,0 +1,222 @@
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .engine import PodSpecWalker
+from .finding import Finding
+from .fetcher import CLUSTER_LIST_KINDS, fetch_resources
+from .registry import CheckInfo
+
+#
+# incremental.py
+#
+# Incremental re-evaluation of the security checks on top of watch streams.
+# Findings are kept per deployment for the pod template checks, and per check
+# for the others. When an object changes, only the findings that can depend on
+# it are computed again: the pod template checks of the changed deployment,
+# or the other checks taking the changed resource kind.
+#
+
+# Change events emitted for findings
+ADDED = "added"
+RESOLVED = "resolved"
+
+
+#
+# finding_key
+# Identifies a finding across evaluations
+#
+def finding_key(finding: Finding) -> Tuple[str, str, str, str]:
+    return (
+        finding["check_id"],
+        finding["resource_name"],
+        finding.get("container", "N/A"),
+        finding["message"],
+    )
+
+
+#
+# diff_findings
+# Returns the findings added and resolved between two evaluations
+#
+def diff_findings(
+    previous: List[Finding], current: List[Finding]
+) -> Tuple[List[Finding], List[Finding]]:
+    previous_keys = {finding_key(finding) for finding in previous}
+    current_keys = {finding_key(finding) for finding in current}
+    added = [f for f in current if finding_key(f) not in previous_keys]
+    resolved = [f for f in previous if finding_key(f) not in current_keys]
+    return added, resolved
+
+
+class IncrementalScanner:
+    def __init__(self, kube_client: Any, namespace: str, checks: List[CheckInfo]):
+        self.kube_client = kube_client
+        self.namespace = namespace
+        self.pod_checks = [info for info in checks if info.has_pod_rules]
+        self.other_checks = [info for info in checks if not info.has_pod_rules]
+
+        self.walker = PodSpecWalker()
+        for info in self.pod_checks:
+            self.walker.register(info.module)
+
+        # deployment name -> findings of the pod template checks
+        self.deployment_findings: Dict[str, List[Finding]] = {}
+        # check ID -> findings of the other checks
+        self.check_findings: Dict[str, List[Finding]] = {}
+
+        self._changes: "queue.Queue[Tuple[str, str, Any]]" = queue.Queue()
+
+    #
+    # kinds
+    # Lists the resource kinds watched for the checks
+    #
+    def kinds(self) -> List[str]:
+        kinds = ["deployments"] if self.pod_checks else []
+        for info in self.other_checks:
+            kinds.extend(kind for kind in info.fetch_kinds if kind not in kinds)
+        return kinds
+
+    #
+    # subscribe
+    # Starts the informers of the watched kinds and queues their change events
+    #
+    def subscribe(self):
+        for kind in self.kinds():
+            informer = self.kube_client.informer(CLUSTER_LIST_KINDS.get(kind, kind))
+            informer.add_handler(
+                lambda event_type, obj, kind=kind: self._changes.put(
+                    (kind, event_type, obj)
+                )
+            )
+
+    #
+    # scan
+    # Evaluates every check on the current resources and returns all findings
+    #
+    def scan(self) -> List[Finding]:
+        if self.pod_checks:
+            self.deployment_findings = {}
+            for deployment in self.kube_client.get_raw_deployments(self.namespace):
+                self.deployment_findings[deployment.metadata.name] = self.walker.walk(
+                    [deployment]
+                )
+
+        for info in self.other_checks:
+            self.check_findings[info.check_id] = self._run_check(info)
+
+        return self.findings()
+
+    #
+    # findings
+    # Returns the current findings, in check order
+    #
+    def findings(self) -> List[Finding]:
+        findings = [f for found in self.deployment_findings.values() for f in found]
+        for found in self.check_findings.values():
+            findings.extend(found)
+        findings.sort(key=lambda finding: int(finding["check_id"]))
+        return findings
+
+    #
+    # wait_for_changes
+    # Blocks until objects change, then re-evaluates the affected checks
+    # Changes arriving together are evaluated at once
+    # Returns the added and resolved findings, or None on timeout
+    #
+    def wait_for_changes(
+        self, timeout: Optional[float] = None
+    ) -> Optional[Tuple[List[Finding], List[Finding]]]:
+        try:
+            changes = [self._changes.get(timeout=timeout)]
+        except queue.Empty:
+            return None
+        while True:
+            try:
+                changes.append(self._changes.get_nowait())
+            except queue.Empty:
+                break
+        return self.apply_changes(changes)
+
+    #
+    # apply_changes
+    # Re-evaluates the checks affected by (kind, event type, object) changes
+    #
+    def apply_changes(
+        self, changes: List[Tuple[str, str, Any]]
+    ) -> Tuple[List[Finding], List[Finding]]:
+        added: List[Finding] = []
+        resolved: List[Finding] = []
+
+        deployments: Dict[str, Any] = {}
+        kinds: Set[str] = set()
+        for kind, event_type, obj in changes:
+            if not self._in_scope(kind, obj):
+                continue
+            if kind == "deployments":
+                deployments[obj.metadata.name] = (
+                    None if event_type == "DELETED" else obj
+                )
+            else:
+                kinds.add(kind)
+
+        for name, deployment in deployments.items():
+            previous = self.deployment_findings.pop(name, [])
+            current = self.walker.walk([deployment]) if deployment else []
+            if current:
+                self.deployment_findings[name] = current
+            self._extend(added, resolved, previous, current)
+
+        for info in self.other_checks:
+            if kinds.intersection(info.fetch_kinds):
+                previous = self.check_findings.get(info.check_id, [])
+                current = self._run_check(info)
+                self.check_findings[info.check_id] = current
+                self._extend(added, resolved, previous, current)
+
+        return added, resolved
+
+    #
+    # _in_scope
+    # Tells whether a changed object concerns the scanned namespace
+    #
+    def _in_scope(self, kind: str, obj: Any) -> bool:
+        if kind == "namespace":
+            return obj.metadata.name == self.namespace
+        namespace = obj.metadata.namespace
+        return namespace is None or namespace == self.namespace
+
+    def _run_check(self, info: CheckInfo) -> List[Finding]:
+        resources = fetch_resources(self.kube_client, self.namespace, info.fetch_kinds)
+        if not resources.has(*info.kinds):
+            return self.check_findings.get(info.check_id, [])
+        return info.run(resources, self.namespace)
+
+    @staticmethod
+    def _extend(added, resolved, previous, current):
+        new, gone = diff_findings(previous, current)
+        added.extend(new)
+        resolved.extend(gone)
+
+
+#
+# run_forever
+# Re-evaluates the checks on every change and passes the added and resolved
+# findings to emit, until stop is set
+#
+def run_forever(
+    scanner: IncrementalScanner,
+    emit: Any,
+    stop: Optional[threading.Event] = None,
+    poll_interval: float = 1.0,
+):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        result = scanner.wait_for_changes(timeout=poll_interval)
+        if result is None:
+            continue
+        added, resolved = result
+        for finding in added:
+            emit(ADDED, finding)
+        for finding in resolved:
+            emit(RESOLVED, finding)
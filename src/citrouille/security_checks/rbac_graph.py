@@ -0,0 +1,276 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .rbac_index import ALL, RBAC_INDEX, RbacIndex
+
+#
+# rbac_graph.py
+#
+# Effective permissions of RBAC subjects.
+# Roles and ClusterRoles are reduced to verb masks keyed by (API group,
+# resource) with the RbacIndex, and RoleBindings and ClusterRoleBindings join
+# subjects to them, either in one namespace or cluster-wide. An inverted index
+# keyed by (API group, resource) answers "who can <verb> <resource> in
+# <namespace>" by looking up the matching grants only, without walking every
+# binding, and grants are also indexed by role to tell who holds a role.
+# A scan builds one graph, shared by the namespaces and the checks taking it.
+#
+
+# Resource kinds a graph is built from
+RBAC_KINDS = ("roles", "cluster_roles", "role_bindings", "cluster_role_bindings")
+
+# Subject: (kind, namespace, name), with an empty namespace for users and groups
+Subject = Tuple[str, str, str]
+
+# Role: (kind, namespace, name), with an empty namespace for ClusterRoles
+RoleKey = Tuple[str, str, str]
+
+# Permissions: verb masks keyed by (API group, resource)
+Permissions = Dict[Tuple[str, str], int]
+
+
+class Grant:
+    __slots__ = ("subject", "namespace", "role", "binding")
+
+    def __init__(
+        self, subject: Subject, namespace: Optional[str], role: RoleKey, binding: Any
+    ):
+        self.subject = subject
+        # Namespace the grant applies to, None for cluster-wide grants
+        self.namespace = namespace
+        self.role = role
+        self.binding = binding
+
+
+#
+# subject_key
+# Returns the key of a binding subject
+# Service accounts without a namespace belong to the namespace of the binding
+#
+def subject_key(subject: Any, binding_namespace: Optional[str] = None) -> Subject:
+    namespace = ""
+    if subject.kind == "ServiceAccount":
+        namespace = subject.namespace or binding_namespace or ""
+    return subject.kind, namespace, subject.name
+
+
+#
+# role_key
+# Returns the key of the role referenced by a binding
+#
+def role_key(binding: Any, binding_namespace: Optional[str]) -> RoleKey:
+    role_ref = binding.role_ref
+    if role_ref.kind == "Role":
+        return "Role", binding_namespace or "", role_ref.name
+    return "ClusterRole", "", role_ref.name
+
+
+class RbacGraph:
+    def __init__(self, index: RbacIndex = RBAC_INDEX):
+        self.index = index
+        self._role_rules: Dict[RoleKey, Any] = {}
+        self._role_permissions: Dict[RoleKey, Permissions] = {}
+        self.grants: List[Grant] = []
+        self.missing_roles: Set[RoleKey] = set()
+        self._by_subject: Dict[Subject, List[Grant]] = {}
+        self._by_role: Dict[RoleKey, List[Grant]] = {}
+        # Resource kinds the graph was built from, the others could not be fetched
+        self.kinds: Set[str] = set(RBAC_KINDS)
+        # (API group, resource) -> [(grant, verbs)], filled on the first query
+        self._by_resource: Optional[Dict[Tuple[str, str], List[Tuple[Grant, int]]]] = (
+            None
+        )
+
+    #
+    # build
+    # Creates a graph from roles, cluster roles and both kinds of bindings
+    #
+    @classmethod
+    def build(
+        cls,
+        roles: Iterable[Any] = (),
+        cluster_roles: Iterable[Any] = (),
+        role_bindings: Iterable[Any] = (),
+        cluster_role_bindings: Iterable[Any] = (),
+        index: RbacIndex = RBAC_INDEX,
+    ) -> "RbacGraph":
+        graph = cls(index)
+        graph.add_roles(roles, cluster_roles)
+        graph.add_bindings(role_bindings, cluster_role_bindings)
+        return graph
+
+    #
+    # from_resources
+    # Creates a graph from the RBAC kinds of a resources dict, such as the
+    # resources of a ResourceBundle, recording which of them were available
+    #
+    @classmethod
+    def from_resources(
+        cls, resources: Dict[str, Any], index: RbacIndex = RBAC_INDEX
+    ) -> "RbacGraph":
+        graph = cls.build(
+            *(resources.get(kind, ()) for kind in RBAC_KINDS), index=index
+        )
+        graph.kinds = {kind for kind in RBAC_KINDS if kind in resources}
+        return graph
+
+    def add_roles(self, roles: Iterable[Any] = (), cluster_roles: Iterable[Any] = ()):
+        for role in roles:
+            key = ("Role", role.metadata.namespace or "", role.metadata.name)
+            self._role_rules[key] = role.rules
+        for cluster_role in cluster_roles:
+            self._role_rules[("ClusterRole", "", cluster_role.metadata.name)] = (
+                cluster_role.rules
+            )
+        self._by_resource = None
+
+    def add_bindings(
+        self,
+        role_bindings: Iterable[Any] = (),
+        cluster_role_bindings: Iterable[Any] = (),
+    ):
+        for binding in role_bindings:
+            self._add_binding(binding, binding.metadata.namespace)
+        for binding in cluster_role_bindings:
+            self._add_binding(binding, None)
+        self._by_resource = None
+
+    def _add_binding(self, binding: Any, namespace: Optional[str]):
+        role = role_key(binding, namespace)
+        if role not in self._role_rules:
+            self.missing_roles.add(role)
+        for subject in binding.subjects or ():
+            grant = Grant(subject_key(subject, namespace), namespace, role, binding)
+            self.grants.append(grant)
+            self._by_subject.setdefault(grant.subject, []).append(grant)
+            self._by_role.setdefault(role, []).append(grant)
+
+    #
+    # role_permissions
+    # Returns the permissions granted by a role, empty for unknown roles
+    #
+    def role_permissions(self, role: RoleKey) -> Permissions:
+        permissions = self._role_permissions.get(role)
+        if permissions is None:
+            permissions = self.index.permissions(self._role_rules.get(role))
+            self._role_permissions[role] = permissions
+        return permissions
+
+    #
+    # binding_permissions
+    # Returns the permissions granted by a binding to each of its subjects
+    #
+    def binding_permissions(
+        self, binding: Any, namespace: Optional[str]
+    ) -> Permissions:
+        return self.role_permissions(role_key(binding, namespace))
+
+    #
+    # holders
+    # Lists the subjects a role is bound to, in any namespace, or only by
+    # ClusterRoleBindings with cluster_wide
+    #
+    def holders(self, role: RoleKey, cluster_wide: bool = False) -> List[Subject]:
+        return sorted(
+            {
+                grant.subject
+                for grant in self._by_role.get(role, ())
+                if not cluster_wide or grant.namespace is None
+            }
+        )
+
+    #
+    # permissions
+    # Returns the effective permissions of a subject in a namespace, merging its
+    # cluster-wide grants and the grants of the namespace
+    # A namespace of None returns the cluster-wide permissions only
+    #
+    def permissions(
+        self, subject: Subject, namespace: Optional[str] = None
+    ) -> Permissions:
+        merged: Permissions = {}
+        for grant in self._by_subject.get(subject, ()):
+            if grant.namespace is not None and grant.namespace != namespace:
+                continue
+            for key, verbs in self.role_permissions(grant.role).items():
+                merged[key] = merged.get(key, 0) | verbs
+        return merged
+
+    #
+    # can
+    # Tells whether a subject can use a verb on a resource in a namespace
+    #
+    def can(
+        self,
+        subject: Subject,
+        verb: str,
+        resource: str,
+        namespace: Optional[str] = None,
+        api_group: str = "",
+    ) -> bool:
+        verbs = self.index.verbs_mask([verb])
+        permissions = self.permissions(subject, namespace)
+        return any(
+            permissions.get(key, 0) & verbs for key in _lookup_keys(api_group, resource)
+        )
+
+    #
+    # who_can
+    # Lists the subjects that can use a verb on a resource in a namespace,
+    # optionally only those of a kind (ServiceAccount, User, Group)
+    # A namespace of None only counts cluster-wide grants
+    #
+    def who_can(
+        self,
+        verb: str,
+        resource: str,
+        namespace: Optional[str] = None,
+        api_group: str = "",
+        subject_kind: Optional[str] = None,
+    ) -> List[Subject]:
+        verbs = self.index.verbs_mask([verb])
+        by_resource = self._resource_index()
+        subjects: Set[Subject] = set()
+        for key in _lookup_keys(api_group, resource):
+            for grant, granted in by_resource.get(key, ()):
+                if not granted & verbs:
+                    continue
+                if grant.namespace is not None and grant.namespace != namespace:
+                    continue
+                if subject_kind and grant.subject[0] != subject_kind:
+                    continue
+                subjects.add(grant.subject)
+        return sorted(subjects)
+
+    #
+    # is_admin
+    # Tells whether permissions grant every verb on every resource of every group
+    #
+    @staticmethod
+    def is_admin(permissions: Permissions) -> bool:
+        return permissions.get(("*", "*"), 0) == ALL
+
+    def _resource_index(self) -> Dict[Tuple[str, str], List[Tuple[Grant, int]]]:
+        if self._by_resource is None:
+            by_resource: Dict[Tuple[str, str], List[Tuple[Grant, int]]] = {}
+            for grant in self.grants:
+                for key, verbs in self.role_permissions(grant.role).items():
+                    by_resource.setdefault(key, []).append((grant, verbs))
+            self._by_resource = by_resource
+        return self._by_resource
+
+
+#
+# format_subject
+# Returns a subject as shown in findings, such as "ServiceAccount prod/ci"
+#
+def format_subject(subject: Subject) -> str:
+    kind, namespace, name = subject
+    return f"{kind} {namespace}/{name}" if namespace else f"{kind} {name}"
+
+
+#
+# _lookup_keys
+# Lists the permission keys matching an API group and resource, wildcards included
+#
+def _lookup_keys(api_group: str, resource: str) -> List[Tuple[str, str]]:
+    return [(api_group, resource), (api_group, "*"), ("*", resource), ("*", "*")]
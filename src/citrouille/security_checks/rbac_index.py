@@ -0,0 +1,151 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+#
+# rbac_index.py
+#
+# Bitset index of RBAC permissions.
+# Verbs and resources are interned as bits, so that the verbs or resources of
+# a rule become a single integer and matching a set of permissions against a
+# rule is a bitwise AND. The wildcard "*" is the mask with every bit set.
+# Rules are normalized once and memoized by content: the same rules show up
+# in every namespace (Helm charts, operators), and are then evaluated once
+# per run whatever the number of namespaces.
+#
+
+# Mask of the wildcard, intersecting with every non-empty mask
+ALL = -1
+
+# Rules memoized before the memo is cleared, to bound its memory
+MAX_MEMO_SIZE = 65536
+
+# Verbs interned first, so that their bits do not depend on the scanned roles
+KNOWN_VERBS = [
+    "get",
+    "list",
+    "watch",
+    "create",
+    "update",
+    "patch",
+    "delete",
+    "deletecollection",
+    "impersonate",
+    "bind",
+    "escalate",
+    "approve",
+    "sign",
+]
+
+RuleKey = Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]
+
+
+class NormalizedRule:
+    __slots__ = ("verbs", "resources", "api_groups", "wildcard_api_groups")
+
+    def __init__(self, verbs: int, resources: int, api_groups: Tuple[str, ...]):
+        self.verbs = verbs
+        self.resources = resources
+        self.api_groups = api_groups
+        self.wildcard_api_groups = "*" in api_groups
+
+    @property
+    def wildcard_verbs(self) -> bool:
+        return self.verbs == ALL
+
+    @property
+    def wildcard_resources(self) -> bool:
+        return self.resources == ALL
+
+    #
+    # grants
+    # Tells whether the rule grants any of the verbs on any of the resources
+    # A resources mask of None matches every resource
+    #
+    def grants(self, verbs: int, resources: Optional[int] = None) -> bool:
+        if not self.verbs & verbs:
+            return False
+        return resources is None or bool(self.resources & resources)
+
+
+class RbacIndex:
+    def __init__(self, verbs: Iterable[str] = KNOWN_VERBS):
+        self._bits: Dict[str, Dict[str, int]] = {"verbs": {}, "resources": {}}
+        self._lock = threading.Lock()
+        self._rules: Dict[RuleKey, NormalizedRule] = {}
+        self.verbs_mask(verbs)
+
+    #
+    # verbs_mask
+    # Returns the mask of a list of verbs
+    #
+    def verbs_mask(self, verbs: Iterable[str]) -> int:
+        return self._mask("verbs", verbs)
+
+    #
+    # resources_mask
+    # Returns the mask of a list of resources (including subresources like pods/exec)
+    #
+    def resources_mask(self, resources: Iterable[str]) -> int:
+        return self._mask("resources", resources)
+
+    def _mask(self, table: str, names: Iterable[str]) -> int:
+        bits = self._bits[table]
+        mask = 0
+        for name in names:
+            if name == "*":
+                return ALL
+            bit = bits.get(name)
+            if bit is None:
+                with self._lock:
+                    bit = bits.setdefault(name, 1 << len(bits))
+            mask |= bit
+        return mask
+
+    #
+    # names
+    # Returns the verbs or resources of a mask, "*" for the wildcard
+    #
+    def names(self, table: str, mask: int) -> List[str]:
+        if mask == ALL:
+            return ["*"]
+        return [name for name, bit in self._bits[table].items() if mask & bit]
+
+    #
+    # normalize
+    # Returns the normalized form of a PolicyRule, memoized by content
+    #
+    def normalize(self, rule: Any) -> NormalizedRule:
+        key = (
+            tuple(rule.verbs or ()),
+            tuple(rule.resources or ()),
+            tuple(rule.api_groups or ()),
+        )
+        normalized = self._rules.get(key)
+        if normalized is None:
+            if len(self._rules) >= MAX_MEMO_SIZE:
+                self._rules.clear()
+            normalized = NormalizedRule(
+                self.verbs_mask(key[0]), self.resources_mask(key[1]), key[2]
+            )
+            self._rules[key] = normalized
+        return normalized
+
+    #
+    # permissions
+    # Merges the rules of a role into verb masks keyed by (API group, resource)
+    # Wildcard groups and resources are kept as "*" keys
+    #
+    def permissions(self, rules: Optional[Iterable[Any]]) -> Dict[Tuple[str, str], int]:
+        permissions: Dict[Tuple[str, str], int] = {}
+        for rule in rules or ():
+            normalized = self.normalize(rule)
+            resources = rule.resources or ()
+            for group in normalized.api_groups or ("",):
+                for resource in resources:
+                    key = (group, resource)
+                    permissions[key] = permissions.get(key, 0) | normalized.verbs
+        return permissions
+
+
+# Index shared by the checks
+RBAC_INDEX = RbacIndex()
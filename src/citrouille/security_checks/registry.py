@@ -0,0 +1,188 @@
+import importlib
+import pkgutil
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from .finding import Finding
+from .rbac_graph import RBAC_KINDS
+
+#
+# registry.py
+#
+# Registry of the security checks.
+# Every check_NN_*.py module of this package is a check, and declares its
+# metadata at module level: CHECK_ID, CHECK_NAME, CWE, CATEGORY ("config" or
+# "network") and RESOURCES, the resource kinds its check() function takes.
+# The registry uses that metadata to select checks and to build the list of
+# resource kinds to fetch, so only the resources the selected checks need are
+# requested from the API. Checks setting TAKES_RBAC_GRAPH also get the RBAC
+# graph of the scan, built from whichever RBAC kinds could be fetched.
+#
+
+CATEGORIES = ("config", "network")
+
+
+class CheckInfo:
+    __slots__ = (
+        "check_id",
+        "name",
+        "cwe",
+        "category",
+        "resources",
+        "lookups",
+        "takes_namespace",
+        "takes_rbac_graph",
+        "module",
+    )
+
+    def __init__(self, module: Any):
+        self.check_id = module.CHECK_ID
+        self.name = module.CHECK_NAME
+        self.cwe = module.CWE
+        self.category = module.CATEGORY
+        self.resources = list(module.RESOURCES)
+        self.lookups = list(getattr(module, "LOOKUPS", []))
+        self.takes_namespace = getattr(module, "TAKES_NAMESPACE", False)
+        self.takes_rbac_graph = getattr(module, "TAKES_RBAC_GRAPH", False)
+        self.module = module
+
+    #
+    # has_pod_rules
+    # Tells whether the check runs on the pod spec walker instead of check()
+    #
+    @property
+    def has_pod_rules(self) -> bool:
+        return any(
+            hasattr(self.module, rule)
+            for rule in ("check_pod", "check_container", "check_volume")
+        )
+
+    #
+    # kinds
+    # Lists the resource kinds the check needs: the checked ones, then the ones
+    # only read to resolve references
+    #
+    @property
+    def kinds(self) -> List[str]:
+        return list(dict.fromkeys(self.resources + self.lookups))
+
+    #
+    # fetch_kinds
+    # Lists the resource kinds to fetch for the check: its kinds, then the RBAC
+    # kinds of the graph, which the check runs without when they fail to fetch
+    #
+    @property
+    def fetch_kinds(self) -> List[str]:
+        if not self.takes_rbac_graph:
+            return self.kinds
+        return list(dict.fromkeys(self.kinds + list(RBAC_KINDS)))
+
+    #
+    # run
+    # Runs the check's check() function on the resources of a bundle
+    # Lookup kinds are passed as keyword arguments named after the kind, and
+    # the RBAC graph as rbac_graph
+    #
+    def run(self, resources: Any, namespace: str) -> List[Finding]:
+        args = [resources[kind] for kind in self.resources]
+        if self.takes_namespace:
+            args.append(namespace)
+        lookups = {kind: resources.lookup(kind) for kind in self.lookups}
+        if self.takes_rbac_graph:
+            lookups["rbac_graph"] = resources.rbac_graph()
+        return self.module.check(*args, **lookups)
+
+    def __repr__(self) -> str:
+        return f"CheckInfo({self.check_id}, {self.name!r})"
+
+
+#
+# all_checks
+# Imports every check module of the package once and returns them in check ID order
+#
+@lru_cache(maxsize=None)
+def all_checks() -> tuple:
+    package = importlib.import_module(__package__)
+    checks = []
+    for module_info in pkgutil.iter_modules(package.__path__):
+        if module_info.name.startswith("check_"):
+            module = importlib.import_module(f"{__package__}.{module_info.name}")
+            checks.append(CheckInfo(module))
+    return tuple(sorted(checks, key=lambda info: int(info.check_id)))
+
+
+#
+# get_check
+# Returns the check with the given ID
+#
+def get_check(check_id: str) -> CheckInfo:
+    for info in all_checks():
+        if info.check_id == check_id:
+            return info
+    raise KeyError(f"Unknown check ID: {check_id}")
+
+
+#
+# parse_check_ids
+# Parses a comma-separated list of check IDs such as "1,7,13" or "01,07"
+#
+def parse_check_ids(value: str) -> List[str]:
+    known = {info.check_id for info in all_checks()}
+    check_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        check_id = str(int(part)) if part.isdigit() else part
+        if check_id not in known:
+            raise ValueError(f"Unknown check ID: {part}")
+        check_ids.append(check_id)
+    return check_ids
+
+
+#
+# categories_for
+# Lists the check categories enabled by the check_config and check_network flags
+#
+def categories_for(check_config: bool, check_network: bool) -> List[str]:
+    categories = []
+    if check_config:
+        categories.append("config")
+    if check_network:
+        categories.append("network")
+    return categories
+
+
+#
+# select_checks
+# Selects the checks of the given categories, restricted to only (if given)
+# and without the skipped ones
+#
+def select_checks(
+    categories: Iterable[str] = CATEGORIES,
+    only: Optional[Iterable[str]] = None,
+    skip: Optional[Iterable[str]] = None,
+) -> List[CheckInfo]:
+    categories = set(categories)
+    only = set(only) if only is not None else None
+    skip = set(skip or ())
+
+    return [
+        info
+        for info in all_checks()
+        if info.category in categories
+        and (only is None or info.check_id in only)
+        and info.check_id not in skip
+    ]
+
+
+#
+# kinds_for
+# Lists the resource kinds needed by the given checks, without duplicates
+#
+def kinds_for(checks: Iterable[CheckInfo]) -> List[str]:
+    kinds: Dict[str, None] = {}
+    for info in checks:
+        for kind in info.fetch_kinds:
+            kinds[kind] = None
+    return list(kinds)
@@ -0,0 +1,282 @@
+import base64
+import binascii
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+#
+# secret_scanner.py
+#
+# Shared matching engine for the secret detection checks.
+# The keywords suggesting a secret are compiled once into a single
+# alternation, so that a name is scanned in one pass instead of once per
+# pattern, and results are memoized by name since the same environment
+# variables show up in every replica of a pod template.
+#
+# Values are scanned for known credential formats (PEM private keys, JWTs,
+# cloud and forge access keys) and for high-entropy tokens, in a single pass
+# of one combined pattern. Scans stop after MAX_SCAN_BYTES per object so that
+# multi-megabyte ConfigMaps keep a bounded cost.
+#
+
+# Keywords that suggest secrets in names, matched anywhere and case-insensitively
+SECRET_NAME_KEYWORDS = [
+    "password",
+    "secret",
+    "key",
+    "token",
+    "api[_-]?key",
+    "auth",
+    "credential",
+    "private",
+]
+
+# Names memoized before the memo is cleared, to bound its memory
+MAX_MEMO_SIZE = 65536
+
+# Known credential formats, as (label, pattern)
+TOKEN_FORMATS = [
+    ("PEM private key", r"-----BEGIN (?:[A-Z0-9]+ )*PRIVATE KEY(?: BLOCK)?-----"),
+    ("JWT", r"\beyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}"),
+    ("AWS access key", r"\b(?:AKIA|ASIA|AGPA|AIDA|AROA)[0-9A-Z]{16}\b"),
+    ("Google API key", r"\bAIza[0-9A-Za-z_-]{35}\b"),
+    ("GitHub token", r"\b(?:gh[pousr]_[A-Za-z0-9]{36}|github_pat_[A-Za-z0-9_]{82})\b"),
+    ("Slack token", r"\bxox[abposr]-[A-Za-z0-9-]{10,}"),
+]
+
+# Label of the findings for tokens detected by their entropy
+HIGH_ENTROPY = "high-entropy token"
+
+# Candidate tokens for the entropy test
+# Hex strings are not tested: image digests and commit hashes are hex too, and
+# are not credentials
+ENTROPY_TOKEN = r"[A-Za-z0-9+/_-]{20,}={0,2}"
+HEX_TOKEN = re.compile(r"[0-9A-Fa-f]+")
+
+# Tokens are reported above ENTROPY_RATIO of the entropy expected from a random
+# token of the same length over ENTROPY_ALPHABET characters
+# A short token cannot use every character of the alphabet, so a fixed number
+# of bits per character would miss most random tokens below 40 characters
+ENTROPY_ALPHABET = 64
+ENTROPY_RATIO = 0.85
+
+# Words of identifiers and paths (snake_case, CamelCase, ACRONYMS), and the
+# mean word length and share of vowels from which a token reads as text
+# Random tokens switch between lowercase, uppercase and digits every one or two
+# characters, and have few vowels
+WORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])")
+VOWELS = frozenset("aeiouyAEIOUY")
+READABLE_WORD_LENGTH = 3.5
+READABLE_VOWEL_SHARE = 0.25
+
+# Base64 encoding of a token, whose decoded text is scanned instead when it
+# is printable: base64 of a URL or of a config line looks random
+BASE64_TOKEN = re.compile(
+    r"(?:[A-Za-z0-9+/]{4})+(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?"
+)
+
+# Characters scanned at most per object, the rest is ignored
+MAX_SCAN_BYTES = 1024 * 1024
+
+
+#
+# compile_keywords
+# Compiles keyword patterns into a single case-insensitive alternation
+#
+def compile_keywords(keywords: Iterable[str]) -> "re.Pattern[str]":
+    return re.compile("|".join(f"(?:{keyword})" for keyword in keywords), re.IGNORECASE)
+
+
+class SecretNameMatcher:
+    def __init__(self, keywords: Iterable[str] = SECRET_NAME_KEYWORDS):
+        self.keywords: List[str] = list(keywords)
+        self._pattern = compile_keywords(self.keywords)
+        self._memo: Dict[str, bool] = {}
+
+    #
+    # matches
+    # Tells whether a name suggests a secret
+    #
+    def matches(self, name: str) -> bool:
+        result = self._memo.get(name)
+        if result is None:
+            if len(self._memo) >= MAX_MEMO_SIZE:
+                self._memo.clear()
+            result = self._pattern.search(name) is not None
+            self._memo[name] = result
+        return result
+
+
+# Matcher shared by the checks
+SECRET_NAMES = SecretNameMatcher()
+
+
+#
+# shannon_entropy
+# Returns the Shannon entropy of a string, in bits per character
+#
+def shannon_entropy(text: str) -> float:
+    if not text:
+        return 0.0
+    length = len(text)
+    # Counter counts characters in C, the sum runs once per distinct character
+    return -sum(
+        count / length * math.log2(count / length) for count in Counter(text).values()
+    )
+
+
+#
+# entropy_threshold
+# Returns the entropy, in bits per character, above which a token of a given
+# length is reported
+# The entropy of a random token is about log2 of the number of distinct
+# characters it uses, which is a(1 - (1 - 1/a)^length) for an alphabet of a
+#
+def entropy_threshold(length: int) -> float:
+    alphabet = ENTROPY_ALPHABET
+    distinct = alphabet * (1 - (1 - 1 / alphabet) ** length)
+    return ENTROPY_RATIO * math.log2(distinct)
+
+
+class ContentScanner:
+    def __init__(
+        self,
+        formats: Iterable[Tuple[str, str]] = TOKEN_FORMATS,
+        max_bytes: int = MAX_SCAN_BYTES,
+    ):
+        self.formats = list(formats)
+        self.max_bytes = max_bytes
+
+        # One pass finds known formats and entropy candidates together;
+        # formats come first so that their matches take precedence
+        groups = [f"(?P<f{i}>{pattern})" for i, (_, pattern) in enumerate(self.formats)]
+        groups.append(f"(?P<entropy>{ENTROPY_TOKEN})")
+        self._pattern = re.compile("|".join(groups))
+        self._labels = {f"f{i}": label for i, (label, _) in enumerate(self.formats)}
+
+    #
+    # scan
+    # Returns the labels of the credentials found in a value, in order of
+    # first appearance and without duplicates
+    # Only the first limit characters are scanned, max_bytes by default
+    #
+    def scan(self, text: str, limit: Optional[int] = None) -> List[str]:
+        limit = self.max_bytes if limit is None else limit
+        found: List[str] = []
+        # finditer with an end position scans in place, without copying the value
+        for match in self._pattern.finditer(text, 0, min(len(text), limit)):
+            label = self._label(match)
+            if label and label not in found:
+                found.append(label)
+        return found
+
+    def _label(self, match: "re.Match[str]") -> Optional[str]:
+        group = match.lastgroup
+        if group != "entropy":
+            return self._labels[group]
+        token = match.group()
+        # Words and numbers use a single character class
+        if token.isalpha() or token.isdigit() or HEX_TOKEN.fullmatch(token):
+            return None
+        if shannon_entropy(token) <= entropy_threshold(len(token)):
+            return None
+        if _readable(token):
+            return None
+        decoded = _decode_text(token)
+        if decoded is not None:
+            labels = self.scan(decoded)
+            return labels[0] if labels else None
+        return HIGH_ENTROPY
+
+    #
+    # scan_binary
+    # Scans a base64-encoded binary value, as found in ConfigMap binaryData
+    #
+    def scan_binary(self, encoded: str, limit: Optional[int] = None) -> List[str]:
+        limit = self.max_bytes if limit is None else limit
+        # Decode only what is scanned: 4 base64 characters hold 3 bytes
+        try:
+            data = base64.b64decode(encoded[: (limit + 2) // 3 * 4])
+        except (binascii.Error, ValueError):
+            return []
+        return self.scan(data.decode("latin-1"), limit)
+
+    #
+    # scan_items
+    # Scans the (key, value, binary) items of an object and yields (key, labels)
+    # for the items holding credentials
+    # The items share a budget of max_bytes characters
+    #
+    def scan_items(
+        self, items: Iterable[Tuple[str, str, bool]]
+    ) -> Iterator[Tuple[str, List[str]]]:
+        remaining = self.max_bytes
+        for key, value, binary in items:
+            if remaining <= 0:
+                break
+            if not isinstance(value, str):
+                continue
+            if binary:
+                labels = self.scan_binary(value, remaining)
+                remaining -= len(value) * 3 // 4
+            else:
+                labels = self.scan(value, remaining)
+                remaining -= len(value)
+            if labels:
+                yield key, labels
+
+
+#
+# _readable
+# Tells whether a token is made of words, like identifiers and paths
+#
+def _readable(token: str) -> bool:
+    words = WORD.findall(token)
+    if not words:
+        return False
+    letters = sum(len(word) for word in words)
+    vowels = sum(1 for character in token if character in VOWELS)
+    return (
+        letters / len(words) >= READABLE_WORD_LENGTH
+        and vowels / letters >= READABLE_VOWEL_SHARE
+    )
+
+
+#
+# _decode_text
+# Returns the text encoded in a base64 token, or None when the token is not
+# base64 or does not encode printable text
+#
+def _decode_text(token: str) -> Optional[str]:
+    if not BASE64_TOKEN.fullmatch(token):
+        return None
+    try:
+        text = base64.b64decode(token).decode("ascii")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return text if text.isprintable() else None
+
+
+# Scanner shared by the checks
+CONTENT_SCANNER = ContentScanner()
+
+
+#
+# scan_objects
+# Scans the items of many objects, returning (object, key, labels) for every
+# item holding credentials, in object order
+# items_of returns the (key, value, binary) items of an object
+# The scan is pure Python and holds the GIL, so it runs in the calling thread:
+# worker threads would only add their overhead
+#
+def scan_objects(
+    objects: Iterable[Any],
+    items_of: Any,
+    scanner: ContentScanner = CONTENT_SCANNER,
+) -> List[Tuple[Any, str, List[str]]]:
+    return [
+        (obj, key, labels)
+        for obj in objects
+        for key, labels in scanner.scan_items(items_of(obj))
+    ]
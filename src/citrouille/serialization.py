@@ -0,0 +1,60 @@
+import json
+from datetime import date, datetime
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#
+# serialization.py
+#
+# JSON parsing and serialization helpers. orjson is used when it is installed,
+# and the standard library json module otherwise.
+# Datetimes are serialized as ISO 8601 strings, as datetime.isoformat() writes
+# them, by both backends: orjson supports them natively, so documents holding
+# datetimes are written as they are, without converting a copy of every
+# record first.
+#
+
+# Name of the serialization backend in use
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+#
+# loads
+# Parses a JSON document from bytes or str
+#
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+#
+# dumps
+# Serializes a document to a JSON str, indented by 2 spaces unless compact
+# Datetimes and dates are written in ISO 8601 format
+#
+def dumps(obj: Any, compact: bool = False) -> str:
+    if orjson is not None:
+        option = 0 if compact else orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode()
+    if compact:
+        return json.dumps(obj, default=_default, separators=(",", ":"))
+    return json.dumps(obj, default=_default, indent=2)
+
+
+#
+# _default
+# Converts the values the backends cannot serialize natively
+#
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
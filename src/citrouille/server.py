@@ -0,0 +1,383 @@
+import io
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from citrouille import metrics
+from citrouille.comparator import compare_deployments
+from citrouille.config import resolve_cluster
+from citrouille.defaults import (
+    DEFAULT_FETCH_WORKERS,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SCAN_WORKERS,
+)
+from citrouille.formatters import JSONFormatter, SecurityFormatter, TableFormatter
+from citrouille.informer import CachedKubeClient
+from citrouille.kube_client import ClientPool
+from citrouille.remote import EXIT_CODE_HEADER
+from citrouille.security_checks import (
+    categories_for,
+    parse_check_ids,
+    select_checks,
+    start_scan,
+)
+from citrouille.instrumentation import add_observer, remove_observer
+
+#
+# server.py
+#
+# Long-running HTTP server answering inventory, compare and security requests.
+# One CachedKubeClient is kept per context: the kubeconfig is read and the
+# connections are opened once, and its informers list each resource kind on
+# first use, then keep it current from the watch streams. Requests after the
+# first one are answered from memory.
+#
+# Endpoints, all GET with their parameters in the query string:
+#   /inventory  namespace, or all_namespaces=1
+#   /compare    namespace1 and namespace2
+#   /security   namespace (repeatable), or all_namespaces=1, and checks,
+#               skip_checks, check_config=1, check_network=1
+#   /healthz
+#   /metrics    Prometheus metrics of the scans answered so far
+# Every endpoint takes context, format (table or json, and ndjson or sarif for
+# /security) and compact=1. Namespaces can be cluster aliases of the config
+# file of the server. Bodies are the output of the matching command, and the
+# exit code the command would have returned is sent in a header.
+#
+
+CONTENT_TYPES = {
+    "table": "text/plain; charset=utf-8",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "sarif": "application/sarif+json",
+    "metrics": metrics.CONTENT_TYPE,
+}
+
+# Output formats of the endpoints
+DEPLOYMENT_FORMATS = ("table", "json")
+FINDING_FORMATS = ("table", "json", "ndjson", "sarif")
+
+
+class RequestError(Exception):
+    # Invalid request parameters, answered with 400
+    pass
+
+
+class CitrouilleService:
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        kubeconfig: Optional[str] = None,
+        context: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        fast_parse: bool = False,
+        fetch_workers: int = DEFAULT_FETCH_WORKERS,
+        scan_workers: int = DEFAULT_SCAN_WORKERS,
+        scan_metrics: Optional[metrics.ScanMetrics] = None,
+        pool_size: Optional[int] = None,
+        keep_alive: bool = False,
+    ):
+        self.config = config
+        self.kubeconfig = kubeconfig
+        # Context of the requests that name none, None for the current context
+        self.context = context
+        self.page_size = page_size
+        self.fast_parse = fast_parse
+        self.fetch_workers = fetch_workers
+        self.scan_workers = scan_workers
+        self.metrics = scan_metrics or metrics.METRICS
+        self.clients: Dict[Optional[str], CachedKubeClient] = {}
+        # API clients of the contexts, shared by their informers
+        self.pool = ClientPool(pool_size=pool_size, keep_alive=keep_alive)
+        self._lock = threading.Lock()
+
+    #
+    # client
+    # Returns the warm client of a context, creating it on first use
+    #
+    def client(self, context: Optional[str]) -> CachedKubeClient:
+        with self._lock:
+            kube_client = self.clients.get(context)
+            if kube_client is None:
+                kube_client = CachedKubeClient(
+                    kubeconfig=self.kubeconfig,
+                    context=context,
+                    page_size=self.page_size,
+                    fast_parse=self.fast_parse,
+                    pool=self.pool,
+                )
+                self.clients[context] = kube_client
+            return kube_client
+
+    #
+    # stop
+    # Stops the informers of every client and closes their connections
+    #
+    def stop(self):
+        with self._lock:
+            for kube_client in self.clients.values():
+                kube_client.stop()
+        self.pool.close()
+
+    #
+    # handle
+    # Answers a request, returning (body, output format, exit code), or None
+    # for unknown paths
+    #
+    def handle(
+        self, path: str, params: Dict[str, List[str]]
+    ) -> Optional[Tuple[str, str, int]]:
+        handlers = {
+            "/inventory": self.inventory,
+            "/compare": self.compare,
+            "/security": self.security,
+            "/healthz": self.healthz,
+            "/metrics": self.scan_metrics,
+        }
+        handler = handlers.get(path.rstrip("/") or "/")
+        if handler is None:
+            return None
+        return handler(params)
+
+    def healthz(self, params: Dict[str, List[str]]) -> Tuple[str, str, int]:
+        return json.dumps({"status": "ok", "contexts": len(self.clients)}), "json", 0
+
+    def scan_metrics(self, params: Dict[str, List[str]]) -> Tuple[str, str, int]:
+        return self.metrics.render(), "metrics", 0
+
+    def inventory(self, params: Dict[str, List[str]]) -> Tuple[str, str, int]:
+        output_format = _format(params, DEPLOYMENT_FORMATS)
+        if _flag(params, "all_namespaces"):
+            kube_client = self.client(_param(params, "context") or self.context)
+            deployments = kube_client.get_all_deployments()
+        else:
+            namespace, context = self._resolve(
+                _required(params, "namespace"), _param(params, "context")
+            )
+            deployments = self.client(context).get_deployments(namespace=namespace)
+
+        if output_format == "json":
+            body = JSONFormatter.format_deployments(
+                deployments, _flag(params, "compact")
+            )
+        else:
+            body = TableFormatter.format_deployments(deployments)
+        return body, output_format, 0
+
+    def compare(self, params: Dict[str, List[str]]) -> Tuple[str, str, int]:
+        output_format = _format(params, DEPLOYMENT_FORMATS)
+        context = _param(params, "context")
+        namespace1, context1 = self._resolve(_required(params, "namespace1"), context)
+        namespace2, context2 = self._resolve(_required(params, "namespace2"), context)
+
+        comparison = compare_deployments(
+            self.client(context1).get_deployments(namespace1),
+            self.client(context2).get_deployments(namespace2),
+        )
+
+        if output_format == "json":
+            body = JSONFormatter.format_comparison(
+                comparison, namespace1, namespace2, _flag(params, "compact")
+            )
+        else:
+            body = TableFormatter.format_comparison(comparison, namespace1, namespace2)
+        return body, output_format, 0
+
+    def security(self, params: Dict[str, List[str]]) -> Tuple[str, str, int]:
+        output_format = _format(params, FINDING_FORMATS)
+        namespaces, context = self._resolve_namespaces(params)
+
+        check_config = _flag(params, "check_config")
+        check_network = _flag(params, "check_network")
+        # If no specific checks are specified, run all checks
+        if not check_config and not check_network:
+            check_config = True
+            check_network = True
+        try:
+            only = _check_ids(params, "checks")
+            skip = _check_ids(params, "skip_checks")
+        except ValueError as e:
+            raise RequestError(str(e))
+        checks = select_checks(
+            categories_for(check_config, check_network), only=only, skip=skip
+        )
+        if not checks:
+            raise RequestError("No security checks selected")
+
+        started = time.perf_counter()
+        resources, findings = start_scan(
+            self.client(context),
+            namespaces,
+            checks,
+            max_workers=self.fetch_workers,
+            scan_workers=self.scan_workers,
+        )
+        findings = self.metrics.observe(resources, findings, started)
+        for kind, error in resources.errors.items():
+            print(
+                f"Warning: Failed to fetch {kind}, dependent checks skipped: {error}",
+                file=sys.stderr,
+            )
+        if resources.errors and len(resources.errors) == len(resources.timings):
+            raise RuntimeError("Unable to fetch any resource")
+
+        buffer = io.StringIO()
+        writer = SecurityFormatter.write_findings(findings, output_format, buffer)
+        critical_high = writer.counts["CRITICAL"] + writer.counts["HIGH"]
+        # An incomplete scan is not a passing scan
+        exit_code = 1 if critical_high or resources.errors else 0
+        return buffer.getvalue(), output_format, exit_code
+
+    #
+    # _resolve
+    # Resolves a cluster alias to its namespace and context
+    # The context of the request takes precedence over the one of the alias,
+    # which takes precedence over the context of the server
+    #
+    def _resolve(self, alias: str, context: Optional[str]) -> Tuple[str, Optional[str]]:
+        namespace, cluster_context = resolve_cluster(alias, self.config)
+        return namespace, context or cluster_context or self.context
+
+    #
+    # _resolve_namespaces
+    # Resolves the namespaces of a security request, which must all use the
+    # same context, or None for every namespace
+    #
+    def _resolve_namespaces(
+        self, params: Dict[str, List[str]]
+    ) -> Tuple[Optional[List[str]], Optional[str]]:
+        context = _param(params, "context")
+        if _flag(params, "all_namespaces"):
+            return None, context or self.context
+
+        aliases = params.get("namespace")
+        if not aliases:
+            raise RequestError("Missing parameter: namespace (or all_namespaces=1)")
+
+        namespaces = []
+        contexts = set()
+        for alias in dict.fromkeys(aliases):
+            namespace, cluster_context = resolve_cluster(alias, self.config)
+            namespaces.append(namespace)
+            contexts.add(cluster_context)
+
+        if context:
+            return namespaces, context
+        if len(contexts) > 1:
+            raise RequestError(
+                "The given namespaces belong to different contexts, use context to pick one"
+            )
+        return namespaces, contexts.pop() or self.context
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server: "CitrouilleServer"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        try:
+            answer = self.server.service.handle(url.path, params)
+        except RequestError as e:
+            self._send_error(400, str(e))
+            return
+        except ConnectionError as e:
+            self._send_error(502, f"Unable to connect to Kubernetes cluster: {e}")
+            return
+        except Exception as e:
+            self._send_error(500, str(e))
+            return
+
+        if answer is None:
+            self._send_error(404, f"Unknown endpoint: {url.path}")
+            return
+        body, output_format, exit_code = answer
+        self._send(200, body, CONTENT_TYPES[output_format], exit_code)
+
+    def _send_error(self, status: int, message: str):
+        self._send(
+            status, json.dumps({"error": message}), CONTENT_TYPES["json"], exit_code=1
+        )
+
+    def _send(self, status: int, body: str, content_type: str, exit_code: int):
+        # Bodies end with a newline, as the command output does
+        if body and not body.endswith("\n"):
+            body += "\n"
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header(EXIT_CODE_HEADER, str(exit_code))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class CitrouilleServer(ThreadingHTTPServer):
+    # Requests in flight do not keep the process alive on shutdown
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: CitrouilleService):
+        super().__init__(address, RequestHandler)
+        self.service = service
+
+
+#
+# serve
+# Serves requests until interrupted, then stops the informers of the service
+#
+def serve(service: CitrouilleService, host: str, port: int):
+    server = CitrouilleServer((host, port), service)
+    # Checks are timed while the server runs, for the CPU time metric
+    add_observer(service.metrics)
+    try:
+        bound_host, bound_port = server.server_address[:2]
+        print(f"Serving on http://{bound_host}:{bound_port}", file=sys.stderr)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        remove_observer(service.metrics)
+        server.server_close()
+        service.stop()
+
+
+#
+# _param
+# Returns the last value of a query parameter
+#
+def _param(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = params.get(name)
+    return values[-1] if values else None
+
+
+def _required(params: Dict[str, List[str]], name: str) -> str:
+    value = _param(params, name)
+    if not value:
+        raise RequestError(f"Missing parameter: {name}")
+    return value
+
+
+#
+# _flag
+# Tells whether a boolean query parameter is set (1, true, yes)
+#
+def _flag(params: Dict[str, List[str]], name: str) -> bool:
+    return (_param(params, name) or "").lower() in ("1", "true", "yes")
+
+
+def _format(params: Dict[str, List[str]], formats: Tuple[str, ...]) -> str:
+    output_format = _param(params, "format") or "json"
+    if output_format not in formats:
+        raise RequestError(
+            f"Unsupported format: {output_format} (expected one of {', '.join(formats)})"
+        )
+    return output_format
+
+
+def _check_ids(params: Dict[str, List[str]], name: str) -> Optional[List[str]]:
+    value = _param(params, name)
+    return parse_check_ids(value) if value else None
@@ -0,0 +1,184 @@
+import gzip
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from kubernetes import client
+from kubernetes.client.exceptions import ApiException
+
+from citrouille.kube_client import KubeClient, RESOURCE_KINDS
+from citrouille.resource_view import ResourceView, view_type
+from citrouille.serialization import loads
+
+#
+# snapshot.py
+#
+# On-disk snapshots of the resources used by inventory, compare and security.
+# A snapshot is a gzip-compressed JSON Lines file: the first line is a header
+# indexing the content (resource kinds, object counts and namespaces), and
+# every other line holds one object as {"kind": ..., "object": ...}, in the
+# JSON form returned by the API server.
+# SnapshotClient answers the KubeClient getters from a snapshot, without
+# loading any kubeconfig or contacting the cluster.
+#
+
+SNAPSHOT_FORMAT = "citrouille-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Secret fields left out of snapshots, the checks only look at Secret metadata
+SECRET_PAYLOAD_FIELDS = ("data", "stringData")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+#
+# _to_json
+# Converts a model object or a ResourceView to its API JSON form
+#
+def _to_json(obj: Any, api_client: Any) -> Dict[str, Any]:
+    if isinstance(obj, ResourceView):
+        return dict(obj.to_dict())
+    return api_client.sanitize_for_serialization(obj)
+
+
+#
+# _iter_snapshot_objects
+# Yields (kind, object) for every object to snapshot
+# With namespaces set to None, the whole cluster is included; otherwise only
+# the given namespaces and the cluster-scoped resources
+#
+def _iter_snapshot_objects(
+    kube_client: KubeClient, namespaces: Optional[List[str]]
+) -> Iterator[Tuple[str, Any]]:
+    for kind, (_, namespaced_method, _, _, _) in RESOURCE_KINDS.items():
+        if namespaces is None or not namespaced_method:
+            for obj in kube_client.iter_resources(kind):
+                if kind == "namespaces" and namespaces is not None:
+                    if obj.metadata.name not in namespaces:
+                        continue
+                yield kind, obj
+        else:
+            for namespace in namespaces:
+                for obj in kube_client.iter_resources(kind, namespace):
+                    yield kind, obj
+
+
+#
+# write_snapshot
+# Lists the resources of the cluster, or of the given namespaces, and writes them
+# to a snapshot file
+# Returns the header of the snapshot
+#
+def write_snapshot(
+    kube_client: KubeClient,
+    path: str,
+    namespaces: Optional[List[str]] = None,
+    context: Optional[str] = None,
+) -> Dict[str, Any]:
+    api_client = client.ApiClient()
+    lines: List[str] = []
+    counts = {kind: 0 for kind in RESOURCE_KINDS}
+    seen_namespaces = set()
+
+    for kind, obj in _iter_snapshot_objects(kube_client, namespaces):
+        data = _to_json(obj, api_client)
+        if kind == "secrets":
+            for field in SECRET_PAYLOAD_FIELDS:
+                data.pop(field, None)
+
+        metadata = data.get("metadata") or {}
+        if kind == "namespaces":
+            seen_namespaces.add(metadata.get("name"))
+        elif metadata.get("namespace"):
+            seen_namespaces.add(metadata["namespace"])
+
+        lines.append(json.dumps({"kind": kind, "object": data}, separators=(",", ":")))
+        counts[kind] += 1
+
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "context": context,
+        "kinds": counts,
+        "namespaces": sorted(seen_namespaces),
+    }
+
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header, separators=(",", ":")) + "\n")
+        for line in lines:
+            f.write(line + "\n")
+
+    return header
+
+
+#
+# read_snapshot
+# Reads a snapshot file, returning its header and the raw objects of each kind
+#
+def read_snapshot(path: str) -> Tuple[Dict[str, Any], Dict[str, List[Dict[str, Any]]]]:
+    try:
+        with gzip.open(path, "rb") as f:
+            header = loads(f.readline() or b"{}")
+            if header.get("format") != SNAPSHOT_FORMAT:
+                raise SnapshotError(f"{path} is not a citrouille snapshot")
+            if header.get("version") != SNAPSHOT_VERSION:
+                raise SnapshotError(
+                    f"Unsupported snapshot version {header.get('version')} in {path}"
+                )
+
+            objects: Dict[str, List[Dict[str, Any]]] = {
+                kind: [] for kind in RESOURCE_KINDS
+            }
+            for line in f:
+                record = loads(line)
+                objects.setdefault(record["kind"], []).append(record["object"])
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Failed to read snapshot {path}: {e}")
+
+    return header, objects
+
+
+class SnapshotClient(KubeClient):
+    def __init__(self, path: str):
+        self.path = path
+        self.kubeconfig = None
+        self.context = None
+        self.page_size = 0
+        self.fast_parse = True
+        self.header, raw_objects = read_snapshot(path)
+
+        # kind -> namespace -> views ("" for cluster-scoped objects)
+        self._objects: Dict[str, Dict[str, List[ResourceView]]] = {}
+        for kind, items in raw_objects.items():
+            if kind not in RESOURCE_KINDS:
+                continue
+            view_class = view_type(RESOURCE_KINDS[kind][4])
+            by_namespace: Dict[str, List[ResourceView]] = {}
+            for item in items:
+                namespace = (item.get("metadata") or {}).get("namespace") or ""
+                by_namespace.setdefault(namespace, []).append(view_class(item))
+            self._objects[kind] = by_namespace
+
+    #
+    # _iter_list_responses
+    # Answers list calls from the snapshot, as a single page
+    #
+    def _iter_list_responses(
+        self, kind: str, namespace: Optional[str] = None
+    ) -> Iterator[Tuple[List[Any], Optional[str]]]:
+        by_namespace = self._objects.get(kind, {})
+        if namespace is not None and RESOURCE_KINDS[kind][1]:
+            yield list(by_namespace.get(namespace, [])), None
+        else:
+            yield [obj for objects in by_namespace.values() for obj in objects], None
+
+    def get_namespace_details(self, namespace: str) -> Any:
+        for ns in self._objects.get("namespaces", {}).get("", []):
+            if ns.metadata.name == namespace:
+                return ns
+        raise ApiException(
+            f"Failed to get namespace {namespace}: not found in snapshot {self.path}"
+        )
@@ -1,10 +1,20 @@
+import json
+import os
+import subprocess
+import sys
 import pytest
 from io import StringIO
 from unittest.mock import patch, Mock
 from datetime import datetime
+from kubernetes.client import V1ClusterRole, V1Namespace, V1ObjectMeta, V1PolicyRule
+
+import citrouille
 
 from citrouille.cli import create_parser, main
 
+# Source directory of the package, for the tests starting a fresh interpreter
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(citrouille.__file__)))
+
 
 class TestArgumentParser:
     #
@@ -67,6 +77,24 @@ class TestGlobalOptions:
         args = parser.parse_args(["--context", "my-context", "inventory"])
         assert args.context == "my-context"
 
+    #
+    # test_page_size_option
+    # Tests parsing of --page-size global option
+    #
+    def test_page_size_option(self):
+        parser = create_parser()
+        args = parser.parse_args(["--page-size", "100", "inventory"])
+        assert args.page_size == 100
+
+    #
+    # test_page_size_default
+    # Tests that page size is left unset so the config file can provide it
+    #
+    def test_page_size_default(self):
+        parser = create_parser()
+        args = parser.parse_args(["inventory"])
+        assert args.page_size is None
+
     #
     # test_output_option_table
     # Tests parsing of -o table output option
@@ -85,6 +113,15 @@ class TestGlobalOptions:
         args = parser.parse_args(["--output", "json", "inventory"])
         assert args.output == "json"
 
+    #
+    # test_compact_option
+    # Tests parsing of --compact, left unset so the config file can provide it
+    #
+    def test_compact_option(self):
+        parser = create_parser()
+        assert parser.parse_args(["--compact", "inventory"]).compact is True
+        assert parser.parse_args(["inventory"]).compact is None
+
     #
     # test_output_default
     # Tests that output format defaults to table
@@ -341,7 +378,7 @@ class TestMainFunction:
     # test_main_inventory_table_output
     # Tests main function executing inventory command with table output
     #
-    @patch("citrouille.cli.KubeClient")
+    @patch("citrouille.kube_client.KubeClient")
     def test_main_inventory_table_output(self, mock_kube_client):
         mock_k8s = Mock()
         mock_kube_client.return_value = mock_k8s
@@ -366,7 +403,7 @@ class TestMainFunction:
     # test_main_inventory_json_output
     # Tests main function executing inventory command with JSON output
     #
-    @patch("citrouille.cli.KubeClient")
+    @patch("citrouille.kube_client.KubeClient")
     def test_main_inventory_json_output(self, mock_kube_client):
         mock_k8s = Mock()
         mock_kube_client.return_value = mock_k8s
@@ -390,7 +427,7 @@ class TestMainFunction:
     # test_main_inventory_all_namespaces
     # Tests main function executing inventory with -A flag
     #
-    @patch("citrouille.cli.KubeClient")
+    @patch("citrouille.kube_client.KubeClient")
     def test_main_inventory_all_namespaces(self, mock_kube_client):
         mock_k8s = Mock()
         mock_kube_client.return_value = mock_k8s
@@ -403,7 +440,7 @@ class TestMainFunction:
     # test_main_inventory_connection_error
     # Tests that main handles connection errors gracefully
     #
-    @patch("citrouille.cli.KubeClient")
+    @patch("citrouille.kube_client.KubeClient")
     def test_main_inventory_connection_error(self, mock_kube_client):
         mock_kube_client.side_effect = ConnectionError("Failed to connect")
         with patch("sys.argv", ["citrouille", "inventory"]):
@@ -413,11 +450,138 @@ class TestMainFunction:
                 assert exc_info.value.code == 1
                 assert "Error:" in mock_stderr.getvalue()
 
+    #
+    # test_main_page_size_from_config
+    # Tests that the page size from the config file is passed to the client
+    #
+    @patch("citrouille.config.load_config")
+    @patch("citrouille.kube_client.KubeClient")
+    def test_main_page_size_from_config(self, mock_kube_client, mock_load_config):
+        mock_load_config.return_value = {"page_size": 50}
+        mock_kube_client.return_value.get_deployments.return_value = []
+        with patch("sys.argv", ["citrouille", "inventory"]):
+            with patch("sys.stdout", new_callable=StringIO):
+                main()
+        assert mock_kube_client.call_args.kwargs["page_size"] == 50
+
+    #
+    # test_main_compare_shares_client_pool
+    # Tests that the clients of a run share one pool, with the pool size from the
+    # config file and keep-alive from the command line
+    #
+    @patch("citrouille.config.load_config")
+    @patch("citrouille.kube_client.KubeClient")
+    def test_main_compare_shares_client_pool(self, mock_kube_client, mock_load_config):
+        mock_load_config.return_value = {
+            "pool_size": 16,
+            "clusters": {
+                "prod": {"context": "us-east-1", "namespace": "production"},
+                "staging": {"context": "us-west-2", "namespace": "staging"},
+            },
+        }
+        mock_kube_client.return_value.get_deployments.return_value = []
+        with patch(
+            "sys.argv", ["citrouille", "--keep-alive", "compare", "prod", "staging"]
+        ):
+            with patch("sys.stdout", new_callable=StringIO):
+                main()
+
+        pools = [call.kwargs["pool"] for call in mock_kube_client.call_args_list]
+        assert len(pools) == 2
+        assert pools[0] is pools[1]
+        assert pools[0].pool_size == 16
+        assert pools[0].keep_alive is True
+
+    #
+    # test_main_invalid_page_size
+    # Tests that a negative page size is rejected
+    #
+    def test_main_invalid_page_size(self):
+        with patch("sys.argv", ["citrouille", "--page-size", "-1", "inventory"]):
+            with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+                assert exc_info.value.code == 1
+                assert "page size" in mock_stderr.getvalue()
+
+    #
+    # test_main_finding_output_other_command
+    # Tests that ndjson and sarif output are rejected outside the security command
+    #
+    def test_main_finding_output_other_command(self):
+        with patch("sys.argv", ["citrouille", "-o", "sarif", "inventory"]):
+            with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+                assert exc_info.value.code == 1
+                assert "only supported by the security command" in (
+                    mock_stderr.getvalue()
+                )
+
+    #
+    # test_main_remote_security
+    # Tests that --server sends the command options and prints the answer
+    #
+    def test_main_remote_security(self):
+        argv = ["citrouille", "--server", "http://localhost:8080", "-o", "json"]
+        argv += ["security", "prod", "staging", "--checks", "23"]
+        with patch("sys.argv", argv):
+            with patch("citrouille.remote.request") as mock_request:
+                mock_request.return_value = ('{"findings": []}\n', 1)
+                with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                    with pytest.raises(SystemExit) as exc_info:
+                        main()
+                    assert exc_info.value.code == 1
+                    assert mock_stdout.getvalue() == '{"findings": []}\n'
+
+        server_url, endpoint, params = mock_request.call_args.args
+        assert (server_url, endpoint) == ("http://localhost:8080", "security")
+        assert ("namespace", "prod") in params
+        assert ("namespace", "staging") in params
+        assert ("checks", "23") in params
+        assert ("format", "json") in params
+
+    #
+    # test_main_remote_unsupported_command
+    # Tests that --server is rejected for the commands a server cannot answer
+    #
+    def test_main_remote_unsupported_command(self):
+        with patch("sys.argv", ["citrouille", "--server", "http://x", "watch"]):
+            with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+                assert exc_info.value.code == 1
+                assert "--server is only supported" in mock_stderr.getvalue()
+
+    #
+    # test_main_remote_local_options
+    # Tests that the options of a local run are rejected rather than ignored
+    #
+    def test_main_remote_local_options(self):
+        for options in (
+            ["--profile"],
+            ["--profile-trace", "trace.json"],
+            ["--metrics-file", "citrouille.prom"],
+            ["--timings"],
+            ["--cache-dir", "cache"],
+            ["--clusters", "prod"],
+        ):
+            argv = ["citrouille", "--server", "http://x", "security", *options]
+            with patch("sys.argv", argv):
+                with patch("citrouille.remote.request") as mock_request:
+                    with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                        with pytest.raises(SystemExit) as exc_info:
+                            main()
+            assert exc_info.value.code == 1
+            assert "cannot be used with" in mock_stderr.getvalue()
+            assert options[0] in mock_stderr.getvalue()
+            mock_request.assert_not_called()
+
     #
     # test_main_compare_table_output
     # Tests main function executing compare command with table output
     #
-    @patch("citrouille.cli.KubeClient")
+    @patch("citrouille.kube_client.KubeClient")
     def test_main_compare_table_output(self, mock_kube_client):
         mock_k8s = Mock()
         mock_kube_client.return_value = mock_k8s
@@ -456,7 +620,7 @@ class TestMainFunction:
     # test_main_compare_json_output
     # Tests main function executing compare command with JSON output
     #
-    @patch("citrouille.cli.KubeClient")
+    @patch("citrouille.kube_client.KubeClient")
     def test_main_compare_json_output(self, mock_kube_client):
         mock_k8s = Mock()
         mock_kube_client.return_value = mock_k8s
@@ -487,7 +651,7 @@ class TestMainFunction:
     # test_main_compare_connection_error
     # Tests that compare command handles connection errors gracefully
     #
-    @patch("citrouille.cli.KubeClient")
+    @patch("citrouille.kube_client.KubeClient")
     def test_main_compare_connection_error(self, mock_kube_client):
         mock_kube_client.side_effect = ConnectionError("Failed to connect")
 
@@ -502,7 +666,7 @@ class TestMainFunction:
     # test_main_compare_identical_namespaces
     # Tests compare command output when namespaces have identical deployments
     #
-    @patch("citrouille.cli.KubeClient")
+    @patch("citrouille.kube_client.KubeClient")
     def test_main_compare_identical_namespaces(self, mock_kube_client):
         mock_k8s = Mock()
         mock_kube_client.return_value = mock_k8s
@@ -534,11 +698,586 @@ class TestMainFunction:
     #
     def test_main_security_no_findings(self):
         with patch("sys.argv", ["citrouille", "security"]):
-            with patch("citrouille.cli.KubeClient") as mock_client:
-                with patch("citrouille.cli.run_security_checks") as mock_checks:
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                with patch(
+                    "citrouille.security_checks.iter_security_checks"
+                ) as mock_checks:
                     # Mock empty findings (no security issues)
-                    mock_checks.return_value = []
+                    mock_checks.return_value = iter([])
                     with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
                         main()
                         output = mock_stdout.getvalue()
                         assert "No security issues found" in output
+
+    #
+    # test_main_security_sarif_output
+    # Tests that the security command writes a SARIF log
+    #
+    def test_main_security_sarif_output(self):
+        with patch("sys.argv", ["citrouille", "-o", "sarif", "security"]):
+            with patch("citrouille.kube_client.KubeClient"):
+                with patch(
+                    "citrouille.security_checks.iter_security_checks"
+                ) as mock_checks:
+                    mock_checks.return_value = iter([])
+                    with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                        main()
+                        document = json.loads(mock_stdout.getvalue())
+                        assert document["version"] == "2.1.0"
+
+    #
+    # test_main_security_partial_fetch_failure
+    # Tests that a failed fetch is reported, other checks still run, and the exit code is 1
+    #
+    def test_main_security_partial_fetch_failure(self):
+        with patch("sys.argv", ["citrouille", "security", "--check-network"]):
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                mock_client.return_value.get_network_policies.side_effect = Exception(
+                    "forbidden"
+                )
+                with patch("sys.stdout", new_callable=StringIO):
+                    with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                        with pytest.raises(SystemExit) as exc_info:
+                            main()
+                        assert exc_info.value.code == 1
+                        assert "network_policies" in mock_stderr.getvalue()
+
+    #
+    # test_main_security_timings
+    # Tests that --timings prints the duration of each fetch
+    #
+    def test_main_security_timings(self):
+        with patch(
+            "sys.argv", ["citrouille", "security", "--check-network", "--timings"]
+        ):
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                mock_client.return_value.get_network_policies.return_value = []
+                with patch("sys.stdout", new_callable=StringIO):
+                    with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                        with pytest.raises(SystemExit):
+                            main()
+                        assert "Fetched network_policies in" in mock_stderr.getvalue()
+
+    #
+    # test_main_security_metrics_file
+    # Tests that --metrics-file writes the metrics of the run
+    #
+    def test_main_security_metrics_file(self, tmp_path):
+        path = tmp_path / "citrouille.prom"
+        with patch(
+            "sys.argv",
+            ["citrouille", "security", "--checks", "23", "--metrics-file", str(path)],
+        ):
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                mock_client.return_value.get_network_policies.return_value = []
+                with patch("sys.stdout", new_callable=StringIO):
+                    with pytest.raises(SystemExit):
+                        main()
+
+        text = path.read_text()
+        assert (
+            'citrouille_findings{check_id="23",severity="HIGH",namespace="default"} 1'
+            in text
+        )
+        assert 'citrouille_check_cpu_seconds_total{check_id="23"}' in text
+
+    #
+    # test_main_security_profile
+    # Tests that --profile prints the breakdown of the run and --profile-trace
+    # writes its spans
+    #
+    def test_main_security_profile(self, tmp_path):
+        path = tmp_path / "trace.json"
+        with patch(
+            "sys.argv",
+            [
+                "citrouille",
+                "security",
+                "--checks",
+                "23",
+                "--profile-format",
+                "json",
+                "--profile-trace",
+                str(path),
+            ],
+        ):
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                mock_client.return_value.get_network_policies.return_value = []
+                with patch("sys.stdout", new_callable=StringIO):
+                    with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                        with pytest.raises(SystemExit):
+                            main()
+
+        profile = json.loads(mock_stderr.getvalue())
+        names = {(span["category"], span["name"]) for span in profile["spans"]}
+        assert {
+            ("phase", "connect"),
+            ("phase", "fetch"),
+            ("phase", "report"),
+            ("fetch", "network_policies"),
+            ("check", "23"),
+        } <= names
+        events = json.loads(path.read_text())["traceEvents"]
+        assert any(event["name"] == "23" for event in events)
+
+    #
+    # test_main_inventory_all_clusters
+    # Tests that --all-clusters lists the deployments of every cluster alias,
+    # with one client per context, tagged by cluster
+    #
+    @patch("citrouille.config.load_config")
+    @patch("citrouille.kube_client.KubeClient")
+    def test_main_inventory_all_clusters(self, mock_kube_client, mock_load_config):
+        mock_load_config.return_value = {
+            "clusters": {
+                "prod": {"context": "us-east-1", "namespace": "production"},
+                "staging": {"context": "us-west-2", "namespace": "staging"},
+            }
+        }
+        clients = {"us-east-1": Mock(), "us-west-2": Mock()}
+        for context, client in clients.items():
+            client.get_deployments.return_value = [
+                {
+                    "name": f"web-{context}",
+                    "namespace": "default",
+                    "images": ["nginx:1.21"],
+                    "created": None,
+                    "replicas": 1,
+                }
+            ]
+        mock_kube_client.side_effect = lambda **kwargs: clients[kwargs["context"]]
+
+        with patch(
+            "sys.argv", ["citrouille", "-o", "json", "inventory", "--all-clusters"]
+        ):
+            with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                main()
+
+        deployments = json.loads(mock_stdout.getvalue())
+        assert [(d["cluster"], d["name"]) for d in deployments] == [
+            ("prod", "web-us-east-1"),
+            ("staging", "web-us-west-2"),
+        ]
+        clients["us-east-1"].get_deployments.assert_called_once_with(
+            namespace="production"
+        )
+
+    #
+    # test_main_security_clusters
+    # Tests that --clusters scans each cluster and tags the findings, and that a
+    # cluster that cannot be reached makes the run fail
+    #
+    @patch("citrouille.config.load_config")
+    @patch("citrouille.kube_client.KubeClient")
+    def test_main_security_clusters(self, mock_kube_client, mock_load_config):
+        mock_load_config.return_value = {
+            "clusters": {
+                "prod": {"context": "us-east-1", "namespace": "production"},
+                "staging": {"context": "us-west-2", "namespace": "staging"},
+                "dev": {"context": "local", "namespace": "dev"},
+            }
+        }
+
+        def create_client(**kwargs):
+            if kwargs["context"] == "local":
+                raise ConnectionError("Failed to load kubeconfig")
+            client = Mock()
+            client.get_network_policies.return_value = []
+            return client
+
+        mock_kube_client.side_effect = create_client
+
+        with patch(
+            "sys.argv",
+            [
+                "citrouille",
+                "-o",
+                "ndjson",
+                "security",
+                "--clusters",
+                "staging,dev,prod",
+                "--checks",
+                "23",
+            ],
+        ):
+            with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                    with pytest.raises(SystemExit) as exc_info:
+                        main()
+
+        findings = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        assert [(f["cluster"], f["check_id"]) for f in findings] == [
+            ("staging", "23"),
+            ("prod", "23"),
+        ]
+        assert findings[1]["resource_name"].startswith("production/")
+        assert "Failed to scan cluster dev" in mock_stderr.getvalue()
+        assert exc_info.value.code == 1
+
+    #
+    # test_main_clusters_conflicts
+    # Tests that --clusters rejects the options that the aliases replace
+    #
+    def test_main_clusters_conflicts(self):
+        with patch(
+            "sys.argv",
+            [
+                "citrouille",
+                "--context",
+                "prod",
+                "inventory",
+                "staging",
+                "--clusters",
+                "a",
+            ],
+        ):
+            with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+                assert exc_info.value.code == 1
+                assert "cannot be used with a namespace, --context" in (
+                    mock_stderr.getvalue()
+                )
+
+    #
+    # test_main_security_checks_limits_fetch
+    # Tests that --checks only fetches the resources the selected checks need
+    #
+    def test_main_security_checks_limits_fetch(self):
+        with patch("sys.argv", ["citrouille", "security", "--checks", "1,7,13"]):
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                mock_client.return_value.get_raw_deployments.return_value = []
+                with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                    main()
+                    assert "No security issues found" in mock_stdout.getvalue()
+
+                mock_client.return_value.get_raw_deployments.assert_called_once()
+                mock_client.return_value.get_secrets.assert_not_called()
+                mock_client.return_value.get_cluster_roles.assert_not_called()
+                mock_client.return_value.get_network_policies.assert_not_called()
+
+    #
+    # test_main_security_skip_checks
+    # Tests that --skip-checks removes checks from the selection
+    #
+    def test_main_security_skip_checks(self):
+        with patch(
+            "sys.argv",
+            ["citrouille", "security", "--check-network", "--skip-checks", "23"],
+        ):
+            with patch("citrouille.kube_client.KubeClient"):
+                with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                    with pytest.raises(SystemExit) as exc_info:
+                        main()
+                    assert exc_info.value.code == 1
+                    assert "No security checks selected" in mock_stderr.getvalue()
+
+    #
+    # test_main_security_unknown_check_id
+    # Tests that an unknown check ID is an error
+    #
+    def test_main_security_unknown_check_id(self):
+        with patch("sys.argv", ["citrouille", "security", "--checks", "1,42"]):
+            with patch("citrouille.kube_client.KubeClient"):
+                with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                    with pytest.raises(SystemExit) as exc_info:
+                        main()
+                    assert exc_info.value.code == 1
+                    assert "Unknown check ID: 42" in mock_stderr.getvalue()
+
+    #
+    # test_security_multiple_namespaces
+    # Tests that the security command accepts several namespaces and -A
+    #
+    def test_security_multiple_namespaces(self):
+        parser = create_parser()
+        args = parser.parse_args(["security", "ns1", "ns2", "ns3"])
+        assert args.namespace == "ns1"
+        assert args.namespaces == ["ns2", "ns3"]
+
+        args = parser.parse_args(["security", "-A"])
+        assert args.all_namespaces is True
+
+    #
+    # test_main_security_all_namespaces
+    # Tests that -A lists resources once across the cluster and scans every namespace
+    #
+    def test_main_security_all_namespaces(self):
+        namespace = Mock()
+        namespace.metadata.name = "team-a"
+        with patch("sys.argv", ["citrouille", "security", "-A", "--checks", "23"]):
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                mock_client.return_value.iter_resources.side_effect = lambda kind: iter(
+                    [namespace] if kind == "namespaces" else []
+                )
+                with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                    with pytest.raises(SystemExit) as exc_info:
+                        main()
+                    assert exc_info.value.code == 1
+                    assert "team-a" in mock_stdout.getvalue()
+
+                mock_client.return_value.get_network_policies.assert_not_called()
+
+    #
+    # test_main_security_cache_dir
+    # Tests that --cache-dir lists the cluster roles on every run but reuses
+    # their findings, and that --cache-ttl reuses the list itself
+    #
+    def test_main_security_cache_dir(self, tmp_path):
+        cluster_role = V1ClusterRole(
+            metadata=V1ObjectMeta(name="everything", uid="u1", resource_version="3"),
+            rules=[V1PolicyRule(verbs=["*"], resources=["pods"], api_groups=[""])],
+        )
+        argv = [
+            "citrouille",
+            "security",
+            "--checks",
+            "19",
+            "--cache-dir",
+            str(tmp_path),
+        ]
+        with patch("citrouille.kube_client.KubeClient") as mock_client:
+            mock_client.return_value.get_roles.return_value = []
+            mock_client.return_value.get_cluster_roles.return_value = [cluster_role]
+            for extra in ([], [], ["--cache-ttl", "600"], ["--cache-ttl", "600"]):
+                with patch("sys.argv", argv + extra):
+                    with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                        with pytest.raises(SystemExit):
+                            main()
+                        assert "everything" in mock_stdout.getvalue()
+
+            assert mock_client.return_value.get_cluster_roles.call_count == 3
+            assert mock_client.return_value.get_roles.call_count == 4
+
+        cache_files = list(tmp_path.glob("cluster-*.json"))
+        assert len(cache_files) == 1
+        assert "19" in json.loads(cache_files[0].read_text())["findings"]
+
+    #
+    # test_watch_command
+    # Tests parsing of the watch command
+    #
+    def test_watch_command(self):
+        parser = create_parser()
+        args = parser.parse_args(["watch", "production", "--checks", "1,19"])
+        assert args.command == "watch"
+        assert args.namespace == "production"
+        assert args.checks == "1,19"
+
+    #
+    # test_main_watch_prints_initial_report
+    # Tests that watch prints the initial findings before streaming changes
+    #
+    def test_main_watch_prints_initial_report(self):
+        with patch("sys.argv", ["citrouille", "watch", "--checks", "23"]):
+            with patch("citrouille.informer.CachedKubeClient") as mock_client:
+                mock_client.return_value.get_network_policies.return_value = []
+                with patch(
+                    "citrouille.security_checks.incremental.run_forever"
+                ) as mock_run_forever:
+                    with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                        main()
+                        assert "has no NetworkPolicies" in mock_stdout.getvalue()
+
+                mock_run_forever.assert_called_once()
+                mock_client.return_value.informer.assert_called_once_with(
+                    "network_policies"
+                )
+                mock_client.return_value.stop.assert_called_once()
+
+    #
+    # test_main_security_from_snapshot
+    # Tests that --from-snapshot reads resources from the file, not the cluster
+    #
+    def test_main_security_from_snapshot(self):
+        with patch(
+            "sys.argv",
+            ["citrouille", "security", "--checks", "23", "--from-snapshot", "x.gz"],
+        ):
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                with patch("citrouille.snapshot.SnapshotClient") as mock_snapshot:
+                    mock_snapshot.return_value.get_network_policies.return_value = []
+                    with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                        with pytest.raises(SystemExit):
+                            main()
+                        assert "has no NetworkPolicies" in mock_stdout.getvalue()
+
+                mock_snapshot.assert_called_once_with("x.gz")
+                mock_client.assert_not_called()
+
+    #
+    # test_main_security_from_snapshot_file
+    # Tests a security scan of a real snapshot file, one namespace and -A, with
+    # the cluster-wide RBAC objects read from the snapshot
+    #
+    def test_main_security_from_snapshot_file(self, tmp_path):
+        from citrouille.snapshot import write_snapshot
+
+        resources = {
+            "namespaces": [
+                V1Namespace(metadata=V1ObjectMeta(name=name))
+                for name in ("prod", "staging")
+            ],
+            "cluster_roles": [
+                V1ClusterRole(
+                    metadata=V1ObjectMeta(
+                        name="everything", uid="u1", resource_version="3"
+                    ),
+                    rules=[
+                        V1PolicyRule(verbs=["*"], resources=["*"], api_groups=["*"])
+                    ],
+                )
+            ],
+        }
+        source = Mock()
+        source.iter_resources.side_effect = lambda kind, namespace=None: iter(
+            resources.get(kind, [])
+        )
+        path = str(tmp_path / "cluster.gz")
+        write_snapshot(source, path)
+
+        for scope in (["prod"], ["-A"]):
+            argv = ["citrouille", "security", *scope, "--checks", "19,20"]
+            argv += ["--from-snapshot", path, "--cache-dir", str(tmp_path)]
+            with patch("sys.argv", argv):
+                with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                    with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                        with pytest.raises(SystemExit):
+                            main()
+            assert "everything" in mock_stdout.getvalue()
+            assert "Failed to fetch" not in mock_stderr.getvalue()
+
+    #
+    # test_main_security_missing_namespace
+    # Tests that a namespace missing from a snapshot is an error, alone or not
+    #
+    def test_main_security_missing_namespace(self, tmp_path):
+        from citrouille.snapshot import write_snapshot
+
+        source = Mock()
+        source.iter_resources.side_effect = lambda kind, namespace=None: iter(
+            [V1Namespace(metadata=V1ObjectMeta(name="ns-a"))]
+            if kind == "namespaces"
+            else []
+        )
+        path = str(tmp_path / "cluster.gz")
+        write_snapshot(source, path)
+
+        for scope in (["ns-a", "typo-ns"], ["typo-ns"]):
+            argv = ["citrouille", "security", *scope, "--checks", "1,15"]
+            argv += ["--from-snapshot", path]
+            with patch("sys.argv", argv):
+                with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                    with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                        with pytest.raises(SystemExit) as exc_info:
+                            main()
+            assert exc_info.value.code == 1
+            assert "Error:" in mock_stderr.getvalue()
+            assert "typo-ns" in mock_stderr.getvalue()
+            assert "No security issues found" not in mock_stdout.getvalue()
+
+    #
+    # test_main_snapshot
+    # Tests that the snapshot command writes the cluster resources to the given file
+    #
+    def test_main_snapshot(self):
+        with patch("sys.argv", ["citrouille", "snapshot", "out.gz", "prod"]):
+            with patch("citrouille.kube_client.KubeClient") as mock_client:
+                with patch("citrouille.snapshot.write_snapshot") as mock_write:
+                    mock_write.return_value = {
+                        "kinds": {"deployments": 3},
+                        "namespaces": ["prod"],
+                    }
+                    with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+                        main()
+                        assert "Wrote 3 objects" in mock_stderr.getvalue()
+
+                mock_write.assert_called_once_with(
+                    mock_client.return_value,
+                    "out.gz",
+                    namespaces=["prod"],
+                    context=None,
+                )
+
+
+class TestStartup:
+    # Modules too slow to import before the command is known
+    HEAVY_MODULES = (
+        "kubernetes",
+        "yaml",
+        "citrouille.kube_client",
+        "citrouille.formatters",
+        "citrouille.security_checks",
+    )
+
+    #
+    # _run
+    # Runs Python code in a fresh interpreter that can import citrouille
+    #
+    def _run(self, code):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [SRC_DIR, env.get("PYTHONPATH")])
+        )
+        return subprocess.run(
+            [sys.executable, "-c", code],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    #
+    # test_import_is_light
+    # Tests that importing the CLI and building its parser loads no heavy module
+    #
+    def test_import_is_light(self):
+        output = self._run(
+            "import sys\n"
+            "from citrouille.cli import create_parser\n"
+            "create_parser().format_help()\n"
+            "print('\\n'.join(sys.modules))"
+        )
+        loaded = [
+            module
+            for module in output.splitlines()
+            if any(
+                module == heavy or module.startswith(heavy + ".")
+                for heavy in self.HEAVY_MODULES
+            )
+        ]
+        assert loaded == []
+
+    #
+    # test_inventory_skips_security_checks
+    # Tests that the modules of inventory and compare do not load the security checks
+    #
+    def test_inventory_skips_security_checks(self):
+        output = self._run(
+            "import sys\n"
+            "import citrouille.formatters, citrouille.multicluster\n"
+            "import citrouille.comparator\n"
+            "print('\\n'.join(sys.modules))"
+        )
+        assert not [
+            module
+            for module in output.splitlines()
+            if module.startswith("citrouille.security_checks")
+        ]
+
+    #
+    # test_version_is_light
+    # Tests that --version answers without importing the kubernetes client
+    #
+    def test_version_is_light(self):
+        output = self._run(
+            "import sys\n"
+            "sys.argv = ['citrouille', '--version']\n"
+            "from citrouille.cli import main\n"
+            "try:\n"
+            "    main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print('kubernetes' in sys.modules)"
+        )
+        assert output.splitlines() == [f"citrouille {citrouille.__version__}", "False"]
@@ -1,6 +1,10 @@
+import io
 import json
-from datetime import datetime
-from citrouille.formatters import TableFormatter, JSONFormatter
+from datetime import datetime, timezone
+from citrouille import serialization
+from citrouille.formatters import TableFormatter, JSONFormatter, SecurityFormatter
+from citrouille.multicluster import tag_findings
+from citrouille.security_checks.finding import CheckMetadata, Finding
 
 #
 # test_formatters.py
@@ -123,6 +127,25 @@ class TestTableFormatter:
         result = TableFormatter.format_deployments(deployments)
         assert "Unknown" in result
 
+    #
+    # test_format_deployments_with_cluster
+    # Tests that deployments tagged with their cluster get a cluster column
+    #
+    def test_format_deployments_with_cluster(self):
+        deployments = [
+            {
+                "cluster": "prod-web",
+                "name": "web",
+                "namespace": "default",
+                "images": ["nginx:1.21"],
+                "created": None,
+                "replicas": 1,
+            }
+        ]
+        lines = TableFormatter.format_deployments(deployments).splitlines()
+        assert lines[0].startswith("CLUSTER   NAME")
+        assert lines[2].startswith("prod-web  web")
+
 
 class TestJSONFormatter:
     #
@@ -221,6 +244,65 @@ class TestJSONFormatter:
         parsed = json.loads(result)
         assert isinstance(parsed, list)
 
+    #
+    # test_format_compact
+    # Tests that compact JSON has no indentation and keeps datetimes in ISO format
+    #
+    def test_format_compact(self):
+        created = datetime(2024, 11, 11, 10, 30, 0, tzinfo=timezone.utc)
+        deployments = [
+            {
+                "name": "test",
+                "namespace": "default",
+                "images": ["test:latest"],
+                "created": created,
+                "replicas": 1,
+            }
+        ]
+        result = JSONFormatter.format_deployments(deployments, compact=True)
+        assert "\n" not in result
+        assert json.loads(result)[0]["created"] == created.isoformat()
+        # The deployments are serialized as they are, without being modified
+        assert deployments[0]["created"] is created
+
+    #
+    # test_format_without_fast_backend
+    # Tests that the standard library backend writes the same document
+    #
+    def test_format_without_fast_backend(self, monkeypatch):
+        deployments = [
+            {
+                "name": "test",
+                "namespace": "default",
+                "images": ["test:latest"],
+                "created": datetime(2024, 11, 11, 10, 30, 0),
+                "replicas": 1,
+            }
+        ]
+        expected = json.loads(JSONFormatter.format_deployments(deployments))
+        monkeypatch.setattr(serialization, "orjson", None)
+
+        result = JSONFormatter.format_deployments(deployments)
+
+        assert result.startswith("[\n  {")
+        assert json.loads(result) == expected
+        assert expected[0]["created"] == "2024-11-11T10:30:00"
+
+    #
+    # test_format_utc_datetime
+    # Tests that every backend writes UTC datetimes with the isoformat() offset
+    #
+    def test_format_utc_datetime(self, monkeypatch):
+        created = datetime(2024, 11, 11, 10, 30, 0, 123456, tzinfo=timezone.utc)
+        expected = '"created":"2024-11-11T10:30:00.123456+00:00"'
+
+        fast = serialization.dumps({"created": created}, compact=True)
+        monkeypatch.setattr(serialization, "orjson", None)
+        standard = serialization.dumps({"created": created}, compact=True)
+
+        assert expected in fast
+        assert expected in standard
+
 
 class TestTableFormatterComparison:
     #
@@ -618,3 +700,181 @@ class TestJSONFormatterComparison:
         assert parsed["summary"]["extra_count"] == 2
         assert parsed["summary"]["changed_count"] == 1
         assert parsed["summary"]["identical"] is False
+
+
+class TestSecurityFormatterChanges:
+    FINDING = {
+        "severity": "CRITICAL",
+        "resource_type": "Deployment",
+        "resource_name": "default/web",
+        "container": "app",
+        "check_id": "1",
+        "check_name": "Privileged container",
+        "cwe": "CWE-250",
+        "message": "Container 'app' is running in privileged mode",
+        "details": "",
+    }
+
+    #
+    # test_format_change_table
+    # Tests that added and resolved findings are prefixed with + and -
+    #
+    def test_format_change_table(self):
+        added = SecurityFormatter.format_change("added", self.FINDING)
+        resolved = SecurityFormatter.format_change("resolved", self.FINDING)
+
+        assert added.startswith("+ [CRITICAL] Privileged container (CWE-250)")
+        assert "Deployment default/web (app)" in added
+        assert resolved.startswith("- [CRITICAL]")
+
+    #
+    # test_format_change_json
+    # Tests that changes are formatted as one JSON object per line
+    #
+    def test_format_change_json(self):
+        result = SecurityFormatter.format_change("resolved", self.FINDING, "json")
+
+        assert "\n" not in result
+        parsed = json.loads(result)
+        assert parsed["event"] == "resolved"
+        assert parsed["finding"]["check_id"] == "1"
+
+
+class TestSecurityFormatterStreaming:
+    METADATA = CheckMetadata("1", "Privileged container", "CWE-250")
+
+    #
+    # _findings
+    # Creates findings of the given severities
+    #
+    def _findings(self, severities):
+        return [
+            Finding(
+                self.METADATA,
+                severity,
+                "Deployment",
+                f"default/web-{index}",
+                "app",
+                "Container 'app' is running in privileged mode",
+                "",
+            )
+            for index, severity in enumerate(severities)
+        ]
+
+    #
+    # test_json_matches_document
+    # Tests that the streamed JSON is the document json.dumps would produce
+    #
+    def test_json_matches_document(self):
+        findings = self._findings(["HIGH", "LOW", "HIGH"])
+
+        result = SecurityFormatter.format_findings(findings, "json")
+
+        expected = {
+            "findings": [finding.to_dict() for finding in findings],
+            "summary": {
+                "total": 3,
+                "by_severity": {"CRITICAL": 0, "HIGH": 2, "MEDIUM": 0, "LOW": 1},
+            },
+        }
+        assert result == json.dumps(expected, indent=2)
+
+    #
+    # test_writes_findings_as_they_arrive
+    # Tests that the first finding is written before the next one is produced
+    #
+    def test_writes_findings_as_they_arrive(self):
+        stream = io.StringIO()
+        first, second = self._findings(["CRITICAL", "MEDIUM"])
+
+        def produce():
+            yield first
+            assert "default/web-0" in stream.getvalue()
+            yield second
+
+        writer = SecurityFormatter.write_findings(produce(), "table", stream)
+
+        assert writer.total == 2
+        assert writer.counts["CRITICAL"] == 1
+        assert "Total findings: 2" in stream.getvalue()
+        assert "CRITICAL: 1, HIGH: 0, MEDIUM: 1, LOW: 0" in stream.getvalue()
+
+    #
+    # test_table_without_findings
+    # Tests the table report of a scan without findings
+    #
+    def test_table_without_findings(self):
+        result = SecurityFormatter.format_findings(iter([]))
+        assert "No security issues found" in result
+
+    #
+    # test_ndjson_one_finding_per_line
+    # Tests that NDJSON writes one compact finding per line, flushed as written
+    #
+    def test_ndjson_one_finding_per_line(self):
+        stream = io.StringIO()
+        first, second = self._findings(["HIGH", "LOW"])
+
+        def produce():
+            yield first
+            assert stream.getvalue().endswith("\n")
+            yield second
+
+        writer = SecurityFormatter.write_findings(produce(), "ndjson", stream)
+
+        lines = stream.getvalue().splitlines()
+        assert writer.total == 2
+        assert [json.loads(line) for line in lines] == [
+            first.to_dict(),
+            second.to_dict(),
+        ]
+        assert ", " not in lines[0]
+
+    #
+    # test_sarif_document
+    # Tests that SARIF output is a valid log with the check rules and results
+    #
+    def test_sarif_document(self):
+        findings = self._findings(["CRITICAL", "MEDIUM", "LOW"])
+
+        document = json.loads(SecurityFormatter.format_findings(findings, "sarif"))
+
+        assert document["version"] == "2.1.0"
+        run = document["runs"][0]
+        rules = run["tool"]["driver"]["rules"]
+        assert rules[0]["id"] == "1"
+        assert rules[0]["properties"]["cwe"] == "CWE-250"
+        assert rules[0]["helpUri"] == "https://cwe.mitre.org/data/definitions/250.html"
+        results = run["results"]
+        assert [result["level"] for result in results] == ["error", "warning", "note"]
+        assert results[0]["ruleId"] == "1"
+        assert rules[results[0]["ruleIndex"]]["id"] == "1"
+        location = results[0]["locations"][0]["logicalLocations"][0]
+        assert location["fullyQualifiedName"] == "Deployment/default/web-0/app"
+
+    #
+    # test_sarif_without_findings
+    # Tests that SARIF output without findings is still a valid log
+    #
+    def test_sarif_without_findings(self):
+        document = json.loads(SecurityFormatter.format_findings(iter([]), "sarif"))
+        assert document["runs"][0]["results"] == []
+        assert document["runs"][0]["tool"]["driver"]["rules"]
+
+    #
+    # test_findings_with_cluster
+    # Tests that findings tagged with their cluster keep it in every format
+    #
+    def test_findings_with_cluster(self):
+        findings = self._findings(["HIGH"])
+
+        table = SecurityFormatter.format_findings(tag_findings(findings, "prod"))
+        sarif = json.loads(
+            SecurityFormatter.format_findings(tag_findings(findings, "prod"), "sarif")
+        )
+
+        assert "Cluster: prod" in table
+        result = sarif["runs"][0]["results"][0]
+        assert result["properties"]["cluster"] == "prod"
+        location = result["locations"][0]["logicalLocations"][0]
+        assert location["fullyQualifiedName"] == "prod/Deployment/default/web-0/app"
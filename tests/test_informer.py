@@ -0,0 +1,315 @@
+import threading
+
+import pytest
+from unittest.mock import Mock, patch
+
+from kubernetes.client import V1ObjectMeta, V1Secret
+from kubernetes.client.exceptions import ApiException
+
+from citrouille.informer import (
+    Informer,
+    CachedKubeClient,
+    LAST_APPLIED_ANNOTATION,
+)
+from citrouille.resource_view import view
+
+#
+# test_informer.py
+#
+# Tests for informer.py
+#
+
+
+def create_mock_object(name, namespace="default", resource_version="1"):
+    obj = Mock()
+    obj.metadata.name = name
+    obj.metadata.namespace = namespace
+    obj.metadata.resource_version = resource_version
+    return obj
+
+
+def create_mock_client(items, resource_version="100"):
+    kube_client = Mock()
+    kube_client.fast_parse = False
+    kube_client.list_resources.return_value = (items, resource_version)
+    kube_client.list_function.return_value = (Mock(), (), "deployments")
+    return kube_client
+
+
+class TestInformer:
+    #
+    # test_relist_fills_store
+    # Tests that the initial list fills the store and records the resourceVersion
+    #
+    def test_relist_fills_store(self):
+        kube_client = create_mock_client(
+            [create_mock_object("web", "a"), create_mock_object("api", "b")]
+        )
+        informer = Informer(kube_client, "deployments")
+
+        informer.relist()
+
+        assert informer.resource_version == "100"
+        assert [obj.metadata.name for obj in informer.items()] == ["web", "api"]
+        assert [obj.metadata.name for obj in informer.items("b")] == ["api"]
+        assert informer.get("web", "a").metadata.name == "web"
+
+    #
+    # test_watch_events_update_store
+    # Tests that watch events and bookmarks update the store and the resourceVersion
+    #
+    def test_watch_events_update_store(self):
+        web = create_mock_object("web", resource_version="100")
+        kube_client = create_mock_client([web])
+        informer = Informer(kube_client, "deployments")
+        informer.relist()
+        events = []
+        informer.add_handler(lambda event_type, obj: events.append(event_type))
+
+        bookmark = create_mock_object("", resource_version="150")
+        stream = [
+            {"type": "ADDED", "object": create_mock_object("api", "default", "101")},
+            {"type": "MODIFIED", "object": create_mock_object("web", "default", "102")},
+            {"type": "DELETED", "object": create_mock_object("api", "default", "103")},
+            {"type": "BOOKMARK", "object": bookmark},
+        ]
+        with patch("citrouille.informer.watch.Watch") as mock_watch:
+            mock_watch.return_value.stream.return_value = iter(stream)
+            informer._watch_once()
+
+            kwargs = mock_watch.return_value.stream.call_args.kwargs
+            assert kwargs["resource_version"] == "100"
+            assert kwargs["allow_watch_bookmarks"] is True
+
+        assert events == ["ADDED", "MODIFIED", "DELETED"]
+        assert [obj.metadata.resource_version for obj in informer.items()] == ["102"]
+        assert informer.resource_version == "150"
+
+    #
+    # test_raw_bookmark
+    # Tests that bookmarks left undeserialized by the watch update the resourceVersion
+    #
+    def test_raw_bookmark(self):
+        informer = Informer(create_mock_client([]), "deployments")
+        informer.relist()
+
+        stream = [
+            {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "180"}}}
+        ]
+        with patch("citrouille.informer.watch.Watch") as mock_watch:
+            mock_watch.return_value.stream.return_value = iter(stream)
+            informer._watch_once()
+
+        assert informer.resource_version == "180"
+
+    #
+    # test_gone_triggers_relist
+    # Tests that a 410 Gone watch error lists the resources again
+    #
+    def test_gone_triggers_relist(self):
+        kube_client = create_mock_client([create_mock_object("web")])
+        informer = Informer(kube_client, "deployments")
+        informer.relist()
+        events = []
+        informer.add_handler(lambda event_type, obj: events.append(event_type))
+
+        kube_client.list_resources.return_value = (
+            [create_mock_object("web", resource_version="5")],
+            "200",
+        )
+
+        with patch("citrouille.informer.watch.Watch") as mock_watch:
+            mock_watch.return_value.stream.side_effect = ApiException(
+                status=410, reason="Gone"
+            )
+            # Run a single iteration of the watch loop
+            with patch.object(informer, "_stopped") as stopped:
+                stopped.is_set.side_effect = [False, False, True]
+                informer._run()
+
+        assert informer.resource_version == "200"
+        assert events == ["MODIFIED"]
+
+    #
+    # test_fast_parse_gone_triggers_relist
+    # Tests that a raw 410 Gone ERROR event of a fast-parse watch, read by the
+    # real watch stream, lists the resources again
+    #
+    def test_fast_parse_gone_triggers_relist(self):
+        kube_client = create_mock_client([])
+        kube_client.fast_parse = True
+        response = Mock(status=200)
+        response.stream.return_value = [
+            b'{"type": "ERROR", "object": {"kind": "Status", "code": 410, '
+            b'"reason": "Expired", "message": "too old resource version"}}\n'
+        ]
+
+        def list_deployments(*args, **kwargs):
+            return response
+
+        kube_client.list_function.return_value = (list_deployments, (), "deployments")
+        informer = Informer(kube_client, "deployments")
+        informer.relist()
+        kube_client.list_resources.return_value = ([], "200")
+
+        with patch.object(informer, "_stopped") as stopped:
+            stopped.is_set.side_effect = [False, False, True]
+            informer._run()
+
+        assert kube_client.list_resources.call_count == 2
+        assert informer.resource_version == "200"
+
+    #
+    # test_secret_values_not_stored
+    # Tests that listed and watched Secrets are stored without their values,
+    # nor the last applied configuration holding a copy of them
+    #
+    def test_secret_values_not_stored(self):
+        listed = V1Secret(
+            metadata=V1ObjectMeta(
+                name="db",
+                namespace="default",
+                resource_version="1",
+                annotations={LAST_APPLIED_ANNOTATION: '{"data": "..."}', "team": "a"},
+            ),
+            data={"password": "aHVudGVyMg=="},
+            string_data={"token": "hunter2"},
+            immutable=True,
+        )
+        informer = Informer(create_mock_client([listed]), "secrets")
+        informer.relist()
+
+        watched = view(
+            {
+                "metadata": {
+                    "name": "api",
+                    "namespace": "default",
+                    "resourceVersion": "2",
+                    "annotations": {LAST_APPLIED_ANNOTATION: "{}"},
+                },
+                "data": {"key": "c2VjcmV0"},
+                "stringData": {"key": "secret"},
+            },
+            "V1Secret",
+        )
+        # Reading the values first must not keep them cached on the view
+        assert watched.data == {"key": "c2VjcmV0"}
+        with patch("citrouille.informer.watch.Watch") as mock_watch:
+            mock_watch.return_value.stream.return_value = iter(
+                [{"type": "ADDED", "object": watched}]
+            )
+            informer._watch_once()
+
+        db = informer.get("db", "default")
+        assert db.data is None and db.string_data is None
+        assert db.immutable is True
+        assert db.metadata.annotations == {"team": "a"}
+        api = informer.get("api", "default")
+        assert api.data is None and api.string_data is None
+        assert api.metadata.annotations == {}
+        assert api.to_dict().keys() == {"metadata"}
+
+
+class TestCachedKubeClient:
+    #
+    # _client
+    # Creates a CachedKubeClient whose informers list the given items without watching
+    #
+    def _client(self, items, namespace=None):
+        with (
+            patch("citrouille.kube_client.config.load_kube_config"),
+            patch("citrouille.kube_client.client"),
+        ):
+            kube_client = CachedKubeClient(namespace=namespace)
+        kube_client.list_resources = Mock(return_value=(items, "1"))
+        return kube_client
+
+    #
+    # test_getters_answer_from_cache
+    # Tests that repeated getters list the resources only once
+    #
+    def test_getters_answer_from_cache(self):
+        kube_client = self._client(
+            [create_mock_object("web", "a"), create_mock_object("api", "b")]
+        )
+
+        with patch.object(Informer, "_run"):
+            first = kube_client.get_raw_deployments("a")
+            second = kube_client.get_raw_deployments("a")
+            everything = list(kube_client.iter_resources("deployments"))
+
+        assert [d.metadata.name for d in first] == ["web"]
+        assert [d.metadata.name for d in second] == ["web"]
+        assert len(everything) == 2
+        kube_client.list_resources.assert_called_once_with("deployments", None)
+
+    #
+    # test_kinds_start_concurrently
+    # Tests that the initial list of one kind does not wait for another kind
+    #
+    def test_kinds_start_concurrently(self):
+        kube_client = self._client([])
+        deployments_listing = threading.Event()
+        release = threading.Event()
+        deployments_listed = threading.Event()
+
+        def list_resources(kind, namespace):
+            if kind == "deployments":
+                deployments_listing.set()
+                release.wait(5)
+                deployments_listed.set()
+            return [create_mock_object(kind, namespace)], "1"
+
+        kube_client.list_resources = Mock(side_effect=list_resources)
+
+        with patch.object(Informer, "_run"):
+            thread = threading.Thread(
+                target=kube_client.informer, args=("deployments",)
+            )
+            thread.start()
+            try:
+                assert deployments_listing.wait(5)
+                secrets = kube_client.informer("secrets")
+                assert not deployments_listed.is_set()
+            finally:
+                release.set()
+                thread.join()
+            deployments = kube_client.informer("deployments")
+
+        assert [obj.metadata.name for obj in secrets.items()] == ["secrets"]
+        assert [obj.metadata.name for obj in deployments.items()] == ["deployments"]
+        assert kube_client.list_resources.call_count == 2
+
+    #
+    # test_namespace_details_from_cache
+    # Tests that namespace details are read from the cached namespaces
+    #
+    def test_namespace_details_from_cache(self):
+        kube_client = self._client([create_mock_object("team-a", None)])
+
+        with patch.object(Informer, "_run"):
+            ns = kube_client.get_namespace_details("team-a")
+            with pytest.raises(ApiException, match="not found"):
+                kube_client.get_namespace_details("missing")
+
+        assert ns.metadata.name == "team-a"
+
+    #
+    # test_other_namespaces_use_api
+    # Tests that a client limited to one namespace lists other namespaces from the API
+    #
+    def test_other_namespaces_use_api(self):
+        kube_client = self._client([create_mock_object("web", "a")], namespace="a")
+
+        with (
+            patch.object(Informer, "_run"),
+            patch(
+                "citrouille.kube_client.KubeClient.iter_resources",
+                return_value=iter([]),
+            ) as mock_iter,
+        ):
+            assert len(kube_client.get_raw_deployments("a")) == 1
+            assert kube_client.get_raw_deployments("b") == []
+
+        mock_iter.assert_called_once_with("deployments", "b")
+        kube_client.list_resources.assert_called_once_with("deployments", "a")
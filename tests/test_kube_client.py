@@ -1,8 +1,9 @@
+import socket
 import pytest
 from unittest.mock import Mock, patch
 from datetime import datetime
 
-from citrouille.kube_client import KubeClient
+from citrouille.kube_client import ClientPool, KubeClient
 
 #
 # test_kube_client.py
@@ -21,7 +22,9 @@ class TestKubeClient:
     @patch("citrouille.kube_client.client.CoreV1Api")
     def test_init_default_config(self, mock_core_v1, mock_apps_v1, mock_load_config):
         k8s = KubeClient()
-        mock_load_config.assert_called_once_with(context=None)
+        mock_load_config.assert_called_once()
+        assert mock_load_config.call_args.kwargs["config_file"] is None
+        assert mock_load_config.call_args.kwargs["context"] is None
         assert k8s.kubeconfig is None
         assert k8s.context is None
 
@@ -34,9 +37,8 @@ class TestKubeClient:
     @patch("citrouille.kube_client.client.CoreV1Api")
     def test_init_with_kubeconfig(self, mock_core_v1, mock_apps_v1, mock_load_config):
         k8s = KubeClient(kubeconfig="/path/to/config")
-        mock_load_config.assert_called_once_with(
-            config_file="/path/to/config", context=None
-        )
+        mock_load_config.assert_called_once()
+        assert mock_load_config.call_args.kwargs["config_file"] == "/path/to/config"
         assert k8s.kubeconfig == "/path/to/config"
 
     #
@@ -48,7 +50,7 @@ class TestKubeClient:
     @patch("citrouille.kube_client.client.CoreV1Api")
     def test_init_with_context(self, mock_core_v1, mock_apps_v1, mock_load_config):
         k8s = KubeClient(context="my-context")
-        mock_load_config.assert_called_once_with(context="my-context")
+        assert mock_load_config.call_args.kwargs["context"] == "my-context"
         assert k8s.context == "my-context"
 
     #
@@ -63,6 +65,22 @@ class TestKubeClient:
         with pytest.raises(ConnectionError, match="Failed to connect to Kubernetes"):
             KubeClient()
 
+    #
+    # test_init_isolated_config
+    # Tests that the kubeconfig is loaded into a configuration of the client's
+    # own ApiClient, not into the global configuration
+    #
+    @patch("citrouille.kube_client.config.load_kube_config")
+    @patch("citrouille.kube_client.client.AppsV1Api")
+    @patch("citrouille.kube_client.client.CoreV1Api")
+    def test_init_isolated_config(self, mock_core_v1, mock_apps_v1, mock_load_config):
+        KubeClient(context="my-context")
+
+        configuration = mock_load_config.call_args.kwargs["client_configuration"]
+        api_client = mock_apps_v1.call_args.args[0]
+        assert api_client.configuration is configuration
+        assert mock_core_v1.call_args.args[0] is api_client
+
     #
     # test_get_namespaces
     # Tests retrieving list of all namespaces from Kubernetes cluster
@@ -82,6 +100,7 @@ class TestKubeClient:
         mock_ns2.metadata.name = "kube-system"
 
         mock_response = Mock()
+        mock_response.metadata._continue = None
         mock_response.items = [mock_ns1, mock_ns2]
         mock_core_v1.list_namespace.return_value = mock_response
 
@@ -114,6 +133,7 @@ class TestKubeClient:
         mock_deployment.spec.template.spec.containers = [mock_container]
 
         mock_response = Mock()
+        mock_response.metadata._continue = None
         mock_response.items = [mock_deployment]
         mock_apps_v1.list_namespaced_deployment.return_value = mock_response
 
@@ -125,7 +145,9 @@ class TestKubeClient:
         assert deployments[0]["namespace"] == "default"
         assert deployments[0]["images"] == ["nginx:1.21"]
         assert deployments[0]["replicas"] == 3
-        mock_apps_v1.list_namespaced_deployment.assert_called_once_with("default")
+        mock_apps_v1.list_namespaced_deployment.assert_called_once_with(
+            "default", limit=500
+        )
 
     #
     # test_get_deployments_multiple_containers
@@ -158,6 +180,7 @@ class TestKubeClient:
         ]
 
         mock_response = Mock()
+        mock_response.metadata._continue = None
         mock_response.items = [mock_deployment]
         mock_apps_v1.list_namespaced_deployment.return_value = mock_response
 
@@ -199,6 +222,7 @@ class TestKubeClient:
         mock_deployment2.spec.template.spec.containers = [mock_container2]
 
         mock_response = Mock()
+        mock_response.metadata._continue = None
         mock_response.items = [mock_deployment1, mock_deployment2]
         mock_apps_v1.list_deployment_for_all_namespaces.return_value = mock_response
 
@@ -237,6 +261,7 @@ class TestKubeClient:
         mock_deployment.spec.template.spec.containers = [mock_container]
 
         mock_response = Mock()
+        mock_response.metadata._continue = None
         mock_response.items = [mock_deployment]
         mock_apps_v1.list_namespaced_deployment.return_value = mock_response
 
@@ -244,3 +269,183 @@ class TestKubeClient:
         deployments = k8s.get_deployments(namespace="default")
 
         assert deployments[0]["replicas"] == 0
+
+    #
+    # test_get_deployments_follows_continue_token
+    # Tests that list calls are paginated and follow the continue token until exhausted
+    #
+    @patch("citrouille.kube_client.config.load_kube_config")
+    @patch("citrouille.kube_client.client.AppsV1Api")
+    @patch("citrouille.kube_client.client.CoreV1Api")
+    def test_get_deployments_follows_continue_token(
+        self, mock_core_v1, mock_apps_v1_class, mock_load_config
+    ):
+        mock_apps_v1 = Mock()
+        mock_apps_v1_class.return_value = mock_apps_v1
+
+        deployments = []
+        for name in ["app1", "app2", "app3"]:
+            mock_deployment = Mock()
+            mock_deployment.metadata.name = name
+            mock_deployment.metadata.namespace = "default"
+            mock_deployment.spec.replicas = 1
+            mock_deployment.spec.template.spec.containers = []
+            deployments.append(mock_deployment)
+
+        page1 = Mock()
+        page1.items = deployments[:2]
+        page1.metadata._continue = "token-1"
+        page2 = Mock()
+        page2.items = deployments[2:]
+        page2.metadata._continue = None
+        mock_apps_v1.list_namespaced_deployment.side_effect = [page1, page2]
+
+        k8s = KubeClient(page_size=2)
+        result = k8s.get_deployments(namespace="default")
+
+        assert [d["name"] for d in result] == ["app1", "app2", "app3"]
+        calls = mock_apps_v1.list_namespaced_deployment.call_args_list
+        assert calls[0].args == ("default",)
+        assert calls[0].kwargs == {"limit": 2}
+        assert calls[1].kwargs == {"limit": 2, "_continue": "token-1"}
+
+    #
+    # test_iter_pages_yields_each_page
+    # Tests that the generator variant yields one list per page without prefetching
+    #
+    @patch("citrouille.kube_client.config.load_kube_config")
+    @patch("citrouille.kube_client.client.AppsV1Api")
+    @patch("citrouille.kube_client.client.CoreV1Api")
+    def test_iter_pages_yields_each_page(
+        self, mock_core_v1_class, mock_apps_v1, mock_load_config
+    ):
+        mock_core_v1 = Mock()
+        mock_core_v1_class.return_value = mock_core_v1
+
+        page1 = Mock()
+        page1.items = ["secret1", "secret2"]
+        page1.metadata._continue = "token-1"
+        page2 = Mock()
+        page2.items = ["secret3"]
+        page2.metadata._continue = ""
+        mock_core_v1.list_namespaced_secret.side_effect = [page1, page2]
+
+        k8s = KubeClient(page_size=2)
+        pages = k8s.iter_pages("secrets", "default")
+
+        assert next(pages) == ["secret1", "secret2"]
+        assert mock_core_v1.list_namespaced_secret.call_count == 1
+        assert next(pages) == ["secret3"]
+        assert list(pages) == []
+
+    #
+    # test_page_size_zero_disables_pagination
+    # Tests that a page size of 0 issues a single list call without a limit
+    #
+    @patch("citrouille.kube_client.config.load_kube_config")
+    @patch("citrouille.kube_client.client.AppsV1Api")
+    @patch("citrouille.kube_client.client.CoreV1Api")
+    @patch("citrouille.kube_client.client.RbacAuthorizationV1Api")
+    def test_page_size_zero_disables_pagination(
+        self, mock_rbac_v1_class, mock_core_v1, mock_apps_v1, mock_load_config
+    ):
+        mock_rbac_v1 = Mock()
+        mock_rbac_v1_class.return_value = mock_rbac_v1
+
+        mock_response = Mock()
+        mock_response.items = []
+        mock_response.metadata._continue = None
+        mock_rbac_v1.list_cluster_role.return_value = mock_response
+
+        k8s = KubeClient(page_size=0)
+        assert k8s.get_cluster_roles() == []
+        mock_rbac_v1.list_cluster_role.assert_called_once_with()
+
+    #
+    # test_fast_parse_returns_views
+    # Tests that fast_parse mode requests raw responses and wraps items in views
+    #
+    @patch("citrouille.kube_client.config.load_kube_config")
+    @patch("citrouille.kube_client.client.AppsV1Api")
+    @patch("citrouille.kube_client.client.CoreV1Api")
+    def test_fast_parse_returns_views(
+        self, mock_core_v1, mock_apps_v1_class, mock_load_config
+    ):
+        mock_apps_v1 = Mock()
+        mock_apps_v1_class.return_value = mock_apps_v1
+
+        page1 = Mock()
+        page1.data = (
+            b'{"metadata": {"continue": "token-1"}, "items": [{"metadata": '
+            b'{"name": "nginx", "namespace": "default", '
+            b'"creationTimestamp": "2024-11-11T10:30:00Z"}, "spec": {"replicas": 3, '
+            b'"template": {"spec": {"containers": [{"name": "nginx", '
+            b'"image": "nginx:1.21"}]}}}}]}'
+        )
+        page2 = Mock()
+        page2.data = b'{"metadata": {}, "items": []}'
+        mock_apps_v1.list_namespaced_deployment.side_effect = [page1, page2]
+
+        k8s = KubeClient(fast_parse=True)
+        deployments = k8s.get_deployments(namespace="default")
+
+        assert deployments[0]["name"] == "nginx"
+        assert deployments[0]["images"] == ["nginx:1.21"]
+        assert deployments[0]["replicas"] == 3
+        assert deployments[0]["created"].year == 2024
+        calls = mock_apps_v1.list_namespaced_deployment.call_args_list
+        assert calls[0].kwargs == {"limit": 500, "_preload_content": False}
+        assert calls[1].kwargs["_continue"] == "token-1"
+
+
+class TestClientPool:
+    #
+    # test_shared_per_context
+    # Tests that the clients of a kubeconfig and context share one ApiClient
+    #
+    @patch("citrouille.kube_client.config.load_kube_config")
+    @patch("citrouille.kube_client.client.AppsV1Api")
+    @patch("citrouille.kube_client.client.CoreV1Api")
+    def test_shared_per_context(self, mock_core_v1, mock_apps_v1, mock_load_config):
+        pool = ClientPool()
+
+        KubeClient(context="prod", pool=pool)
+        KubeClient(context="prod", pool=pool, page_size=50)
+        KubeClient(context="staging", pool=pool)
+
+        assert mock_load_config.call_count == 2
+        api_clients = [call.args[0] for call in mock_apps_v1.call_args_list]
+        assert api_clients[0] is api_clients[1]
+        assert api_clients[0] is not api_clients[2]
+        assert api_clients[0] is pool.api_client(None, "prod")
+
+    #
+    # test_pool_settings
+    # Tests that the pool size and keep-alive apply to the connections
+    #
+    @patch("citrouille.kube_client.config.load_kube_config")
+    def test_pool_settings(self, mock_load_config):
+        pool = ClientPool(pool_size=32, keep_alive=True)
+
+        configuration = pool.api_client("/path/to/config", "prod").configuration
+
+        assert configuration.connection_pool_maxsize == 32
+        assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in (
+            configuration.socket_options
+        )
+        pool.close()
+
+    #
+    # test_failed_client_is_retried
+    # Tests that a context that failed to load is loaded again on the next call
+    #
+    @patch("citrouille.kube_client.config.load_kube_config")
+    def test_failed_client_is_retried(self, mock_load_config):
+        pool = ClientPool()
+        mock_load_config.side_effect = [Exception("Connection failed"), None]
+
+        with pytest.raises(ConnectionError):
+            KubeClient(context="prod", pool=pool)
+        KubeClient(context="prod", pool=pool)
+
+        assert mock_load_config.call_count == 2
@@ -0,0 +1,310 @@
+import time
+from unittest.mock import Mock
+from kubernetes import client
+
+from citrouille.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    ScanMetrics,
+    finding_namespace,
+    write_textfile,
+)
+from citrouille.security_checks import select_checks, start_scan
+from citrouille.instrumentation import (
+    add_observer,
+    remove_observer,
+    timed,
+)
+
+#
+# test_metrics.py
+#
+# Tests for metrics.py and instrumentation.py
+#
+
+
+def create_deployment(name, namespace, privileged=False):
+    return client.V1Deployment(
+        metadata=client.V1ObjectMeta(name=name, namespace=namespace),
+        spec=client.V1DeploymentSpec(
+            replicas=1,
+            selector=client.V1LabelSelector(),
+            template=client.V1PodTemplateSpec(
+                spec=client.V1PodSpec(
+                    containers=[
+                        client.V1Container(
+                            name="app",
+                            image="nginx:1.27",
+                            security_context=client.V1SecurityContext(
+                                privileged=privileged
+                            ),
+                        )
+                    ]
+                )
+            ),
+        ),
+    )
+
+
+def create_kube_client(deployments, cluster_role_bindings=()):
+    kube_client = Mock()
+    kube_client.get_raw_deployments.return_value = deployments
+    kube_client.get_network_policies.return_value = []
+    kube_client.get_roles.return_value = []
+    kube_client.get_role_bindings.return_value = []
+    kube_client.get_cluster_roles.return_value = []
+    kube_client.get_cluster_role_bindings.return_value = list(cluster_role_bindings)
+    return kube_client
+
+
+#
+# scan
+# Runs checks (1 and 23 by default) on namespaces, with the findings counted
+# by metrics
+#
+def scan(metrics, kube_client, namespaces, only=("1", "23")):
+    checks = select_checks(only=list(only))
+    started = time.perf_counter()
+    resources, findings = start_scan(kube_client, namespaces, checks)
+    return list(metrics.observe(resources, findings, started))
+
+
+class TestExposition:
+    #
+    # test_counter_and_gauge
+    # Tests the samples of counters and gauges, with escaped label values
+    #
+    def test_counter_and_gauge(self):
+        counter = Counter("requests_total", "Requests", ("path",))
+        counter.inc(1, ("/a",))
+        counter.inc(2, ("/a",))
+        gauge = Gauge("temperature", 'Temperature\nin "C"', ("room",))
+        gauge.set(21.5, ('living "room"',))
+
+        assert counter.render() == (
+            "# HELP requests_total Requests\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{path="/a"} 3\n'
+        )
+        assert gauge.render() == (
+            '# HELP temperature Temperature\\nin "C"\n'
+            "# TYPE temperature gauge\n"
+            'temperature{room="living \\"room\\""} 21.5\n'
+        )
+
+    #
+    # test_histogram
+    # Tests that histogram buckets are cumulative and end with +Inf
+    #
+    def test_histogram(self):
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value)
+
+        lines = histogram.render().splitlines()
+
+        assert lines[2:] == [
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 4.25",
+            "latency_seconds_count 4",
+        ]
+
+    #
+    # test_replace
+    # Tests that replace drops the matching series only
+    #
+    def test_replace(self):
+        gauge = Gauge("findings", "Findings", ("namespace",))
+        gauge.set(1, ("a",))
+        gauge.set(2, ("b",))
+
+        gauge.replace(lambda labels: labels[0] == "a", {("c",): 3})
+
+        assert [labels for _, labels, _ in gauge.samples()] == [
+            {"namespace": "b"},
+            {"namespace": "c"},
+        ]
+
+    #
+    # test_finding_namespace
+    # Tests the namespace label of findings on namespaced and cluster resources
+    #
+    def test_finding_namespace(self):
+        assert (
+            finding_namespace(
+                {"resource_type": "Deployment", "resource_name": "prod/web"}
+            )
+            == "prod"
+        )
+        assert (
+            finding_namespace({"resource_type": "Namespace", "resource_name": "prod"})
+            == "prod"
+        )
+        assert (
+            finding_namespace(
+                {"resource_type": "ClusterRole", "resource_name": "admin"}
+            )
+            == ""
+        )
+        assert (
+            finding_namespace(
+                {
+                    "resource_type": "ClusterRoleBinding",
+                    "resource_name": "cluster-wide/admins",
+                }
+            )
+            == ""
+        )
+
+
+class TestScanMetrics:
+    #
+    # test_scan
+    # Tests the findings, objects and fetch metrics of a scan
+    #
+    def test_scan(self):
+        metrics = ScanMetrics()
+        kube_client = create_kube_client(
+            [
+                create_deployment("web", "default", privileged=True),
+                create_deployment("api", "default"),
+            ]
+        )
+
+        findings = scan(metrics, kube_client, ["default"])
+        text = metrics.render()
+
+        assert findings
+        assert (
+            'citrouille_findings{check_id="1",severity="CRITICAL",namespace="default"} 1'
+            in text
+        )
+        assert (
+            'citrouille_findings{check_id="23",severity="HIGH",namespace="default"} 1'
+            in text
+        )
+        assert 'citrouille_objects{kind="deployments"} 2' in text
+        assert 'citrouille_fetch_duration_seconds_count{kind="deployments"} 1' in text
+        assert "citrouille_scans_total 1" in text
+        assert "citrouille_scan_duration_seconds_count 1" in text
+
+    #
+    # test_findings_are_replaced
+    # Tests that a scan replaces the findings of the namespaces it scanned only
+    #
+    def test_findings_are_replaced(self):
+        metrics = ScanMetrics()
+        privileged = [create_deployment("web", "default", privileged=True)]
+        scan(metrics, create_kube_client(privileged), ["default"])
+        scan(metrics, create_kube_client(privileged), ["other"])
+
+        scan(metrics, create_kube_client([]), ["default"])
+        text = metrics.render()
+
+        assert 'check_id="1",severity="CRITICAL",namespace="default"' not in text
+        assert 'check_id="23",severity="HIGH",namespace="default"' in text
+        assert 'check_id="23",severity="HIGH",namespace="other"' in text
+        assert "citrouille_scans_total 3" in text
+
+    #
+    # test_cluster_findings_are_replaced
+    # Tests that the findings of a fixed cluster-scoped object go away
+    #
+    def test_cluster_findings_are_replaced(self):
+        metrics = ScanMetrics()
+        binding = client.V1ClusterRoleBinding(
+            metadata=client.V1ObjectMeta(name="admins"),
+            role_ref=client.V1RoleRef(
+                api_group="rbac.authorization.k8s.io",
+                kind="ClusterRole",
+                name="cluster-admin",
+            ),
+        )
+        scan(metrics, create_kube_client([], [binding]), ["default"], only=["20"])
+        assert 'check_id="20",severity="CRITICAL",namespace=""' in metrics.render()
+
+        scan(metrics, create_kube_client([]), ["default"], only=["20"])
+
+        assert 'check_id="20"' not in metrics.render()
+
+    #
+    # test_fetch_errors
+    # Tests that failed fetches are counted by resource kind
+    #
+    def test_fetch_errors(self):
+        metrics = ScanMetrics()
+        kube_client = create_kube_client([])
+        kube_client.get_network_policies.side_effect = Exception("forbidden")
+
+        scan(metrics, kube_client, ["default"])
+
+        assert (
+            'citrouille_fetch_errors_total{kind="network_policies"} 1'
+            in metrics.render()
+        )
+
+    #
+    # test_check_cpu_time
+    # Tests that the CPU time of the checks is recorded while observing
+    #
+    def test_check_cpu_time(self):
+        metrics = ScanMetrics()
+        kube_client = create_kube_client([create_deployment("web", "default")])
+
+        add_observer(metrics)
+        try:
+            scan(metrics, kube_client, ["default"])
+        finally:
+            remove_observer(metrics)
+
+        check_ids = {labels["check_id"] for _, labels, _ in metrics.check_cpu.samples()}
+        assert check_ids == {"1", "23"}
+
+    #
+    # test_write_textfile
+    # Tests that the metrics file holds the rendered metrics
+    #
+    def test_write_textfile(self, tmp_path):
+        metrics = ScanMetrics()
+        metrics.scans.inc()
+        path = tmp_path / "citrouille.prom"
+
+        write_textfile(str(path), metrics)
+
+        assert path.read_text() == metrics.render()
+        assert list(tmp_path.iterdir()) == [path]
+
+
+class TestInstrumentation:
+    #
+    # test_timed_without_observers
+    # Tests that functions are not wrapped when nobody observes them
+    #
+    def test_timed_without_observers(self):
+        def check(resources, namespace):
+            return []
+
+        assert timed("1", check) is check
+
+    #
+    # test_timed
+    # Tests that observers receive the wall-clock and CPU time of each call
+    #
+    def test_timed(self):
+        observer = Mock()
+        add_observer(observer)
+        try:
+            wrapped = timed("23", lambda value: value * 2)
+            assert wrapped(21) == 42
+        finally:
+            remove_observer(observer)
+
+        category, check_id, start, wall, cpu, allocated = (
+            observer.record_span.call_args[0]
+        )
+        assert (category, check_id) == ("check", "23")
+        assert wall >= 0
+        assert cpu >= 0
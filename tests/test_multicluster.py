@@ -0,0 +1,168 @@
+import threading
+import time
+import pytest
+
+from citrouille.multicluster import (
+    fan_out,
+    resolve_clusters,
+    tag_deployments,
+    tag_findings,
+)
+from citrouille.security_checks.finding import CheckMetadata, Finding
+
+#
+# test_multicluster.py
+#
+# Tests for multicluster.py
+#
+
+CONFIG = {
+    "clusters": {
+        "prod-web": {"context": "prod", "namespace": "web"},
+        "staging": {"context": "staging", "namespace": "web"},
+        "prod-api": {"context": "prod", "namespace": "api"},
+        "local": {"namespace": "default"},
+    }
+}
+
+
+class TestResolveClusters:
+    #
+    # test_all_clusters
+    # Tests that every alias is grouped with the other aliases of its context
+    #
+    def test_all_clusters(self):
+        groups = resolve_clusters(CONFIG)
+
+        assert [(group.context, group.aliases) for group in groups] == [
+            ("prod", ["prod-web", "prod-api"]),
+            ("staging", ["staging"]),
+            (None, ["local"]),
+        ]
+        assert groups[0].namespaces == ["web", "api"]
+        assert groups[0].name == "prod-web,prod-api"
+
+    #
+    # test_selected_clusters
+    # Tests that only the given aliases are resolved, in their order
+    #
+    def test_selected_clusters(self):
+        groups = resolve_clusters(CONFIG, ["staging", "prod-api", "staging"])
+
+        assert [group.name for group in groups] == ["staging", "prod-api"]
+
+    #
+    # test_invalid_clusters
+    # Tests that unknown aliases and missing cluster configs are errors
+    #
+    def test_invalid_clusters(self):
+        with pytest.raises(ValueError, match="Unknown cluster alias: dev, qa"):
+            resolve_clusters(CONFIG, ["prod-web", "dev", "qa"])
+        with pytest.raises(ValueError, match="No cluster aliases given"):
+            resolve_clusters(CONFIG, [])
+        with pytest.raises(ValueError, match="No cluster aliases in the config file"):
+            resolve_clusters({})
+
+
+class TestFanOut:
+    #
+    # test_results_in_order
+    # Tests that results come back in the order of the groups, whatever the
+    # order in which the clusters answer
+    #
+    def test_results_in_order(self):
+        groups = resolve_clusters(CONFIG)
+        delays = {"prod": 0.05, "staging": 0.0, None: 0.02}
+
+        def task(client, group):
+            time.sleep(delays[client])
+            return group.aliases
+
+        results = list(fan_out(groups, lambda group: group.context, task))
+
+        assert [result for _, result, _ in results] == [
+            ["prod-web", "prod-api"],
+            ["staging"],
+            ["local"],
+        ]
+
+    #
+    # test_failed_cluster
+    # Tests that a failed connection is reported without stopping the others
+    #
+    def test_failed_cluster(self):
+        groups = resolve_clusters(CONFIG)
+
+        def connect(group):
+            if group.context == "staging":
+                raise ConnectionError("unreachable")
+            return group.context
+
+        results = list(fan_out(groups, connect, lambda client, group: client))
+
+        assert [result for _, result, _ in results] == ["prod", None, None]
+        assert isinstance(results[1][2], ConnectionError)
+
+    #
+    # test_bounded_workers
+    # Tests that no more than max_workers clusters are queried at once
+    #
+    def test_bounded_workers(self):
+        config = {
+            "clusters": {
+                f"c{i}": {"context": f"c{i}", "namespace": "default"} for i in range(6)
+            }
+        }
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def task(client, group):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+
+        list(
+            fan_out(
+                resolve_clusters(config),
+                lambda group: None,
+                task,
+                max_workers=2,
+            )
+        )
+
+        assert in_flight[1] == 2
+
+
+class TestTags:
+    #
+    # test_tag_deployments
+    # Tests that deployment summaries are copied with their cluster
+    #
+    def test_tag_deployments(self):
+        deployments = [{"name": "web", "namespace": "prod"}]
+
+        tagged = tag_deployments(deployments, "prod-web")
+
+        assert tagged == [{"name": "web", "namespace": "prod", "cluster": "prod-web"}]
+        assert "cluster" not in deployments[0]
+
+    #
+    # test_tag_findings
+    # Tests that findings become dicts with their cluster first
+    #
+    def test_tag_findings(self):
+        finding = Finding(
+            CheckMetadata("1", "Privileged containers", "CWE-250"),
+            severity="CRITICAL",
+            resource_type="Deployment",
+            resource_name="prod/web",
+        )
+
+        tagged = list(tag_findings([finding], "prod-web"))
+
+        assert list(tagged[0])[0] == "cluster"
+        assert tagged[0]["cluster"] == "prod-web"
+        assert tagged[0]["check_id"] == "1"
@@ -0,0 +1,193 @@
+import json
+import threading
+
+from kubernetes.client import (
+    V1Container,
+    V1Deployment,
+    V1DeploymentSpec,
+    V1LabelSelector,
+    V1ObjectMeta,
+    V1PodSpec,
+    V1PodTemplateSpec,
+)
+
+from citrouille.instrumentation import span, timed
+from citrouille.profiler import Profiler, write_trace
+from citrouille.security_checks import check_01_privileged_containers
+from citrouille.security_checks.engine import PodSpecWalker
+
+#
+# test_profiler.py
+#
+# Tests for profiler.py
+#
+
+
+#
+# profile
+# Runs a phase with two fetches and a check call under a profiler
+#
+def profile(trace_allocations=True):
+    profiler = Profiler()
+    profiler.start()
+    try:
+        if trace_allocations:
+            profiler.trace_allocations()
+        with span("phase", "fetch"):
+            with span("fetch", "deployments"):
+                data = [bytes(1024) for _ in range(100)]
+            with span("fetch", "secrets"):
+                pass
+        timed("1", lambda items: [])(data)
+    finally:
+        profiler.stop()
+    return profiler
+
+
+class TestProfiler:
+    #
+    # test_summary
+    # Tests that spans are aggregated by category and name, in category order
+    #
+    def test_summary(self):
+        profiler = profile()
+
+        summary = profiler.summary()
+
+        assert [(entry["category"], entry["name"]) for entry in summary][0] == (
+            "phase",
+            "fetch",
+        )
+        assert {(entry["category"], entry["name"]) for entry in summary} == {
+            ("phase", "fetch"),
+            ("fetch", "deployments"),
+            ("fetch", "secrets"),
+            ("check", "1"),
+        }
+        deployments = next(entry for entry in summary if entry["name"] == "deployments")
+        assert deployments["calls"] == 1
+        assert deployments["allocated"] >= 100 * 1024
+        assert profiler.peak_memory >= 100 * 1024
+
+    #
+    # test_without_allocations
+    # Tests that allocations are not reported when they were not traced
+    #
+    def test_without_allocations(self):
+        profiler = profile(trace_allocations=False)
+
+        assert all(entry["allocated"] is None for entry in profiler.summary())
+        assert "Peak traced memory" not in profiler.format_table()
+
+    #
+    # test_format_table
+    # Tests that the table lists every span with its share of the run
+    #
+    def test_format_table(self):
+        table = profile().format_table()
+
+        assert "CATEGORY" in table
+        assert "deployments" in table
+        assert "Peak traced memory" in table
+
+    #
+    # test_stopped_profiler_records_nothing
+    # Tests that spans after stop() are not recorded
+    #
+    def test_stopped_profiler_records_nothing(self):
+        profiler = profile()
+        count = len(profiler.spans)
+
+        with span("fetch", "deployments"):
+            pass
+
+        assert len(profiler.spans) == count
+
+    #
+    # test_summary_without_spans
+    # Tests that only the totals are kept when the spans are not needed
+    #
+    def test_summary_without_spans(self):
+        profiler = Profiler(keep_spans=False)
+        profiler.start()
+        try:
+            for _ in range(3):
+                with span("fetch", "deployments"):
+                    pass
+        finally:
+            profiler.stop()
+
+        assert profiler.spans == []
+        (entry,) = profiler.summary()
+        assert (entry["name"], entry["calls"]) == ("deployments", 3)
+
+    #
+    # test_walk_records_one_span_per_check
+    # Tests that a walk over many containers is profiled as one call per check
+    #
+    def test_walk_records_one_span_per_check(self):
+        deployments = [
+            V1Deployment(
+                metadata=V1ObjectMeta(name=f"web-{i}", namespace="prod"),
+                spec=V1DeploymentSpec(
+                    selector=V1LabelSelector(),
+                    template=V1PodTemplateSpec(
+                        spec=V1PodSpec(
+                            containers=[
+                                V1Container(name=f"app-{j}", image="nginx")
+                                for j in range(3)
+                            ]
+                        )
+                    ),
+                ),
+            )
+            for i in range(20)
+        ]
+        walker = PodSpecWalker()
+        walker.register(check_01_privileged_containers)
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            walker.walk(deployments)
+        finally:
+            profiler.stop()
+
+        assert [(entry["name"], entry["calls"]) for entry in profiler.summary()] == [
+            ("1", 1)
+        ]
+        assert len(profiler.spans) == 1
+
+    #
+    # test_write_trace
+    # Tests the Chrome trace-event file, with one named track per thread
+    #
+    def test_write_trace(self, tmp_path):
+        def fetch():
+            with span("fetch", "roles"):
+                pass
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            with span("phase", "fetch"):
+                thread = threading.Thread(target=fetch, name="fetch-worker")
+                thread.start()
+                thread.join()
+        finally:
+            profiler.stop()
+        path = tmp_path / "trace.json"
+
+        write_trace(profiler, str(path))
+        events = json.loads(path.read_text())["traceEvents"]
+
+        spans = {event["name"]: event for event in events if event["ph"] == "X"}
+        assert spans["fetch"]["cat"] == "phase"
+        assert spans["roles"]["tid"] != spans["fetch"]["tid"]
+        assert spans["roles"]["ts"] >= spans["fetch"]["ts"] >= 0
+        threads = {
+            event["tid"]: event["args"]["name"]
+            for event in events
+            if event["ph"] == "M"
+        }
+        assert threads[spans["roles"]["tid"]] == "fetch-worker"
@@ -0,0 +1,181 @@
+import pytest
+from datetime import datetime, timezone
+
+from citrouille.resource_view import view, ResourceView
+from citrouille.security_checks.check_01_privileged_containers import (
+    check as check_privileged,
+)
+from citrouille.security_checks.check_02_host_pid import check as check_host_pid
+from citrouille.security_checks.check_08_resource_limits import (
+    check as check_resource_limits,
+)
+from citrouille.security_checks.check_15_pss_enforcement import (
+    check as check_pss_enforcement,
+)
+from citrouille.security_checks.check_23_network_policies import (
+    check as check_network_policies,
+)
+
+#
+# test_resource_view.py
+#
+# Tests for resource_view.py
+#
+
+
+def create_raw_deployment(containers=None, **pod_spec):
+    return {
+        "metadata": {
+            "name": "web",
+            "namespace": "default",
+            "creationTimestamp": "2024-11-11T10:30:00Z",
+            "labels": {"app": "web"},
+        },
+        "spec": {
+            "replicas": 2,
+            "template": {
+                "spec": {"containers": containers or [], **pod_spec},
+            },
+        },
+    }
+
+
+class TestResourceView:
+    #
+    # test_maps_snake_case_attributes_to_json_keys
+    # Tests that attributes follow the kubernetes model naming, including irregular keys
+    #
+    def test_maps_snake_case_attributes_to_json_keys(self):
+        deployment = view(create_raw_deployment(hostPID=True), "V1Deployment")
+
+        assert deployment.metadata.name == "web"
+        assert deployment.spec.replicas == 2
+        assert deployment.spec.template.spec.host_pid is True
+
+    #
+    # test_missing_fields_are_none
+    # Tests that absent fields read as None, like on model objects
+    #
+    def test_missing_fields_are_none(self):
+        deployment = view(create_raw_deployment(), "V1Deployment")
+
+        assert deployment.spec.template.spec.init_containers is None
+        assert deployment.spec.template.spec.security_context is None
+
+    #
+    # test_unknown_attribute_raises
+    # Tests that attributes which are not part of the model raise AttributeError
+    #
+    def test_unknown_attribute_raises(self):
+        deployment = view(create_raw_deployment(), "V1Deployment")
+
+        with pytest.raises(AttributeError):
+            deployment.not_a_field
+
+    #
+    # test_converts_nested_types
+    # Tests conversion of nested models, lists of models, maps and timestamps
+    #
+    def test_converts_nested_types(self):
+        raw = create_raw_deployment(
+            containers=[
+                {
+                    "name": "app",
+                    "image": "app:v1",
+                    "resources": {"limits": {"cpu": "500m"}},
+                    "env": [{"name": "MODE", "value": "prod"}],
+                }
+            ]
+        )
+        deployment = view(raw, "V1Deployment")
+        container = deployment.spec.template.spec.containers[0]
+
+        assert isinstance(container, ResourceView)
+        assert container.resources.limits == {"cpu": "500m"}
+        assert container.env[0].value == "prod"
+        assert container.env[0].value_from is None
+        assert deployment.metadata.labels == {"app": "web"}
+        assert deployment.metadata.creation_timestamp == datetime(
+            2024, 11, 11, 10, 30, 0, tzinfo=timezone.utc
+        )
+
+    #
+    # test_to_dict_returns_raw_object
+    # Tests that the underlying JSON object is available unchanged
+    #
+    def test_to_dict_returns_raw_object(self):
+        raw = create_raw_deployment()
+        assert view(raw, "V1Deployment").to_dict() is raw
+
+
+class TestChecksOnResourceViews:
+    #
+    # test_container_checks
+    # Tests that container-level checks work against views
+    #
+    def test_container_checks(self):
+        raw = create_raw_deployment(
+            containers=[
+                {
+                    "name": "app",
+                    "image": "app:v1",
+                    "securityContext": {"privileged": True},
+                    "resources": {"limits": {"cpu": "1", "memory": "1Gi"}},
+                }
+            ]
+        )
+        deployment = view(raw, "V1Deployment")
+
+        privileged = check_privileged([deployment])
+        limits = check_resource_limits([deployment])
+
+        assert len(privileged) == 1
+        assert privileged[0]["resource_name"] == "default/web"
+        assert len(limits) == 1
+        assert "no requests set" in limits[0]["message"]
+
+    #
+    # test_pod_checks
+    # Tests that pod-level checks read irregular JSON keys such as hostPID
+    #
+    def test_pod_checks(self):
+        deployment = view(create_raw_deployment(hostPID=True), "V1Deployment")
+        assert len(check_host_pid([deployment])) == 1
+
+    #
+    # test_namespace_check
+    # Tests that label maps are usable on namespace views
+    #
+    def test_namespace_check(self):
+        namespace = view(
+            {
+                "metadata": {
+                    "name": "production",
+                    "labels": {
+                        "pod-security.kubernetes.io/enforce": "restricted",
+                        "pod-security.kubernetes.io/warn": "restricted",
+                        "pod-security.kubernetes.io/audit": "restricted",
+                    },
+                }
+            },
+            "V1Namespace",
+        )
+        assert check_pss_enforcement(namespace) == []
+
+    #
+    # test_network_policy_check
+    # Tests that the reserved 'from' key is exposed as _from like on models
+    #
+    def test_network_policy_check(self):
+        policy = view(
+            {
+                "metadata": {"name": "allow-all"},
+                "spec": {"podSelector": {}, "ingress": [{}]},
+            },
+            "V1NetworkPolicy",
+        )
+
+        findings = check_network_policies([policy], "default")
+
+        assert len(findings) == 1
+        assert "allows all ingress" in findings[0]["message"]
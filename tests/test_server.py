@@ -0,0 +1,166 @@
+import json
+import threading
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import ANY, patch
+
+from kubernetes.client import V1Namespace, V1ObjectMeta
+
+from citrouille.kube_client import ClientPool
+from citrouille.metrics import ScanMetrics
+from citrouille.remote import RemoteError, request
+from citrouille.server import CitrouilleServer, CitrouilleService
+
+#
+# test_server.py
+#
+# Tests for server.py and remote.py
+#
+
+CONFIG = {"clusters": {"prod": {"context": "us-east-1", "namespace": "production"}}}
+
+
+def create_deployment_summary(name, namespace):
+    return {
+        "name": name,
+        "namespace": namespace,
+        "images": ["nginx:1.21"],
+        "created": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "replicas": 2,
+    }
+
+
+class TestServer:
+    #
+    # server
+    # Serves a service on a free local port, with a mocked CachedKubeClient
+    #
+    @pytest.fixture
+    def server(self):
+        with patch("citrouille.server.CachedKubeClient") as mock_client:
+            mock_client.return_value.get_network_policies.return_value = []
+            service = CitrouilleService(CONFIG, scan_metrics=ScanMetrics())
+            server = CitrouilleServer(("127.0.0.1", 0), service)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                yield f"http://127.0.0.1:{server.server_address[1]}", mock_client
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    #
+    # test_inventory
+    # Tests that /inventory answers the JSON of the inventory command
+    #
+    def test_inventory(self, server):
+        url, mock_client = server
+        mock_client.return_value.get_deployments.return_value = [
+            create_deployment_summary("web", "production")
+        ]
+
+        body, exit_code = request(url, "inventory", [("namespace", "prod")])
+
+        assert exit_code == 0
+        assert json.loads(body)[0]["created"] == "2025-01-02T03:04:05+00:00"
+        mock_client.assert_called_once_with(
+            kubeconfig=None,
+            context="us-east-1",
+            page_size=500,
+            fast_parse=False,
+            pool=ANY,
+        )
+        assert isinstance(mock_client.call_args.kwargs["pool"], ClientPool)
+        mock_client.return_value.get_deployments.assert_called_once_with(
+            namespace="production"
+        )
+
+    #
+    # test_clients_are_reused
+    # Tests that the requests on a context share one warm client
+    #
+    def test_clients_are_reused(self, server):
+        url, mock_client = server
+        mock_client.return_value.get_deployments.return_value = []
+
+        request(url, "compare", [("namespace1", "a"), ("namespace2", "b")])
+        request(url, "inventory", [("namespace", "a"), ("format", "table")])
+
+        mock_client.assert_called_once()
+
+    #
+    # test_security_exit_code
+    # Tests that /security answers the findings and the exit code of the command
+    #
+    def test_security_exit_code(self, server):
+        url, _ = server
+
+        body, exit_code = request(
+            url,
+            "security",
+            [("namespace", "default"), ("checks", "23"), ("format", "ndjson")],
+        )
+
+        # A namespace without NetworkPolicies is a high severity finding
+        finding = json.loads(body.splitlines()[0])
+        assert finding["check_id"] == "23"
+        assert finding["severity"] == "HIGH"
+        assert exit_code == 1
+
+    #
+    # test_metrics
+    # Tests that /metrics answers the findings of the scans answered so far
+    #
+    def test_metrics(self, server):
+        url, _ = server
+
+        request(url, "security", [("namespace", "default"), ("checks", "23")])
+        body, exit_code = request(url, "metrics", [])
+
+        assert exit_code == 0
+        assert (
+            'citrouille_findings{check_id="23",severity="HIGH",namespace="default"} 1'
+            in body
+        )
+        assert "citrouille_scans_total 1" in body
+
+    #
+    # test_invalid_request
+    # Tests that invalid parameters are reported with the server message
+    #
+    def test_invalid_request(self, server):
+        url, _ = server
+
+        with pytest.raises(RemoteError, match="Unknown check ID: 99"):
+            request(url, "security", [("namespace", "default"), ("checks", "99")])
+        with pytest.raises(RemoteError, match="Unsupported format: sarif"):
+            request(url, "inventory", [("namespace", "default"), ("format", "sarif")])
+        with pytest.raises(RemoteError, match="Unknown endpoint"):
+            request(url, "snapshot", [])
+
+    #
+    # test_missing_namespace
+    # Tests that a namespace that does not exist is an error, not an empty scan
+    #
+    def test_missing_namespace(self, server):
+        url, mock_client = server
+        mock_client.return_value.iter_resources.side_effect = lambda kind: iter(
+            [V1Namespace(metadata=V1ObjectMeta(name="default"))]
+            if kind == "namespaces"
+            else []
+        )
+
+        with pytest.raises(RemoteError, match="Namespace not found: typo"):
+            request(
+                url,
+                "security",
+                [("namespace", "default"), ("namespace", "typo"), ("checks", "1")],
+            )
+
+    #
+    # test_unreachable_server
+    # Tests that an unreachable server is reported as a RemoteError
+    #
+    def test_unreachable_server(self):
+        with pytest.raises(RemoteError, match="Unable to reach citrouille server"):
+            request("http://127.0.0.1:1", "inventory", [], timeout=5)
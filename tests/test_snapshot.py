@@ -0,0 +1,180 @@
+import gzip
+import json
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import Mock
+
+from kubernetes import client
+
+from citrouille.security_checks import run_security_checks
+from citrouille.snapshot import (
+    SnapshotClient,
+    SnapshotError,
+    read_snapshot,
+    write_snapshot,
+)
+
+#
+# test_snapshot.py
+#
+# Tests for snapshot.py
+#
+
+
+def create_deployment(name, namespace, privileged=False):
+    return client.V1Deployment(
+        metadata=client.V1ObjectMeta(
+            name=name,
+            namespace=namespace,
+            creation_timestamp=datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        ),
+        spec=client.V1DeploymentSpec(
+            replicas=2,
+            selector=client.V1LabelSelector(),
+            template=client.V1PodTemplateSpec(
+                spec=client.V1PodSpec(
+                    containers=[
+                        client.V1Container(
+                            name="app",
+                            image="nginx:1.27",
+                            security_context=client.V1SecurityContext(
+                                privileged=privileged
+                            ),
+                        )
+                    ]
+                )
+            ),
+        ),
+    )
+
+
+def create_cluster_client():
+    resources = {
+        "namespaces": [
+            client.V1Namespace(metadata=client.V1ObjectMeta(name=name))
+            for name in ("prod", "staging")
+        ],
+        "deployments": [
+            create_deployment("web", "prod", privileged=True),
+            create_deployment("web", "staging"),
+        ],
+        "secrets": [
+            client.V1Secret(
+                metadata=client.V1ObjectMeta(name="db", namespace="prod"),
+                data={"password": "c2VjcmV0"},
+            )
+        ],
+        "cluster_roles": [
+            client.V1ClusterRole(metadata=client.V1ObjectMeta(name="view"))
+        ],
+    }
+
+    kube_client = Mock()
+    kube_client.iter_resources.side_effect = lambda kind, namespace=None: iter(
+        obj
+        for obj in resources.get(kind, [])
+        if namespace is None or obj.metadata.namespace == namespace
+    )
+    return kube_client
+
+
+class TestSnapshot:
+    #
+    # test_write_snapshot_header
+    # Tests that the snapshot starts with a header indexing its content
+    #
+    def test_write_snapshot_header(self, tmp_path):
+        path = tmp_path / "cluster.snap.gz"
+        write_snapshot(create_cluster_client(), str(path), context="prod-cluster")
+
+        with gzip.open(path, "rt") as f:
+            lines = f.read().splitlines()
+        header = json.loads(lines[0])
+
+        assert header["format"] == "citrouille-snapshot"
+        assert header["context"] == "prod-cluster"
+        assert header["kinds"]["deployments"] == 2
+        assert header["kinds"]["roles"] == 0
+        assert header["namespaces"] == ["prod", "staging"]
+        assert len(lines) == 1 + sum(header["kinds"].values())
+
+    #
+    # test_secret_payload_not_written
+    # Tests that Secret values are left out of snapshots
+    #
+    def test_secret_payload_not_written(self, tmp_path):
+        path = tmp_path / "cluster.snap.gz"
+        write_snapshot(create_cluster_client(), str(path))
+
+        _, objects = read_snapshot(str(path))
+
+        assert objects["secrets"][0]["metadata"]["name"] == "db"
+        assert "data" not in objects["secrets"][0]
+        with gzip.open(path, "rt") as f:
+            assert "c2VjcmV0" not in f.read()
+
+    #
+    # test_write_snapshot_namespaces
+    # Tests that a snapshot can be limited to some namespaces
+    #
+    def test_write_snapshot_namespaces(self, tmp_path):
+        path = tmp_path / "prod.snap.gz"
+        header = write_snapshot(create_cluster_client(), str(path), ["prod"])
+
+        assert header["namespaces"] == ["prod"]
+        assert header["kinds"]["deployments"] == 1
+        assert header["kinds"]["cluster_roles"] == 1
+
+    #
+    # test_snapshot_client_answers_getters
+    # Tests that a SnapshotClient answers the KubeClient getters from the file
+    #
+    def test_snapshot_client_answers_getters(self, tmp_path):
+        path = tmp_path / "cluster.snap.gz"
+        write_snapshot(create_cluster_client(), str(path))
+
+        snapshot = SnapshotClient(str(path))
+
+        assert snapshot.get_namespaces() == ["prod", "staging"]
+        deployments = snapshot.get_deployments("prod")
+        assert deployments == [
+            {
+                "name": "web",
+                "namespace": "prod",
+                "images": ["nginx:1.27"],
+                "created": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+                "replicas": 2,
+            }
+        ]
+        assert len(snapshot.get_all_deployments()) == 2
+        assert snapshot.get_namespace_details("staging").metadata.name == "staging"
+
+    #
+    # test_security_checks_on_snapshot
+    # Tests that security checks run on a snapshot like on the cluster
+    #
+    def test_security_checks_on_snapshot(self, tmp_path):
+        path = tmp_path / "cluster.snap.gz"
+        write_snapshot(create_cluster_client(), str(path))
+
+        findings = run_security_checks(
+            SnapshotClient(str(path)), "prod", check_config=True
+        )
+
+        privileged = [f for f in findings if f["check_id"] == "1"]
+        assert [f["resource_name"] for f in privileged] == ["prod/web"]
+
+    #
+    # test_invalid_snapshot
+    # Tests that files which are not snapshots are rejected
+    #
+    def test_invalid_snapshot(self, tmp_path):
+        path = tmp_path / "other.gz"
+        with gzip.open(path, "wt") as f:
+            f.write('{"hello": "world"}\n')
+
+        with pytest.raises(SnapshotError, match="not a citrouille snapshot"):
+            SnapshotClient(str(path))
+
+        with pytest.raises(SnapshotError, match="Failed to read snapshot"):
+            SnapshotClient(str(tmp_path / "missing.gz"))